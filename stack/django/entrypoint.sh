@@ -67,6 +67,27 @@ output=$(python manage.py migrate --run-syncdb --noinput 2>&1) || {
     # Continue even if syncdb fails
 }
 
+# Step 3B: Create the cache table used when OA_ENV_CACHE=database (no-op if it exists)
+echo "[OADJANGO] Creating cache table..."
+output=$(python manage.py createcachetable 2>&1) || {
+    echo "[OADJANGO] Createcachetable output: $output";
+    # Continue, the cache falls back to recomputing values
+}
+
+# Step 3C: Index coaches for search (picks up memberships written without signals)
+echo "[OADJANGO] Rebuilding coach search index..."
+output=$(python manage.py rebuild_coach_search 2>&1) || {
+    echo "[OADJANGO] Rebuild coach search output: $output";
+    # Continue, autocomplete returns fewer coaches until the next rebuild
+}
+
+# Step 3D: Backfill content search documents on the first deploy (saves keep them current afterwards)
+echo "[OADJANGO] Backfilling content search index..."
+output=$(python manage.py rebuild_content_search --if-empty 2>&1) || {
+    echo "[OADJANGO] Rebuild content search output: $output";
+    # Continue, content search finds nothing until the next rebuild
+}
+
 # Step 4: Create superuser if it doesn't exist
 echo "[OADJANGO] Creating superuser..."
 output=$(python manage.py createsuperuser --noinput 2>&1) || {
@@ -102,6 +123,19 @@ echo "[OADJANGO] Using PORT: $PORT"
 if [ "$DJANGO_ENV" = "testing" ] || [ "$DJANGO_ENV" = "development" ] || { [ "$DJANGO_ENV" = "docker" ] && [ "$DJANGO_DEBUG" = "True" ]; }; then
     echo "[OADJANGO] Running in development mode with runserver_plus..."
     exec python manage.py runserver_plus 0.0.0.0:$PORT --cert-file "$ssl_cert_path"
+elif [ "$DJANGO_ASGI" = "True" ]; then
+    # ASGI workers serve the /api/events/stream push channel; events reach every worker through
+    # EVENT_STREAM_BACKEND (DatabaseEventBackend by default), not just the publishing process
+    echo "[OADJANGO] Running in production mode with gunicorn + uvicorn (ASGI)"
+    exec gunicorn strongmsp_base.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --bind 0.0.0.0:$PORT \
+        --workers 3 \
+        --timeout 300 \
+        --capture-output \
+        --log-level debug \
+        --access-logfile '-' \
+        --error-logfile '-'
 else
     echo "[OADJANGO] Running in production mode with gunicorn"
     exec gunicorn strongmsp_base.wsgi:application \
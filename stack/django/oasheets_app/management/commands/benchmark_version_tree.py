@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from oasheets_app.models import SchemaVersions
+
+
+def legacy_versions_count(schema):
+    """The previous recursive implementation: one query per node."""
+    children = SchemaVersions.objects.filter(parent=schema)
+    return children.count() + sum(legacy_versions_count(child) for child in children)
+
+
+def legacy_version_tree(schema):
+    root = schema
+    while root.parent:
+        root = root.parent
+
+    def build_tree(node):
+        children = SchemaVersions.objects.filter(parent=node)
+        return {
+            "id": node.id,
+            "name": node.prompt if len(node.prompt) <= 80 else node.prompt[: 80 - 3] + "...",
+            "children": [build_tree(child) for child in children]
+        }
+
+    return build_tree(root)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks saving a SchemaVersions node in a large version tree. All rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=1000, help='Number of nodes in the tree (default: 1000)')
+        parser.add_argument('--fanout', type=int, default=4, help='Children per node (default: 4)')
+        parser.add_argument('--skip-legacy', action='store_true', help='Do not time the previous recursive implementation')
+
+    def handle(self, *args, **options):
+        if options['nodes'] < 2 or options['fanout'] < 1:
+            raise CommandError('--nodes must be at least 2 and --fanout at least 1')
+
+        with transaction.atomic():
+            leaf = self.build_tree(options['nodes'], options['fanout'])
+            self.stdout.write(f"Built a {options['nodes']}-node tree (fanout {options['fanout']})")
+
+            self.measure('save new leaf', lambda: SchemaVersions.objects.create(
+                prompt='benchmark leaf', assistant_id='benchmark', parent=leaf
+            ))
+            self.measure('update_version_tree on leaf', leaf.update_version_tree)
+
+            if not options['skip_legacy']:
+                self.measure('legacy count + tree on leaf', lambda: (
+                    legacy_versions_count(leaf), legacy_version_tree(leaf)
+                ))
+
+            transaction.set_rollback(True)
+
+    def build_tree(self, total, fanout):
+        """Create the tree level by level with bulk_create. Returns the last leaf created."""
+        root = SchemaVersions.objects.create(prompt='benchmark root', assistant_id='benchmark')
+        level = [root]
+        created = 1
+        last = root
+        while created < total:
+            batch = []
+            for parent in level:
+                for _ in range(fanout):
+                    if created + len(batch) >= total:
+                        break
+                    batch.append(SchemaVersions(
+                        prompt=f'benchmark node {created + len(batch)}',
+                        assistant_id='benchmark',
+                        parent=parent,
+                        root=root,
+                    ))
+            level = SchemaVersions.objects.bulk_create(batch)
+            created += len(level)
+            last = level[-1]
+        return SchemaVersions.objects.get(pk=last.pk)
+
+    def measure(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f"{label}: {elapsed:.1f} ms, {len(queries)} queries"))
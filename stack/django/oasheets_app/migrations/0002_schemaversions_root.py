@@ -0,0 +1,43 @@
+# Generated by Django 5.1.10 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_root(apps, schema_editor):
+    SchemaVersions = apps.get_model('oasheets_app', 'SchemaVersions')
+    parents = dict(SchemaVersions.objects.values_list('id', 'parent_id'))
+
+    roots = {}
+    for node_id in parents:
+        path = []
+        current = node_id
+        while current is not None and current not in roots and current not in path:
+            path.append(current)
+            current = parents.get(current)
+        top = roots.get(current, current) if current is not None else path[-1]
+        for path_id in path:
+            roots[path_id] = top
+
+    by_root = {}
+    for node_id, root_id in roots.items():
+        if node_id != root_id:
+            by_root.setdefault(root_id, []).append(node_id)
+    for root_id, node_ids in by_root.items():
+        SchemaVersions.objects.filter(id__in=node_ids).update(root_id=root_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oasheets_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schemaversions',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='oasheets_app.schemaversions'),
+        ),
+        migrations.RunPython(backfill_root, migrations.RunPython.noop),
+    ]
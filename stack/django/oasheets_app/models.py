@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Left
 from django.utils.timezone import now
 
 from .utils import sanitize_json
@@ -64,6 +65,15 @@ class SchemaVersions(models.Model):
         blank=True,
         related_name='versions'
     )
+    # top of the tree, NULL on the original idea itself; lets the whole tree load in one query
+    root = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False
+    )
     version_notes = models.TextField(blank=True, null=True)
 
     class Meta:
@@ -75,41 +85,150 @@ class SchemaVersions(models.Model):
         prompt_preview = self.prompt[:40] + "..." if len(self.prompt) > 40 else self.prompt
         return f"# [{self.id}]: {prompt_preview}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored position so save() can tell when a version moves
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        instance._loaded_root_id = instance.__dict__.get('root_id')
+        return instance
+
     def save(self, *args, **kwargs):
         if self.schema:
             self.schema = sanitize_json(self.schema)
 
-        # Compute versions count and version tree
-        self.versions_count = self.compute_versions_count()
-        self.version_tree = self.compute_version_tree()
+        loaded_parent_id = getattr(self, '_loaded_parent_id', None)
+        moved = self.pk is not None and hasattr(self, '_loaded_parent_id') and loaded_parent_id != self.parent_id
+        old_root_id = getattr(self, '_loaded_root_id', None) or self.pk
 
+        self.root_id = self.compute_root_id()
         super().save(*args, **kwargs)
 
-    def compute_versions_count(self):
-        """Recursively count all descendant versions of this schema"""
-        if not self.pk:  # Ensure the instance has been saved
-            return 0
-
-        def count_children(schema):
-            children = SchemaVersions.objects.filter(parent=schema)
-            return children.count() + sum(count_children(child) for child in children)
-
-        return count_children(self)
-
-    def compute_version_tree(self):
-        if not self.pk:  # Ensure the instance has been saved
+        if moved:
+            self.move_descendants(old_root_id)
+        self._loaded_parent_id = self.parent_id
+        self._loaded_root_id = self.root_id
+
+        # Refresh this version and its ancestors from one fetch of the tree
+        self.update_version_tree()
+        if moved and loaded_parent_id:
+            old_parent = SchemaVersions.objects.filter(pk=loaded_parent_id).first()
+            if old_parent:
+                old_parent.update_version_tree()
+
+    def delete(self, *args, **kwargs):
+        nodes, children = self.fetch_tree(self.root_id or self.pk)
+        child_ids = children.get(self.pk, [])
+        parent = self.parent if self.parent_id else None
+        result = super().delete(*args, **kwargs)
+
+        # Children become the roots of their own trees (parent is SET_NULL)
+        for child_id in child_ids:
+            SchemaVersions.objects.filter(pk=child_id).update(root=None)
+            SchemaVersions.objects.filter(pk__in=self.collect_descendants(child_id, children)).update(root_id=child_id)
+            child = SchemaVersions.objects.filter(pk=child_id).first()
+            if child:
+                child.update_version_tree()
+        if parent:
+            parent.update_version_tree()
+        return result
+
+    def compute_root_id(self):
+        """Root of the tree this version belongs to, or None if it is a root itself."""
+        if not self.parent_id:
             return None
-
-        root = self
-        while root.parent:
-            root = root.parent
-
-        def build_tree(schema):
-            children = SchemaVersions.objects.filter(parent=schema)
-            return {
-                "id": schema.id,
-                "name": schema.prompt if len(schema.prompt) > 80 else schema.prompt[: 80 - 3] + "...",
-                "children": [build_tree(child) for child in children]
+        parent = self.parent
+        return parent.root_id or parent.id
+
+    @classmethod
+    def fetch_tree(cls, root_id):
+        """
+        Load the whole tree under root_id with a single query.
+
+        Returns:
+            (nodes, children): nodes maps id to (parent_id, name); children maps
+            id to child ids, newest first like the default ordering
+        """
+        rows = (
+            cls.objects.filter(models.Q(pk=root_id) | models.Q(root_id=root_id))
+            .order_by('-created_at')
+            .values_list('id', 'parent_id', Left('prompt', 81))
+        )
+        nodes = {}
+        children = {}
+        for node_id, parent_id, prompt in rows:
+            nodes[node_id] = (parent_id, prompt if len(prompt) <= 80 else prompt[: 80 - 3] + "...")
+            children.setdefault(parent_id, []).append(node_id)
+        return nodes, children
+
+    @staticmethod
+    def build_version_tree(root_id, nodes, children):
+        """
+        Build the nested {id, name, children} tree and count every node's
+        descendants without recursion.
+
+        Returns:
+            (tree, counts): counts maps id to number of descendants
+        """
+        trees = {}
+        counts = {}
+        order = [root_id] + SchemaVersions.collect_descendants(root_id, children)
+
+        # Children are finished before their parents when walking the pre-order backwards
+        for node_id in reversed(order):
+            child_ids = [child_id for child_id in children.get(node_id, []) if child_id in trees]
+            trees[node_id] = {
+                "id": node_id,
+                "name": nodes[node_id][1],
+                "children": [trees[child_id] for child_id in child_ids],
             }
-
-        return build_tree(root)
+            counts[node_id] = len(child_ids) + sum(counts[child_id] for child_id in child_ids)
+        return trees[root_id], counts
+
+    def update_version_tree(self):
+        """
+        Recompute versions_count and version_tree for this version and all of
+        its ancestors with one SELECT and one bulk UPDATE.
+        """
+        root_id = self.root_id or self.pk
+        nodes, children = self.fetch_tree(root_id)
+        if self.pk not in nodes:
+            return
+
+        tree, counts = self.build_version_tree(root_id, nodes, children)
+
+        path = []
+        node_id = self.pk
+        while node_id is not None and node_id in nodes and node_id not in path:
+            path.append(node_id)
+            node_id = nodes[node_id][0]
+
+        self.versions_count = counts.get(self.pk, 0)
+        self.version_tree = tree
+        ancestors = [self] + [
+            SchemaVersions(pk=node_id, versions_count=counts.get(node_id, 0), version_tree=tree)
+            for node_id in path[1:]
+        ]
+        SchemaVersions.objects.bulk_update(ancestors, ['versions_count', 'version_tree'])
+
+    @staticmethod
+    def collect_descendants(node_id, children):
+        """All descendant ids of node_id in pre-order, from a fetch_tree() children map."""
+        descendant_ids = []
+        seen = {node_id}
+        stack = list(reversed(children.get(node_id, [])))
+        while stack:
+            child_id = stack.pop()
+            if child_id in seen:
+                continue
+            seen.add(child_id)
+            descendant_ids.append(child_id)
+            stack.extend(reversed(children.get(child_id, [])))
+        return descendant_ids
+
+    def move_descendants(self, old_root_id):
+        """Point the descendants of a moved version at its new root."""
+        nodes, children = self.fetch_tree(old_root_id)
+        descendant_ids = self.collect_descendants(self.pk, children)
+        if descendant_ids:
+            SchemaVersions.objects.filter(pk__in=descendant_ids).update(root_id=self.root_id or self.pk)
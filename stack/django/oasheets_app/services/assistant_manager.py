@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+import time
 from typing import Any, Optional, List, Union
 
 import openai
@@ -12,6 +13,11 @@ logger = logging.getLogger(__name__)
 
 from .schema_validator import SchemaValidator
 
+# Run polling backs off exponentially from the initial delay up to the max
+RUN_POLL_INITIAL_SECONDS = 0.2
+RUN_POLL_MAX_SECONDS = 2.0
+RUN_POLL_TIMEOUT_SECONDS = 300
+
 
 class FieldSchema(BaseModel):
     label: str
@@ -164,7 +170,11 @@ class OpenAIPromptManager:
 
     def __init__(self):
         self.version = None
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=5, timeout=300)
+        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL,
+                                    max_retries=5, timeout=300)
+        # OPENAI_BASE_URL can point both clients at a local fake Assistants server
+        self.aclient = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL,
+                                          max_retries=5, timeout=300)
         self.ids = {"thread_id": None, "message_id": None, "run_id": None, "assistant_id": None}
 
     # required
@@ -241,118 +251,154 @@ class OpenAIPromptManager:
                     # metadata={"user_id": "abc123", "source": "schema_tool_ui"}
             ) as stream:
                 for event in stream:
-                    if hasattr(event, 'event'):
-                        logger.info(event)
-                        allEventTypes[event.event] = 1
-                        if event.event == "thread.message.delta":
-                            message_text = self.extract_message_text(event)
-                            yield {"type": "message", "event": event.event, "content": message_text}
-
-                        elif event.event == "thread.message.completed":
-                            message_text = event.data.content[0].text.value
-                            schema_json = self.extract_json(message_text)
-                            if schema_json is not None:
-                                message_text = message_text.replace(schema_json[1], "")  # strip it from response now that we have it parsed out
-                                validator = SchemaValidator()
-                                validation_result = validator.validate_schema(schema_json[0])
-                                yield {
-                                    "type": "corrected_schema",
-                                    "event": "validate_schema",
-                                    "errors": validation_result["errors"],
-                                    "schema": validation_result['corrected_schema']
-                                }
-                            self.ids["run_id"] = event.data.run_id
-                            if self.ids["thread_id"] != event.data.thread_id and event.data.thread_id:
-                                logger.info(f"Thread ID changed to {event.data.thread_id}")
-                                self.ids["thread_id"] = event.data.thread_id
-
-                            yield {"type": "reasoning", "event": event.event, "content": message_text,
-                                   "run_id": event.data.run_id, "thread_id": event.data.thread_id}
-
-                        elif event.event == "error":
-                            message_text = self.extract_message_text(event)
-                            yield {"type": "error", "event": event.event, "content": message_text}
-
-                        elif event.event == "thread.run.requires_action":
-                            if hasattr(event.data,
-                                       "required_action") and event.data.required_action.type == "submit_tool_outputs":
-                                tool_calls = event.data.required_action.submit_tool_outputs.tool_calls
-
-                                # Process each tool call (in this case, validate_schema)
-                                for tool_call in tool_calls:
-                                    if tool_call.function.name == "validate_schema":
-                                        # Extract the schema to validate
-                                        try:
-                                            # optional do another internal validation and correct it
-                                            schema_to_validate = json.loads(tool_call.function.arguments)
-                                            validator = SchemaValidator()
-                                            validation_result = validator.validate_schema(schema_to_validate)
-
-                                            # Yield the validation result
-                                            yield {
-                                                "type": "corrected_schema",
-                                                "event": "validate_schema",
-                                                "errors": validation_result["errors"],
-                                                "schema": validation_result['corrected_schema']
-                                            }
-
-                                            # why bother at this point?
-                                            self.client.beta.threads.runs.submit_tool_outputs(
-                                                thread_id=self.ids["thread_id"],
-                                                run_id=event.data.id,
-                                                tool_outputs=[
-                                                    {
-                                                        "tool_call_id": tool_call.id,
-                                                        "output": json.dumps(validation_result['corrected_schema'])
-                                                    }
-                                                ]
-                                            )
-
-                                        except Exception as e:
-                                            yield {
-                                                "type": "error",
-                                                "event": "validate_schema_error",
-                                                "content": f"Error validating schema: {str(e)}"
-                                            }
-
-                        elif event.event == "tool_calls.function.arguments.delta":
-                            function_args = getattr(event.data, "arguments", {})
-                            yield {"type": "partial_function_call", "event": event.event, "content": function_args}
-
-                        elif event.event == "tool_calls.function.arguments.done":
-                            final_args = getattr(event.data, "arguments", {})
-                            yield {"type": "final_function_call", "event": event.event, "content": final_args}
-                        elif event.event == "thread.run.created":
-                            pass
-                        elif event.event == "thread.run.queued":
-                            pass
-                        elif event.event == "thread.run.in_progress":
-                            pass
-                        elif event.event == "thread.run.completed":
-                            pass
-                        elif event.event == "thread.run.failed":
-                            yield {"type": "error", "event": event.event, "content": event.data.last_error.message}
-                            logger.error(f"Thread run failed: {event.data.last_error.message}")
-                        elif event.event == "thread.run.requires_action":
-                            pass
-                        elif event.event == "thread.run.cancelled":
-                            pass
-                        elif event.event == "thread.run.cancelled":
-                            logger.info(f"Unknown event: {event.event}")
-                            pass
-                    else:
-                        logger.info(f"No event on stream object: {event}")
-                        
+                    tool_outputs = []
+                    yield from self.process_stream_event(event, tool_outputs, allEventTypes)
+                    # why bother at this point?
+                    for run_id, tool_output in tool_outputs:
+                        self.client.beta.threads.runs.submit_tool_outputs(
+                            thread_id=self.ids["thread_id"],
+                            run_id=run_id,
+                            tool_outputs=[tool_output]
+                        )
+
+                logger.info(allEventTypes)
+
+        except OpenAIError as e:
+            yield {"error": f"OpenAI Assistant Error: {str(e)}", "type": "error"}
+
+    async def astream(self, prompt):
+        """
+        Async version of stream() on the AsyncOpenAI client. Thread lookup and
+        message creation overlap when the thread already exists, and the run is
+        cancelled on OpenAI if the client disconnects mid-stream.
+        """
+        if self.ids['assistant_id'] is None:
+            self.create_assistant()
+
+        await self.aprepare_thread(prompt)
+
+        allEventTypes = {}  # debugging
+
+        try:
+            async with self.aclient.beta.threads.runs.stream(
+                    thread_id=self.ids["thread_id"],
+                    assistant_id=self.ids['assistant_id'],
+                    tools=[
+                        openai.pydantic_function_tool(ValidateSchema, name="validate_schema"),
+                    ],
+            ) as stream:
+                async for event in stream:
+                    if getattr(event, 'event', None) == "thread.run.created":
+                        self.ids["run_id"] = event.data.id
+
+                    tool_outputs = []
+                    for payload in self.process_stream_event(event, tool_outputs, allEventTypes):
+                        yield payload
+                    for run_id, tool_output in tool_outputs:
+                        await self.aclient.beta.threads.runs.submit_tool_outputs(
+                            thread_id=self.ids["thread_id"],
+                            run_id=run_id,
+                            tool_outputs=[tool_output]
+                        )
+
                 logger.info(allEventTypes)
 
         except OpenAIError as e:
             yield {"error": f"OpenAI Assistant Error: {str(e)}", "type": "error"}
 
+        except (asyncio.CancelledError, GeneratorExit):
+            await self.acancel_run()
+            raise
+
+    def process_stream_event(self, event, tool_outputs, allEventTypes):
+        """
+        Turn one Assistants stream event into payloads for the client. Tool
+        outputs to submit are appended to `tool_outputs` as (run_id, output)
+        so the sync and async streams can submit them with their own client.
+        """
+        if not hasattr(event, 'event'):
+            logger.info(f"No event on stream object: {event}")
+            return
+
+        logger.info(event)
+        allEventTypes[event.event] = 1
+        if event.event == "thread.message.delta":
+            message_text = self.extract_message_text(event)
+            yield {"type": "message", "event": event.event, "content": message_text}
+
+        elif event.event == "thread.message.completed":
+            message_text = event.data.content[0].text.value
+            schema_json = self.extract_json(message_text)
+            if schema_json is not None:
+                message_text = message_text.replace(schema_json[1], "")  # strip it from response now that we have it parsed out
+                validator = SchemaValidator()
+                validation_result = validator.validate_schema(schema_json[0])
+                yield {
+                    "type": "corrected_schema",
+                    "event": "validate_schema",
+                    "errors": validation_result["errors"],
+                    "schema": validation_result['corrected_schema']
+                }
+            self.ids["run_id"] = event.data.run_id
+            if self.ids["thread_id"] != event.data.thread_id and event.data.thread_id:
+                logger.info(f"Thread ID changed to {event.data.thread_id}")
+                self.ids["thread_id"] = event.data.thread_id
+
+            yield {"type": "reasoning", "event": event.event, "content": message_text,
+                   "run_id": event.data.run_id, "thread_id": event.data.thread_id}
+
+        elif event.event == "error":
+            message_text = self.extract_message_text(event)
+            yield {"type": "error", "event": event.event, "content": message_text}
+
+        elif event.event == "thread.run.requires_action":
+            if hasattr(event.data,
+                       "required_action") and event.data.required_action.type == "submit_tool_outputs":
+                tool_calls = event.data.required_action.submit_tool_outputs.tool_calls
+
+                # Process each tool call (in this case, validate_schema)
+                for tool_call in tool_calls:
+                    if tool_call.function.name == "validate_schema":
+                        # Extract the schema to validate
+                        try:
+                            # optional do another internal validation and correct it
+                            schema_to_validate = json.loads(tool_call.function.arguments)
+                            validator = SchemaValidator()
+                            validation_result = validator.validate_schema(schema_to_validate)
+
+                            # Yield the validation result
+                            yield {
+                                "type": "corrected_schema",
+                                "event": "validate_schema",
+                                "errors": validation_result["errors"],
+                                "schema": validation_result['corrected_schema']
+                            }
+
+                            tool_outputs.append((event.data.id, {
+                                "tool_call_id": tool_call.id,
+                                "output": json.dumps(validation_result['corrected_schema'])
+                            }))
+
+                        except Exception as e:
+                            yield {
+                                "type": "error",
+                                "event": "validate_schema_error",
+                                "content": f"Error validating schema: {str(e)}"
+                            }
+
+        elif event.event == "tool_calls.function.arguments.delta":
+            function_args = getattr(event.data, "arguments", {})
+            yield {"type": "partial_function_call", "event": event.event, "content": function_args}
+
+        elif event.event == "tool_calls.function.arguments.done":
+            final_args = getattr(event.data, "arguments", {})
+            yield {"type": "final_function_call", "event": event.event, "content": final_args}
+        elif event.event == "thread.run.failed":
+            yield {"type": "error", "event": event.event, "content": event.data.last_error.message}
+            logger.error(f"Thread run failed: {event.data.last_error.message}")
+
     # used as fallback when schema is not found in stream
     def request(self, prompt):
-        if self.ids is None:
-            self.get_assistant_config()
-
         try:
             run = self.get_or_create_run(prompt)
 
@@ -364,25 +410,49 @@ class OpenAIPromptManager:
             messages = self.client.beta.threads.messages.list(
                 thread_id=self.ids["thread_id"]
             )
+            return self.parse_run_messages(messages)
 
-            # Find the JSON schema in the response
-            content = None
-            schema_json = None
-            for message in messages.data:
-                if message.role == "assistant":
-                    content = message.content[0].text.value
-                    schema_json = self.extract_json(content)
-                    if schema_json is not None:
-                        content = content.replace(schema_json[1], "")
-                        schema_json = schema_json[0]
-                        break
+        except OpenAIError as e:
+            logger.info(f"OpenAI Assistant Error: {e}")
+            return str(e), None
 
-            return content, schema_json
+    async def arequest(self, prompt):
+        """
+        Async version of request(). Cancelling the awaiting task (e.g. when the
+        client disconnects) also cancels the run on OpenAI.
+        """
+        try:
+            run = await self.aget_or_create_run(prompt)
+
+            if run.status != "completed":
+                err = f"Assistant run failed with status: {run.status}"
+                logger.info(err)
+                return err, None
+
+            messages = await self.aclient.beta.threads.messages.list(
+                thread_id=self.ids["thread_id"]
+            )
+            return self.parse_run_messages(messages)
 
         except OpenAIError as e:
             logger.info(f"OpenAI Assistant Error: {e}")
             return str(e), None
 
+    def parse_run_messages(self, messages):
+        """Find the newest assistant message that contains the JSON schema."""
+        content = None
+        schema_json = None
+        for message in messages.data:
+            if message.role == "assistant":
+                content = message.content[0].text.value
+                schema_json = self.extract_json(content)
+                if schema_json is not None:
+                    content = content.replace(schema_json[1], "")
+                    schema_json = schema_json[0]
+                    break
+
+        return content, schema_json
+
     def get_or_create_run(self, prompt):
 
         # Ensure a thread exists
@@ -409,12 +479,60 @@ class OpenAIPromptManager:
         # Wait for the run to complete
         return self._wait_for_run_completion(run)
 
-    async def _wait_for_run_completion(self, run):
+    async def aget_or_create_run(self, prompt):
+        await self.aprepare_thread(prompt)
+
+        run = await self.aclient.beta.threads.runs.create(
+            thread_id=self.ids["thread_id"],
+            assistant_id=self.ids['assistant_id'],
+        )
+        self.ids["run_id"] = run.id
+
+        try:
+            return await self._await_run_completion(run)
+        except asyncio.CancelledError:
+            await self.acancel_run()
+            raise
+
+    async def aprepare_thread(self, prompt):
+        """
+        Make sure a thread exists and post the user message to it.
+
+        A new thread is created together with its first message in one call.
+        For a known thread, the existence check and the message post run
+        concurrently; if the thread turns out to be gone, a new one is created.
+        """
+        if self.ids["thread_id"] is not None:
+            thread_id = self.ids["thread_id"]
+            retrieved, message = await asyncio.gather(
+                self.aclient.beta.threads.retrieve(thread_id),
+                self.aclient.beta.threads.messages.create(thread_id=thread_id, role="user", content=prompt),
+                return_exceptions=True
+            )
+            if not isinstance(retrieved, BaseException) and not isinstance(message, BaseException):
+                self.ids["message_id"] = message.id
+                return
+            logger.info(f"thread_id is missing {thread_id}")
+
+        thread = await self.aclient.beta.threads.create(
+            messages=[{"role": "user", "content": prompt}]
+        )
+        self.ids["thread_id"] = thread.id
+        messages = await self.aclient.beta.threads.messages.list(thread_id=thread.id, limit=1)
+        self.ids["message_id"] = messages.data[0].id if messages.data else None
+
+    def _wait_for_run_completion(self, run):
         """
         Waits for the run to complete and handles status updates recursively.
+        Polls with exponential backoff.
         """
+        delay = RUN_POLL_INITIAL_SECONDS
+        deadline = time.monotonic() + RUN_POLL_TIMEOUT_SECONDS
         while run.status in ["queued", "in_progress"]:
-            await asyncio.sleep(0.2)
+            if time.monotonic() > deadline:
+                raise ValueError(f"Run timed out with status: {run.status}")
+            time.sleep(delay)
+            delay = min(delay * 2, RUN_POLL_MAX_SECONDS)
             run = self.client.beta.threads.runs.retrieve(
                 thread_id=self.ids["thread_id"],
                 run_id=self.ids["run_id"]
@@ -428,27 +546,81 @@ class OpenAIPromptManager:
 
         return run
 
+    async def _await_run_completion(self, run):
+        """
+        Async version of _wait_for_run_completion(): sleeps between polls
+        without holding a thread.
+        """
+        delay = RUN_POLL_INITIAL_SECONDS
+        deadline = time.monotonic() + RUN_POLL_TIMEOUT_SECONDS
+        while run.status in ["queued", "in_progress"]:
+            if time.monotonic() > deadline:
+                raise ValueError(f"Run timed out with status: {run.status}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RUN_POLL_MAX_SECONDS)
+            run = await self.aclient.beta.threads.runs.retrieve(
+                thread_id=self.ids["thread_id"],
+                run_id=self.ids["run_id"]
+            )
+
+        if run.status == "requires_action" and run.required_action.type == 'submit_tool_outputs':
+            tool, output = self.validate_required_action(run)
+            run = await self.aclient.beta.threads.runs.submit_tool_outputs(
+                thread_id=self.ids["thread_id"],
+                run_id=self.ids["run_id"],
+                tool_outputs=[{"tool_call_id": tool.id, "output": output}]
+            )
+            return await self._await_run_completion(run)
+
+        if run.status != "completed":
+            raise ValueError(f"Run failed with status: {run.status}")
+
+        return run
+
+    async def acancel_run(self):
+        """Best-effort cancel of the current run, e.g. after the client went away."""
+        if not self.ids["run_id"] or not self.ids["thread_id"]:
+            return
+        try:
+            await asyncio.shield(self.aclient.beta.threads.runs.cancel(
+                thread_id=self.ids["thread_id"],
+                run_id=self.ids["run_id"]
+            ))
+            logger.info(f"Cancelled run {self.ids['run_id']}")
+        except (OpenAIError, asyncio.CancelledError) as e:
+            logger.info(f"Could not cancel run {self.ids['run_id']}: {e}")
+
     def _handle_required_action(self, run):
         """
         Handles cases where a run requires additional action.
         """
+        tool, output = self.validate_required_action(run)
+        run = self.client.beta.threads.runs.submit_tool_outputs(
+            thread_id=self.ids["thread_id"],
+            run_id=self.ids["run_id"],
+            tool_outputs=[
+                {
+                    "tool_call_id": tool.id,
+                    "output": output
+                }
+            ]
+        )
+        return self._wait_for_run_completion(run)
+
+    def validate_required_action(self, run):
+        """
+        Validate the schema passed to validate_schema.
+
+        Returns:
+            (tool_call, output) to submit back to the run
+        """
         validator = SchemaValidator()
         tool = run.required_action.submit_tool_outputs.tool_calls[0]
         schema_to_validate = tool.function.arguments
         validation_result = validator.validate_schema(schema_to_validate)
 
         if validation_result['corrected_schema'] and len(validation_result['corrected_schema']) > 0:
-            run = self.client.beta.threads.runs.submit_tool_outputs(
-                thread_id=self.ids["thread_id"],
-                run_id=self.ids["run_id"],
-                tool_outputs=[
-                    {
-                        "tool_call_id": tool.id,
-                        "output": json.dumps(validation_result["corrected_schema"])
-                    }
-                ]
-            )
-            return self._wait_for_run_completion(run)
+            return tool, json.dumps(validation_result["corrected_schema"])
 
         raise ValueError(f"Schema validation failed: {validation_result['errors']}")
 
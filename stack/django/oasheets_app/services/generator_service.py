@@ -1,11 +1,18 @@
+import asyncio
 import json
-import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
 
 from ..models import SchemaVersions
 from ..serializers import SchemaVersionSerializer
 from ..services.assistant_manager import OpenAIPromptManager, build_assistant_config
 
+KEEPALIVE_SECONDS = 10
+
+FALLBACK_PROMPT = "Please generate the validated schema based on your recommendations"
+
 
 class SchemaGenerator:
     def __init__(self, prompt_data, user, last_version=None):
@@ -48,6 +55,8 @@ class SchemaGenerator:
             if last_version.run_id:
                 self.assistant_manager.set_run_id(last_version.run_id)
 
+        self.doSave = False
+
     # http request (non-streaming) to openai, deprecated
     def request_schema(self, prompt):
         try:
@@ -78,7 +87,7 @@ class SchemaGenerator:
         except Exception as e:
             if self.doSave:
                 self.version.save()
-            yield json.dumps({"error": f"Stream failed: {str(e)}"}) + "||JSON_END||"
+            yield encode_chunk({"error": f"Stream failed: {str(e)}"})
 
     def handle_stream(self, response_stream):
 
@@ -86,57 +95,103 @@ class SchemaGenerator:
         last_keepalive = time.time()  # Track last keep-alive time
 
         for response in response_stream:
-            if time.time() - last_keepalive >= 10:
-                yield json.dumps({"type": "keep_alive"}) + "||JSON_END||"
+            if time.time() - last_keepalive >= KEEPALIVE_SECONDS:
+                yield encode_chunk({"type": "keep_alive"})
                 last_keepalive = time.time()
 
-            if "run_id" in response:
-                self.version.run_id = response['run_id']
-                self.doSave = True
-            if "thread_id" in response:
-                self.version.thread_id = response['thread_id']
-                self.doSave = True
-            if "schema" in response:
-                self.version.schema = response['schema']
-                self.doSave = True
+            yield encode_chunk(self.apply_response(response))
 
-            if response["type"] == "reasoning":
-                self.version.reasoning = response['content']
-                self.doSave = True
-                yield json.dumps(response) + "||JSON_END||"
-            else:
-                yield json.dumps(response) + "||JSON_END||"
+        # fallback if we never get the schema or even a response
+        if self.version.schema is None:
+            print('No schema returned. Prompting in new http request.')
+
+            # Run the fallback in a thread and keep the connection alive until it returns
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(self.fallback_request)
+                while True:
+                    try:
+                        payload = future.result(timeout=KEEPALIVE_SECONDS)
+                        break
+                    except FutureTimeoutError:
+                        yield encode_chunk({"type": "keep_alive"})
+            if payload:
+                yield encode_chunk(payload)
+
+        self.finish()
+        yield encode_chunk({"type": "done", "version_id": self.version.id})
+
+    # asyncio streaming for ASGI: OpenAI calls go through the async client and keep-alives run on a timer
+    async def astart_stream(self, prompt):
+        self.doSave = False
+        self.version.prompt = prompt
+        try:
+            async for payload in with_keepalive(self.ahandle_stream(prompt), KEEPALIVE_SECONDS):
+                yield encode_chunk(payload)
+
+        except Exception as e:
+            if self.doSave:
+                await sync_to_async(self.version.save)()
+            yield encode_chunk({"error": f"Stream failed: {str(e)}"})
+
+    async def ahandle_stream(self, prompt):
+        async for response in self.assistant_manager.astream(prompt):
+            yield self.apply_response(response)
 
         # fallback if we never get the schema or even a response
         if self.version.schema is None:
             print('No schema returned. Prompting in new http request.')
+            try:
+                reasoning, schema = await self.assistant_manager.arequest(FALLBACK_PROMPT)
+                payload = self.apply_fallback(reasoning, schema)
+            except Exception as e:
+                payload = {"error": f"Fallback request failed: {str(e)}"}
+            if payload:
+                yield payload
+
+        await sync_to_async(self.finish)()
+        yield {"type": "done", "version_id": self.version.id}
+
+    def apply_response(self, response):
+        """Copy OpenAI ids, schema and reasoning from a stream payload onto the version."""
+        if "run_id" in response:
+            self.version.run_id = response['run_id']
+            self.doSave = True
+        if "thread_id" in response:
+            self.version.thread_id = response['thread_id']
+            self.doSave = True
+        if "schema" in response:
+            self.version.schema = response['schema']
+            self.doSave = True
+        if response.get("type") == "reasoning":
+            self.version.reasoning = response['content']
+            self.doSave = True
+        return response
+
+    def fallback_request(self):
+        """
+        Ask for the schema in a separate (non-streaming) run.
+
+        Returns:
+            Payload to send to the client, or None if no schema came back
+        """
+        try:
+            reasoning, schema = self.assistant_manager.request(FALLBACK_PROMPT)
+            return self.apply_fallback(reasoning, schema)
+        except Exception as e:
+            return {"error": f"Fallback request failed: {str(e)}"}
+
+    def apply_fallback(self, reasoning, schema):
+        if self.version.reasoning is None and reasoning is not None:
+            self.version.reasoning = reasoning
+            self.doSave = True
+        if schema is not None:
+            self.version.schema = schema
+            self.doSave = True
+            return {"type": "requested_schema", "schema": schema}
+        return None
 
-            def fallback_request():
-                nonlocal last_keepalive
-                try:
-                    reasoning, schema = self.assistant_manager.request(
-                        "Please generate the validated schema based on your recommendations"
-                    )
-                    if self.version.reasoning is None and reasoning is not None:
-                        self.version.reasoning = reasoning
-                        self.doSave = True
-                    if schema is not None:
-                        self.version.schema = schema
-                        yield json.dumps({"type": "requested_schema", "schema": schema}) + "||JSON_END||"
-                        self.doSave = True
-                except Exception as e:
-                    yield json.dumps({"error": f"Fallback request failed: {str(e)}"}) + "||JSON_END||"
-
-            # Start fallback request in a separate thread
-            fallback_thread = threading.Thread(target=fallback_request)
-            fallback_thread.start()
-
-            # Keep connection alive while fallback request is being processed
-            while fallback_thread.is_alive():
-                yield json.dumps({"type": "keep_alive"}) + "||JSON_END||"
-                time.sleep(5)  # Adjust as needed
-
-        if self.version.schema is not None:
+    def finish(self):
+        if self.version.schema is not None and self.version.reasoning:
             # cleanup potential json inside reasoning body:
             schema_json = self.assistant_manager.extract_json(self.version.reasoning)
             if schema_json:
@@ -147,4 +202,33 @@ class SchemaGenerator:
             self.doSave = False
             self.version.save()
 
-        yield json.dumps({"type": "done", "version_id": self.version.id}) + "||JSON_END||"
+
+def encode_chunk(payload):
+    return json.dumps(payload) + "||JSON_END||"
+
+
+async def with_keepalive(source, interval):
+    """
+    Re-yield items from an async iterator, inserting a keep_alive payload
+    whenever nothing arrives for `interval` seconds.
+    """
+    iterator = source.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield {"type": "keep_alive"}
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                return
+            pending = None
+            yield item
+    finally:
+        if pending is not None:
+            pending.cancel()
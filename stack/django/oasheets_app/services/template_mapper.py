@@ -1,5 +1,6 @@
 from typing import Optional, Dict, Any
 from strongmsp_app.models import PromptTemplates
+from strongmsp_app.services.prompt_registry import get_prompt_registry
 
 
 class TemplateMapper:
@@ -57,17 +58,8 @@ class TemplateMapper:
         if purpose not in cls.PURPOSE_MAPPING:
             return None
             
-        # Get active templates for this purpose
-        templates = PromptTemplates.objects.filter(
-            purpose=purpose,
-            status='active'
-        ).order_by('-created_at')
-        
-        if not templates.exists():
-            return None
-            
-        # Return the most recent active template
-        return templates.first()
+        # The most recent active template, from the in-memory template registry
+        return get_prompt_registry().get(purpose)
     
     @classmethod
     def get_all_available_purposes(cls) -> Dict[str, Dict[str, Any]]:
@@ -188,8 +180,9 @@ class TemplateMapper:
             'missing_purposes': []
         }
         
+        active = get_prompt_registry().by_purpose()
         for purpose in cls.PURPOSE_MAPPING.keys():
-            if PromptTemplates.objects.filter(purpose=purpose, status='active').exists():
+            if purpose in active:
                 stats['purposes_covered'].append(purpose)
             else:
                 stats['missing_purposes'].append(purpose)
@@ -1,8 +1,6 @@
-import csv
-
+from django.core.handlers.asgi import ASGIRequest
 from django.db import models
 from django.db.models import Q
-from django.http import HttpResponse
 from django.http import JsonResponse
 from django.http import StreamingHttpResponse
 from rest_framework import status
@@ -20,6 +18,7 @@ from .serializers import (
 from strongmsp_app.serializers import PromptTemplatesSerializer
 from .services.generator_service import SchemaGenerator
 from .services.prompt_tester import PromptTester
+from utils.exports import get_export_format, is_asgi_request, streaming_export
 
 # Import the custom pagination class
 from strongmsp_app.pagination import CustomLimitOffsetPagination
@@ -100,11 +99,7 @@ class SchemaVersionsViewSet(viewsets.ModelViewSet):
             version = None
 
         generator = SchemaGenerator(prompt_data, request.user, version)
-        response_generator = generator.start_stream(prompt_data['prompt'])
-        response = StreamingHttpResponse(response_generator, content_type="application/json")
-        response["Cache-Control"] = "no-cache"
-        response["X-Accel-Buffering"] = "no"  # Important for Nginx (disable buffering)
-        return response
+        return self.stream_generation(request, generator, prompt_data['prompt'])
 
     @action(detail=True, methods=['post'])
     def enhance(self, request, pk=None):
@@ -129,8 +124,17 @@ class SchemaVersionsViewSet(viewsets.ModelViewSet):
 
         prompt_data = serializer.validated_data
         generator = SchemaGenerator(prompt_data, request.user, version)
+        return self.stream_generation(request, generator, prompt_data['prompt'])
 
-        response_generator = generator.start_stream(prompt_data['prompt'])
+    def stream_generation(self, request, generator, prompt):
+        """
+        Under ASGI the generation streams from an async generator, so a slow
+        OpenAI run holds no server thread. WSGI keeps the synchronous generator.
+        """
+        if isinstance(request._request, ASGIRequest):
+            response_generator = generator.astart_stream(prompt)
+        else:
+            response_generator = generator.start_stream(prompt)
         response = StreamingHttpResponse(response_generator, content_type="application/json")
         response["Cache-Control"] = "no-cache"
         response["X-Accel-Buffering"] = "no"  # Important for Nginx (disable buffering)
@@ -146,6 +150,10 @@ class SchemaVersionsViewSet(viewsets.ModelViewSet):
         ]:
             return Response({"error": "You are not authorized to download this schema."}, status=403)
 
+        export_format = get_export_format(request)
+        if export_format is None:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
         # CSV headers
         headers = [
             "Types", "Field Label", "Field Name", "Field Type",
@@ -156,34 +164,28 @@ class SchemaVersionsViewSet(viewsets.ModelViewSet):
         schema_data = version.schema
         if schema_data is None:
             return Response({"error": "This version has no schema"}, status=204)
-        rows = []
-
-        for content_type in schema_data.get('content_types', []):
-            # Add the model name as a row with empty field columns
-            rows.append([content_type['name'], '', '', '', '', '', '', '', ''])
-
-            for field in content_type.get('fields', []):
-                rows.append([
-                    '',  # Keep Types column empty for fields
-                    field.get('label', '') or '',
-                    field.get('name', '') or '',  # Assuming 'name' maps to Field Name
-                    field.get('field_type', '') or '',
-                    field.get('cardinality', '') or '',
-                    '1' if field.get('required', False) else '0',
-                    field.get('relationship', '') or '',
-                    field.get('default', '') or '',
-                    field.get('example', '') or '',
-                ])
-
-        # Generate CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="object-fields-version-{version.id}_schema.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(headers)
-        writer.writerows(rows)
 
-        return response
+        def rows():
+            for content_type in schema_data.get('content_types', []):
+                # Add the model name as a row with empty field columns
+                yield [content_type['name'], '', '', '', '', '', '', '', '']
+
+                for field in content_type.get('fields', []):
+                    yield [
+                        '',  # Keep Types column empty for fields
+                        field.get('label', '') or '',
+                        field.get('name', '') or '',  # Assuming 'name' maps to Field Name
+                        field.get('field_type', '') or '',
+                        field.get('cardinality', '') or '',
+                        '1' if field.get('required', False) else '0',
+                        field.get('relationship', '') or '',
+                        field.get('default', '') or '',
+                        field.get('example', '') or '',
+                    ]
+
+        return streaming_export(
+            rows(), headers, export_format, f"object-fields-version-{version.id}_schema", asynchronous=is_asgi_request(request)
+        )
 
     @action(detail=True, methods=['delete'], url_path='delete-version')
     def delete_version(self, request, pk=None):
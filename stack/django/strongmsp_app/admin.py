@@ -123,7 +123,7 @@ class CoachFilter(SimpleListFilter):
 @admin.register(Users)
 class UsersAdmin(BaseUserAdmin):
     fieldsets = BaseUserAdmin.fieldsets + (
-        (_('Additional Info'), {'fields': ('real_name', 'bio', 'gender', 'ethnicity', 'birthdate', 'zip_code', 'display_age')}),
+        (_('Additional Info'), {'fields': ('real_name', 'bio', 'gender', 'ethnicity', 'birthdate', 'zip_code', 'phone_number', 'display_age')}),
         (_('Profile Images'), {'fields': ('avatar', 'photo', 'avatar_preview', 'photo_preview')}),
         (_('Assessment Category Scores'), {
             'fields': (
@@ -694,9 +694,19 @@ class AgentResponsesAdmin(BaseModelAdmin):
         return "No assessment"
     display_assessment.short_description = "Assessment"
 
+    def get_queryset(self, request):
+        # Segmented prompts are previewed from their first segment rather than reassembled per row
+        annotations = AgentResponses._meta.get_field('message_body').summary_annotations('message_body', 101)
+        return super().get_queryset(request).annotate(
+            message_body_preview=annotations['message_body_preview'],
+            message_body_segmented=annotations['message_body_segmented'],
+        )
+
     def display_message_preview(self, obj):
-        if obj.message_body:
-            return obj.message_body[:100] + "..." if len(obj.message_body) > 100 else obj.message_body
+        message = obj.message_body_preview if hasattr(obj, 'message_body_preview') else obj.message_body
+        if message:
+            more = len(message) > 100 or getattr(obj, 'message_body_segmented', False)
+            return message[:100] + "..." if more else message
         return "No message"
     display_message_preview.short_description = "Message Preview"
 
@@ -733,7 +743,8 @@ class AgentResponsesAdmin(BaseModelAdmin):
 
     list_display = ('id', 'display_athlete', 'display_author', 'display_purpose', 'display_template', 'display_assignment', 'display_message_preview', 'display_ai_response_preview', 'created_at', 'modified_at')
     list_filter = ('purpose', 'created_at', 'modified_at', 'prompt_template', 'assignment')
-    search_fields = ('message_body', 'ai_response', 'ai_reasoning', 'athlete__username', 'athlete__email', 'athlete__first_name', 'athlete__last_name', 'assignment__id')
+    # The text fields are stored compressed, which LIKE cannot search (see /api/search/content)
+    search_fields = ('athlete__username', 'athlete__email', 'athlete__first_name', 'athlete__last_name', 'assignment__id')
     readonly_fields = ('id', 'athlete', 'display_athlete', 'author', 'assessment', 'assignment', 'created_at', 'modified_at', 'token_usage_info')
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
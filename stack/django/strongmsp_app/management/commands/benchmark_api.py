@@ -0,0 +1,86 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.services.api_benchmark import (
+    DEFAULT_BENCHMARK_ITERATIONS, DEFAULT_BENCHMARK_PREFIX, DEFAULT_BENCHMARK_PROFILE, DEFAULT_BENCHMARK_WARMUP,
+    ApiBenchmark, BenchmarkError, compare_results
+)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark latency and query count of the API hot paths on a seeded synthetic dataset, "
+            "with OpenAI stubbed. Prints JSON so results can be diffed between commits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=DEFAULT_BENCHMARK_ITERATIONS, help=f'Timed calls per scenario (default: {DEFAULT_BENCHMARK_ITERATIONS})')
+        parser.add_argument('--warmup', type=int, default=DEFAULT_BENCHMARK_WARMUP, help=f'Untimed calls per scenario (default: {DEFAULT_BENCHMARK_WARMUP})')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic dataset (default: 0)')
+        parser.add_argument('--athletes', type=int, default=DEFAULT_BENCHMARK_PROFILE['ATHLETES'], help=f"Athletes in the dataset (default: {DEFAULT_BENCHMARK_PROFILE['ATHLETES']})")
+        parser.add_argument('--prefix', default=DEFAULT_BENCHMARK_PREFIX, help=f'Prefix of the benchmark dataset (default: {DEFAULT_BENCHMARK_PREFIX})')
+        parser.add_argument('--only', nargs='+', help='Only run scenarios starting with these names (e.g. coach_search context_current)')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--compare', help='Previous JSON results to compare against')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark dataset afterwards')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0 or options['athletes'] < 2:
+            raise CommandError('--iterations must be at least 1, --warmup at least 0 and --athletes at least 2')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], 'r', encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        # Progress goes to stderr so stdout stays valid JSON
+        benchmark = ApiBenchmark(
+            prefix=options['prefix'],
+            seed=options['seed'],
+            profile={'ATHLETES': options['athletes']},
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            keep=options['keep'],
+            only=options['only'],
+            log=lambda message: self.stderr.write(message),
+        )
+        try:
+            results = benchmark.run()
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+        else:
+            sys.stdout.write(output + '\n')
+
+        if baseline is not None:
+            self.write_comparison(baseline, results, options)
+
+        failed = {name: result['failures'] for name, result in results['endpoints'].items() if result['failures']}
+        if failed:
+            raise CommandError('Server errors (5xx) in ' + ', '.join(f'{name} ({count})' for name, count in sorted(failed.items())))
+
+    def write_comparison(self, baseline, results, options):
+        self.stderr.write(
+            f"\nCompared with {baseline.get('meta', {}).get('revision') or options['compare']}:\n"
+            f"{'scenario':32} {'p50 ms':>20} {'queries':>16}"
+        )
+        for name, before_ms, after_ms, before_queries, after_queries in compare_results(baseline, results):
+            self.stderr.write(
+                f"{name:32} {format_change(before_ms, after_ms):>20} {format_change(before_queries, after_queries):>16}"
+            )
+
+
+def format_change(before, after):
+    if before is None or after is None:
+        return f"{before if before is not None else '-'} -> {after if after is not None else '-'}"
+    if not before:
+        return f"{before} -> {after}"
+    return f"{before} -> {after} ({(after - before) / before:+.0%})"
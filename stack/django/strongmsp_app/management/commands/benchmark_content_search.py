@@ -0,0 +1,219 @@
+import json
+import random
+import statistics
+import sys
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from strongmsp_app.models import ContentSearchDocuments, PaymentAssignments, Users
+from strongmsp_app.services.api_benchmark import git_revision, percentile
+from strongmsp_app.services.content_search import AGENT_RESPONSE, COACH_CONTENT, accessible_documents, search_documents
+from strongmsp_app.services.synthetic_data import SyntheticDataGenerator, get_load_profile
+
+# The synthetic dataset supplies users, assignments and real documents; the rest are padding
+BENCHMARK_PROFILE = {
+    'ORGANIZATIONS': 1,
+    'ATHLETES': 400,
+    'ATHLETES_PER_COACH': 40,
+    'QUESTIONS': 5,
+    'NOTIFICATIONS_PER_USER': 0,
+}
+
+VOCABULARY_SIZE = 20000
+# Padding documents have no source row; ids this high never collide with real ones
+PADDING_OBJECT_ID_START = 10 ** 12
+BATCH_SIZE = 1000
+SYLLABLES = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiou']
+# Queries over words frequent enough that every user's padding contains them; zero matches means a broken setup
+MATCHING_QUERIES = ['common_word', 'frequent_word', 'two_words', 'prefix']
+
+
+def organization_documents(organization_slug):
+    return ContentSearchDocuments.objects.filter(assignment__organization__slug=organization_slug)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark content search on a seeded dataset padded to --documents search documents. "
+            "Prints JSON with latency percentiles per query and user.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=100000, help='Search documents in the index (default: 100000)')
+        parser.add_argument('--words', type=int, default=150, help='Words per padding document (default: 150)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed searches per scenario (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed searches per scenario (default: 2)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the dataset (default: 0)')
+        parser.add_argument('--prefix', default='searchbench', help='Prefix of the benchmark dataset (default: searchbench)')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark dataset afterwards')
+
+    def handle(self, *args, **options):
+        if options['documents'] < 1 or options['words'] < 1 or options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('--documents, --words and --iterations must be at least 1, --warmup at least 0')
+
+        self.options = options
+        self.random = random.Random(f"{options['seed']}:content-search")
+        self.vocabulary = self.make_vocabulary()
+        generator = SyntheticDataGenerator(
+            prefix=options['prefix'], seed=options['seed'], profile=get_load_profile(BENCHMARK_PROFILE),
+            log=lambda message: self.stderr.write(message),
+        )
+        if generator.exists():
+            self.stderr.write(f"Removing previous benchmark dataset '{options['prefix']}'")
+            generator.flush()
+
+        try:
+            generator.generate()
+            organization_slug = f"{options['prefix']}-0"
+            padded = self.pad(organization_slug)
+            results = self.run(organization_slug, padded)
+        finally:
+            if not options['keep']:
+                generator.flush()
+
+        output = json.dumps(results, indent=2, sort_keys=True, default=str)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+        else:
+            sys.stdout.write(output + '\n')
+
+    # Dataset ------------------------------------------------------------
+
+    def make_vocabulary(self):
+        words = []
+        seen = set()
+        while len(words) < VOCABULARY_SIZE:
+            word = ''.join(self.random.choices(SYLLABLES, k=self.random.randint(2, 4)))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+        return words
+
+    def pad(self, organization_slug):
+        """Fill the index up to --documents with Zipf-distributed text on the dataset's assignments."""
+        assignments = list(
+            PaymentAssignments.objects.filter(organization__slug=organization_slug).values_list('id', 'athlete_id')
+        )
+        # Only this dataset's documents count; other organizations' rows are invisible to its users
+        missing = self.options['documents'] - organization_documents(organization_slug).count()
+        # Word frequencies fall off with rank, as in natural text
+        cum_weights = list(accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+        # Padding kept from another dataset (--keep) already holds the first ids
+        first_id = max(
+            PADDING_OBJECT_ID_START,
+            (ContentSearchDocuments.objects.aggregate(last=Max('object_id'))['last'] or 0) + 1,
+        )
+        now = timezone.now()
+        started = time.perf_counter()
+
+        created = 0
+        while created < missing:
+            batch = []
+            for i in range(created, min(missing, created + BATCH_SIZE)):
+                assignment_id, athlete_id = assignments[i % len(assignments)]
+                words = self.random.choices(self.vocabulary, cum_weights=cum_weights, k=self.options['words'])
+                batch.append(ContentSearchDocuments(
+                    doc_type=COACH_CONTENT if i % 4 == 0 else AGENT_RESPONSE, object_id=first_id + i,
+                    assignment_id=assignment_id, athlete_id=athlete_id, purpose='feedback_report',
+                    title=' '.join(words[:6]).capitalize(), body=' '.join(words).capitalize() + '.', modified_at=now,
+                ))
+            with transaction.atomic():
+                ContentSearchDocuments.objects.bulk_create(batch)
+            created += len(batch)
+        self.stderr.write(f"  padding documents: {max(missing, 0)} in {time.perf_counter() - started:.1f}s")
+        return max(missing, 0)
+
+    # Scenarios ----------------------------------------------------------
+
+    def users(self, organization_slug):
+        """The busiest coach and the athlete of one of their assignments."""
+        coach_id = (
+            PaymentAssignments.coaches.through.objects.filter(paymentassignments__organization__slug=organization_slug)
+            .values('users_id').annotate(total=Count('id')).order_by('-total', 'users_id')
+            .values_list('users_id', flat=True).first()
+        )
+        athlete_id = (
+            PaymentAssignments.objects.filter(organization__slug=organization_slug, coaches=coach_id)
+            .order_by('id').values_list('athlete_id', flat=True).first()
+        )
+        return {'coach': Users.objects.get(id=coach_id), 'athlete': Users.objects.get(id=athlete_id)}
+
+    def queries(self):
+        common, frequent, rare = self.vocabulary[0], self.vocabulary[50], self.vocabulary[5000]
+        return {
+            'common_word': common,
+            'frequent_word': frequent,
+            'rare_word': rare,
+            'two_words': f'{common} {frequent}',
+            'prefix': frequent[:4],
+            'no_match': 'xqxqxq',
+        }
+
+    def run(self, organization_slug, padded):
+        users = self.users(organization_slug)
+        scenarios = {}
+        for role, user in users.items():
+            for label, query in self.queries().items():
+                name = f'{label}.{role}'
+                self.stderr.write(f"Benchmarking {name}")
+                scenarios[name] = self.measure(user, organization_slug, query)
+                scenarios[name]['query'] = query
+
+        empty = sorted(
+            name for name, scenario in scenarios.items()
+            if name.split('.')[0] in MATCHING_QUERIES and not scenario['matches']
+        )
+        if empty:
+            raise CommandError(
+                f"Scenarios that should match returned no documents: {', '.join(empty)}. "
+                f"Check that the padding documents were written for '{organization_slug}'"
+            )
+
+        return {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'seed': self.options['seed'],
+                'iterations': self.options['iterations'],
+                'warmup': self.options['warmup'],
+                'documents': organization_documents(organization_slug).count(),
+                'index_documents': ContentSearchDocuments.objects.count(),
+                'padding_documents': padded,
+                'words_per_document': self.options['words'],
+                'visible_documents': {
+                    role: accessible_documents(user, organization_slug).count() for role, user in users.items()
+                },
+            },
+            'scenarios': scenarios,
+        }
+
+    def measure(self, user, organization_slug, query):
+        timings, query_counts = [], []
+        for i in range(self.options['warmup'] + self.options['iterations']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                result = search_documents(user, organization_slug, query)
+                elapsed = (time.perf_counter() - started) * 1000
+            if i < self.options['warmup']:
+                continue
+            timings.append(elapsed)
+            query_counts.append(len(captured))
+
+        return {
+            'matches': result['count'],
+            'latency_ms': {
+                'mean': round(statistics.fmean(timings), 2),
+                'p50': round(percentile(timings, 0.5), 2),
+                'p95': round(percentile(timings, 0.95), 2),
+                'max': round(max(timings), 2),
+            },
+            'queries': max(query_counts),
+        }
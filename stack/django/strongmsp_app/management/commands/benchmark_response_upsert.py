@@ -0,0 +1,141 @@
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from strongmsp_app.models import Assessments, QuestionResponses, Questions
+from strongmsp_app.services.bulk_upsert import (
+    DEFAULT_UPSERT_CHUNK_SIZE, QuestionIndex, parse_response, read_sheet, upsert_responses, upsert_users
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the bulk response upsert on a generated response sheet. All rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Athletes (rows) in the sheet (default: 2000)')
+        parser.add_argument('--questions', type=int, default=50, help='Questions (columns) in the sheet (default: 50)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_UPSERT_CHUNK_SIZE, help=f'Responses per INSERT (default: {DEFAULT_UPSERT_CHUNK_SIZE})')
+        parser.add_argument('--legacy-cells', type=int, default=1000, help='Cells timed with the previous per-cell get_or_create, 0 to skip (default: 1000)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the responses (default: 0)')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['questions'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--users, --questions and --chunk-size must be at least 1')
+
+        self.random = random.Random(options['seed'])
+        cells = options['users'] * options['questions']
+        self.stdout.write(f"Response sheet: {options['users']} users x {options['questions']} questions = {cells} cells")
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as sheet:
+            path = sheet.name
+        try:
+            with transaction.atomic():
+                self.run(path, options)
+                transaction.set_rollback(True)
+        finally:
+            os.unlink(path)
+
+    def run(self, path, options):
+        assessment = Assessments.objects.create(title='benchmark assessment')
+        author = Questions.get_default_author()
+        Questions.objects.bulk_create([
+            Questions(title=f'Benchmark question {i}', question_category='confidence', scale='onetofive', author=author)
+            for i in range(options['questions'])
+        ])
+        # Existing athletes, so password hashing does not dominate the timings
+        unusable = make_password(None)
+        emails = [f'benchmark-{i}@example.com' for i in range(options['users'])]
+        User.objects.bulk_create([
+            User(username=email, email=email, first_name='Bench', last_name=str(i), password=unusable)
+            for i, email in enumerate(emails)
+        ], batch_size=DEFAULT_UPSERT_CHUNK_SIZE)
+
+        self.write_sheet(path, emails, options['questions'])
+        state = {}
+
+        def parse():
+            state['rows'] = read_sheet(path)
+
+        def questions():
+            rows = state['rows']
+            state['questions'], _ = QuestionIndex().upsert(list(zip(rows[0][3:], rows[1][3:])))
+
+        def users():
+            people = [(row[1], 'Bench', row[2].split()[-1]) for row in state['rows'][2:]]
+            state['user_ids'], _, _ = upsert_users(people, 'unused', workers=1)
+
+        def responses():
+            cells = []
+            for row in state['rows'][2:]:
+                user_id = state['user_ids'][row[1].lower()]
+                for question, value in zip(state['questions'], row[3:]):
+                    cells.append((user_id, question.id, parse_response(value)))
+            return upsert_responses(cells, assessment.id, chunk_size=options['chunk_size'])
+
+        self.measure('parse sheet (csv module)', parse)
+        self.measure('match/upsert questions', questions)
+        self.measure('match/upsert users', users)
+        self.measure('insert responses', responses)
+
+        self.write_sheet(path, emails, options['questions'])
+        parse()
+        self.measure('update responses (new values)', responses)
+        self.measure('re-run unchanged sheet', responses)
+
+        if options['legacy_cells']:
+            self.measure_legacy(state, assessment, options['legacy_cells'], options['users'] * options['questions'])
+
+    def write_sheet(self, path, emails, questions):
+        """Questions row, categories row, then one row of random 1-5 responses per athlete."""
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['', '', ''] + [f'{i + 1}. Benchmark question {i}' for i in range(questions)])
+            writer.writerow(['', '', ''] + ['Confidence'] * questions)
+            for i, email in enumerate(emails):
+                writer.writerow(['', email, f'Bench {i}'] + [self.random.randint(1, 5) for _ in range(questions)])
+
+    def measure_legacy(self, state, assessment, sample, total):
+        """The previous per-cell get_or_create + save, timed on a sample and extrapolated."""
+        QuestionResponses.objects.filter(assessment=assessment).delete()
+        cells = []
+        for row in state['rows'][2:]:
+            for question, value in zip(state['questions'], row[3:]):
+                cells.append((state['user_ids'][row[1].lower()], question, int(value)))
+                if len(cells) >= sample:
+                    break
+            if len(cells) >= sample:
+                break
+
+        def legacy():
+            for user_id, question, value in cells:
+                response, created = QuestionResponses.objects.get_or_create(
+                    author_id=user_id, question=question, assessment=assessment, defaults={'response': value}
+                )
+                if not created and response.response != value:
+                    response.response = value
+                    response.save()
+
+        elapsed, queries = self.measure(f'legacy get_or_create ({len(cells)} cells)', legacy)
+        factor = total / len(cells)
+        self.stdout.write(self.style.WARNING(
+            f"legacy extrapolated to {total} cells: ~{elapsed * factor / 1000:.1f} s, ~{int(queries * factor)} queries"
+        ))
+
+    def measure(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = func()
+            elapsed = (time.perf_counter() - started) * 1000
+        suffix = f" {result}" if isinstance(result, dict) else ''
+        self.stdout.write(self.style.SUCCESS(f"{label}: {elapsed:.1f} ms, {len(queries)} queries{suffix}"))
+        return elapsed, len(queries)
@@ -0,0 +1,144 @@
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Length
+
+from utils.fields import (
+    COMPRESSED_PREFIX, CompressedTextField, compress_text, decompress_text, get_text_compression_settings
+)
+
+
+class Command(BaseCommand):
+    help = ("Compress the stored values of CompressedTextField columns written before compression, in primary-key "
+            "batches, checking that every written row reads back unchanged. Reports the space saved.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='app_label.Model to process (repeatable, default: every model with a CompressedTextField)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per batch and transaction (default: 500)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what compression would save')
+        parser.add_argument('--decompress', action='store_true', help='Store every value as plain text again (before reverting to TextField)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        for model, fields in self.compressed_models(options['model']):
+            names = [field.name for field in fields]
+            self.stdout.write(f"{model._meta.label} ({', '.join(names)})")
+            if options['decompress']:
+                stats = self.decompress(model, fields, options)
+            else:
+                stats = self.compress(model, fields, options)
+            self.report(stats, options)
+
+    def compressed_models(self, labels):
+        if labels:
+            try:
+                candidates = [apps.get_model(label) for label in labels]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+        else:
+            candidates = apps.get_models()
+        found = []
+        for model in candidates:
+            fields = [field for field in model._meta.concrete_fields if isinstance(field, CompressedTextField)]
+            if fields:
+                found.append((model, fields))
+            elif labels:
+                raise CommandError(f"{model._meta.label} has no CompressedTextField")
+        return found
+
+    def batches(self, queryset, names, batch_size):
+        """Rows as (pk, values) in primary-key order, one query per batch."""
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', *names)[:batch_size])
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1][0]
+
+    def compress(self, model, fields, options):
+        config = get_text_compression_settings()
+        names = [field.name for field in fields]
+        # Only rows with a plain value long enough to be compressed
+        pending = reduce(or_, [
+            Q(**{f'{field.name}_length__gte': config['THRESHOLD'] if field.threshold is None else field.threshold})
+            & ~Q(**{f'{field.name}__startswith': COMPRESSED_PREFIX})
+            for field in fields
+        ])
+        queryset = model.objects.annotate(**{f'{name}_length': Length(name) for name in names}).filter(pending)
+
+        stats = {'rows': 0, 'values': 0, 'before': 0, 'after': 0}
+        for rows in self.batches(queryset, names, options['batch_size']):
+            changed = []
+            for pk, *values in rows:
+                updates = {}
+                for field, value in zip(fields, values):
+                    stored = compress_text(value, field.threshold)
+                    if stored is value:
+                        continue
+                    updates[field.name] = value
+                    stats['values'] += 1
+                    stats['before'] += len(value.encode('utf-8'))
+                    stats['after'] += len(stored.encode('utf-8'))
+                if updates:
+                    changed.append((pk, updates))
+            stats['rows'] += len(changed)
+            if changed and not options['dry_run']:
+                self.write_batch(model, names, changed)
+        return stats
+
+    def write_batch(self, model, names, changed):
+        """Save plain values (the field compresses them) and check every row reads back unchanged."""
+        with transaction.atomic():
+            for pk, updates in changed:
+                model.objects.filter(pk=pk).update(**updates)
+            read_back = {
+                row[0]: dict(zip(names, row[1:]))
+                for row in model.objects.filter(pk__in=[pk for pk, _ in changed]).values_list('pk', *names)
+            }
+            for pk, updates in changed:
+                if any(read_back[pk][name] != value for name, value in updates.items()):
+                    raise CommandError(f"{model._meta.label} {pk} does not read back unchanged; batch rolled back")
+
+    def decompress(self, model, fields, options):
+        stats = {'rows': 0, 'values': 0, 'before': 0, 'after': 0}
+        compressed = reduce(or_, [Q(**{f'{field.name}__startswith': COMPRESSED_PREFIX}) for field in fields])
+        names = [field.name for field in fields]
+        # Stored values as they are (a plain TextField output skips decompression), to measure them
+        queryset = model.objects.filter(compressed).annotate(**{
+            f'{name}_stored': models.ExpressionWrapper(models.F(name), output_field=models.TextField()) for name in names
+        })
+        for rows in self.batches(queryset, [f'{name}_stored' for name in names], options['batch_size']):
+            with transaction.atomic():
+                for pk, *values in rows:
+                    updates = {}
+                    for field, value in zip(fields, values):
+                        if not (value or '').startswith(COMPRESSED_PREFIX):
+                            continue
+                        plain = decompress_text(value)
+                        stats['values'] += 1
+                        stats['before'] += len(value.encode('utf-8'))
+                        stats['after'] += len(plain.encode('utf-8'))
+                        # A Value with a plain TextField skips the field's compression
+                        updates[field.name] = Value(plain, output_field=models.TextField())
+                    stats['rows'] += 1
+                    if not options['dry_run']:
+                        model.objects.filter(pk=pk).update(**updates)
+        return stats
+
+    def report(self, stats, options):
+        change = f" ({(stats['after'] - stats['before']) / stats['before']:+.0%})" if stats['before'] else ''
+        verb = 'Would change' if options['dry_run'] else 'Changed'
+        self.stdout.write(self.style.SUCCESS(
+            f"  {verb} {stats['values']} values in {stats['rows']} rows: "
+            f"{stats['before']:,} -> {stats['after']:,} bytes{change}"
+        ))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.services.notification_delivery import NotificationDeliveryWorker, DELIVERY_CHANNELS
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending email and SMS notifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--channel',
+            action='append',
+            choices=DELIVERY_CHANNELS,
+            help='Only deliver this channel (can be repeated). Defaults to email and sms'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of notifications claimed per batch (default: NOTIFICATION_DELIVERY["BATCH_SIZE"])'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new notifications instead of draining the queue once'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when the queue is empty in --loop mode (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size is not None and batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        worker = NotificationDeliveryWorker(channels=options['channel'], batch_size=batch_size)
+
+        if options['loop']:
+            self.stdout.write(f'Delivering {", ".join(worker.channels)} notifications every {options["interval"]}s...')
+            worker.run_forever(interval=options['interval'])
+            return
+
+        # Drain the queue once. Retried rows get a future remind_time, so they
+        # are not re-claimed in the same run.
+        totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'expired': 0}
+        while True:
+            stats = worker.run_once()
+            for key, value in stats.items():
+                totals[key] += value
+            if stats['claimed'] < worker.batch_size:
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['claimed']} notifications: {totals['sent']} sent, "
+            f"{totals['retried']} scheduled for retry, {totals['failed']} failed, {totals['expired']} expired"
+        ))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.services.synthetic_data import (
+    DEFAULT_LOAD_PROFILE, DEFAULT_SYNTHETIC_CHUNK_SIZE, SyntheticDataGenerator, get_load_profile
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset for load testing with bulk inserts (use --flush to remove it)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='load', help='Prefix for every username, slug and title (default: load)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed and profile give the same data (default: 0)')
+        parser.add_argument('--profile', help='JSON file overriding keys of the default load profile')
+        parser.add_argument('--orgs', type=int, help=f"Organizations (default: {DEFAULT_LOAD_PROFILE['ORGANIZATIONS']})")
+        parser.add_argument('--athletes', type=int, help=f"Athletes across all organizations (default: {DEFAULT_LOAD_PROFILE['ATHLETES']})")
+        parser.add_argument('--questions', type=int, help=f"Questions in the generated assessment (default: {DEFAULT_LOAD_PROFILE['QUESTIONS']})")
+        parser.add_argument('--org-skew', type=float, help=f"Zipf exponent for athletes per organization, 0 for even (default: {DEFAULT_LOAD_PROFILE['ORG_SKEW']})")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_SYNTHETIC_CHUNK_SIZE, help=f'Rows per INSERT (default: {DEFAULT_SYNTHETIC_CHUNK_SIZE})')
+        parser.add_argument('--flush', action='store_true', help='Delete the dataset for --prefix and exit')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing dataset for --prefix before generating')
+
+    def handle(self, *args, **options):
+        profile = get_load_profile({
+            'ORGANIZATIONS': options['orgs'],
+            'ATHLETES': options['athletes'],
+            'QUESTIONS': options['questions'],
+            'ORG_SKEW': options['org_skew'],
+        }, path=options['profile'])
+
+        if profile['ORGANIZATIONS'] < 1 or profile['ATHLETES'] < 1 or profile['QUESTIONS'] < 1:
+            raise CommandError('Organizations, athletes and questions must be at least 1')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        generator = SyntheticDataGenerator(
+            prefix=options['prefix'],
+            seed=options['seed'],
+            profile=profile,
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+
+        if options['flush'] or options['replace']:
+            deleted = generator.flush()
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted dataset '{options['prefix']}': " + ', '.join(f'{label}={count}' for label, count in deleted.items())
+            ))
+            if options['flush']:
+                return
+
+        if generator.exists():
+            raise CommandError(f"A dataset with prefix '{options['prefix']}' already exists. Use --replace or another --prefix.")
+
+        started = time.perf_counter()
+        counts = generator.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s "
+            f"({counts.get('question_responses', 0)} question responses)"
+        ))
@@ -1,12 +1,7 @@
-import csv
 import os
-from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
 from django.core.management.base import BaseCommand, CommandError
-from allauth.account.models import EmailAddress
-from strongmsp_app.models import Organizations, UserOrganizations
-
-User = get_user_model()
+from strongmsp_app.models import Organizations
+from strongmsp_app.services.user_import import ImportRowError, UserImportService
 
 
 class Command(BaseCommand):
@@ -37,10 +32,19 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be imported without actually creating users'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Rows written per bulk query (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes used to hash passwords (default: CPU count, 1 hashes in this process)'
+        )
 
     def handle(self, *args, **options):
         file_path = options['file']
-        role = options['role']
         organization_slug = options['organization']
         dry_run = options['dry_run']
 
@@ -48,151 +52,67 @@ class Command(BaseCommand):
         if not os.path.exists(file_path):
             raise CommandError(f'File {file_path} not found')
 
-        # Get or create organization
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
         try:
             organization = Organizations.objects.get(slug=organization_slug)
         except Organizations.DoesNotExist:
             raise CommandError(f'Organization with slug "{organization_slug}" not found')
 
-        # Get or create groups
-        oa_tester_group, _ = Group.objects.get_or_create(name='oa-tester')
-        role_group, _ = Group.objects.get_or_create(name=role)
-
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN - No users will be created'))
 
-        # Process CSV
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-
+        service = UserImportService(
+            organization,
+            options['role'],
+            dry_run=dry_run,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+        )
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row_num, row in enumerate(reader, 1):
-                    try:
-                        user, action = self.create_or_update_user(
-                            row, role, organization, oa_tester_group, role_group, dry_run
-                        )
-                        
-                        if action == 'created':
-                            imported_count += 1
-                            self.stdout.write(
-                                self.style.SUCCESS(f'Created user: {row["email"]}')
-                            )
-                        elif action == 'updated':
-                            updated_count += 1
-                            self.stdout.write(
-                                self.style.SUCCESS(f'Updated user: {row["email"]}')
-                            )
-                        elif action == 'skipped':
-                            skipped_count += 1
-                            self.stdout.write(
-                                self.style.WARNING(f'Skipped existing user: {row["email"]}')
-                            )
-                        else:
-                            skipped_count += 1
-                            self.stdout.write(
-                                self.style.ERROR(f'Error processing user: {row["email"]}')
-                            )
+            report = service.run(file_path)
+        except (ImportRowError, UnicodeDecodeError) as e:
+            raise CommandError(f'Error reading CSV file: {e}')
 
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'Error processing row {row_num} ({row.get("email", "unknown")}): {e}')
-                        )
-                        skipped_count += 1
+        # Per-row diff in dry runs, or when asked for with -v 2
+        if dry_run or options['verbosity'] > 1:
+            for change in report['changes']:
+                self.write_change(change)
 
-        except Exception as e:
-            raise CommandError(f'Error reading CSV file: {e}')
+        for row_num, email, message in report['errors']:
+            self.stdout.write(self.style.ERROR(f'Error processing row {row_num} ({email}): {message}'))
 
         # Summary
+        prefix = 'Dry run' if dry_run else 'Import'
         self.stdout.write(
             self.style.SUCCESS(
-                f'Import completed: {imported_count} created, {updated_count} updated, {skipped_count} skipped'
+                f"{prefix} completed: {report['created']} created, {report['updated']} updated, "
+                f"{report['unchanged']} unchanged, {report['memberships_added']} added to {organization_slug}, "
+                f"{len(report['errors'])} skipped"
             )
         )
 
-    def create_or_update_user(self, row, role, organization, oa_tester_group, role_group, dry_run):
-        """Create or update a user from CSV row data"""
-        email = row['email'].strip()
-        first_name = row['first_name'].strip()
-        last_name = row['last_name'].strip()
-        gender = row.get('gender', '').strip() or None
-        birthdate = row.get('birthdate', '').strip() or None
-        zip_code = row.get('zip_code', '').strip() or None
-
-        if not email:
-            raise ValueError('Email is required')
-
-        # Generate username from email
-        username = email
-
-        # Check if user already exists
-        existing_user = User.objects.filter(email=email).first()
-
-        if existing_user:
-            # Update existing user
-            if not dry_run:
-                existing_user.first_name = first_name
-                existing_user.last_name = last_name
-                existing_user.gender = gender
-                existing_user.birthdate = birthdate
-                existing_user.zip_code = zip_code
-                existing_user.save()
-
-                # Ensure user is in correct groups
-                existing_user.groups.add(oa_tester_group)
-                existing_user.groups.add(role_group)
-
-                # Ensure user is in organization
-                UserOrganizations.objects.get_or_create(
-                    user=existing_user,
-                    organization=organization,
-                    defaults={'is_active': True}
-                )
-
-            return existing_user, 'updated'
+    def write_change(self, change):
+        row = f"row {change['row']}: {change['email']}"
+        if change['action'] == 'created':
+            self.stdout.write(self.style.SUCCESS(f'+ {row} (new user)'))
+            return
+
+        details = [
+            f"{field} {self.display(old)} -> {self.display(new)}"
+            for field, (old, new) in change['fields'].items()
+        ]
+        if change['groups_added']:
+            details.append(f"groups +{', +'.join(change['groups_added'])}")
+        if change['joins_organization']:
+            details.append('joins organization')
+        if details:
+            self.stdout.write(self.style.WARNING(f"~ {row}: {'; '.join(details)}"))
         else:
-            # Create new user
-            if not dry_run:
-                user = User.objects.create(
-                    username=username,
-                    email=email,
-                    first_name=first_name,
-                    last_name=last_name,
-                    gender=gender,
-                    birthdate=birthdate,
-                    zip_code=zip_code,
-                    is_active=True,
-                    is_staff=False,
-                    is_superuser=False
-                )
-
-                # Set default password
-                user.set_password('makemestrong')
-                user.save()
-
-                # Add to groups
-                user.groups.add(oa_tester_group)
-                user.groups.add(role_group)
-
-                # Create verified email address
-                EmailAddress.objects.create(
-                    user=user,
-                    email=email,
-                    verified=True,
-                    primary=True
-                )
-
-                # Add to organization
-                UserOrganizations.objects.create(
-                    user=user,
-                    organization=organization,
-                    is_active=True
-                )
+            self.stdout.write(f'= {row} (no changes)')
 
-                return user, 'created'
-            else:
-                # Dry run - return mock user
-                return None, 'created'
+    def display(self, value):
+        return 'None' if value is None else repr(str(value))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.services.notification_retention import (
+    NotificationRetentionService, RETENTION_RULES, get_notification_types
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and old notifications and compact delivered email/SMS rows (NOTIFICATION_RETENTION)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            action='append',
+            dest='types',
+            choices=[t for t in get_notification_types() if t],
+            help='Only apply retention to this notification_type (can be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Rows deleted or compacted per transaction (default: NOTIFICATION_RETENTION["BATCH_SIZE"])'
+        )
+        parser.add_argument(
+            '--archive',
+            help='Append deleted rows to this gzipped NDJSON file before deleting them'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows each rule would affect'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size is not None and batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        service = NotificationRetentionService(
+            batch_size=batch_size,
+            dry_run=options['dry_run'],
+            archive_path=options['archive'],
+        )
+        report = service.run(notification_types=options['types'])
+
+        totals = {rule: 0 for rule in RETENTION_RULES}
+        for notification_type, counts in report.items():
+            if any(counts.values()):
+                self.stdout.write(f"  {notification_type}: " + ', '.join(f"{rule}={counts[rule]}" for rule in RETENTION_RULES))
+            for rule, count in counts.items():
+                totals[rule] += count
+
+        deleted = sum(count for rule, count in totals.items() if rule != 'compacted')
+        prefix = 'Would reclaim' if options['dry_run'] else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {deleted} notifications ({totals['expired']} expired, {totals['seen']} seen, "
+            f"{totals['unseen']} unseen, {totals['delivered']} delivered) and compacted {totals['compacted']}"
+        ))
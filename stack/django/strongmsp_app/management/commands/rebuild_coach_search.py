@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.models import Organizations
+from strongmsp_app.services.coach_search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the coach search index from active coach memberships (after imports that bypass signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help='Only rebuild this organization (slug)')
+
+    def handle(self, *args, **options):
+        organization = None
+        if options['organization']:
+            organization = Organizations.objects.filter(slug=options['organization']).first()
+            if organization is None:
+                raise CommandError(f"Organization '{options['organization']}' does not exist")
+
+        written = rebuild_index(organization)
+        scope = organization.slug if organization else 'all organizations'
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} coach search terms for {scope}"))
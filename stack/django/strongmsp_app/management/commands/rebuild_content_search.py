@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from strongmsp_app.models import ContentSearchDocuments, Organizations
+from strongmsp_app.services.content_search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the content search documents from coach content and agent responses (after writes that bypass signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help='Only rebuild content with an assignment in this organization (slug)')
+        parser.add_argument('--if-empty', action='store_true', help='Do nothing when documents already exist (first deploy backfill)')
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and ContentSearchDocuments.objects.exists():
+            self.stdout.write('Content search documents already exist, skipping rebuild')
+            return
+
+        organization = None
+        if options['organization']:
+            organization = Organizations.objects.filter(slug=options['organization']).first()
+            if organization is None:
+                raise CommandError(f"Organization '{options['organization']}' does not exist")
+
+        written = rebuild_index(organization)
+        scope = organization.slug if organization else 'all organizations'
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} content search documents for {scope}"))
@@ -0,0 +1,194 @@
+import json
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from utils.fields import (
+    COMPRESSED_PREFIX, SegmentedTextField, compress_text, get_text_segment_settings, join_segments, segment_hash,
+    split_segments, store_segments
+)
+
+# Segments are saved (or touched, see store_segments) just before the row that references them; segments used
+# more recently may belong to a save in progress. Must stay well above utils.fields.SEGMENT_TOUCH_INTERVAL.
+PRUNE_MIN_AGE = timedelta(hours=1)
+
+
+class Command(BaseCommand):
+    help = ("Move long values of SegmentedTextField columns written before segmentation into their shared segment "
+            "table, in primary-key batches, checking that every written row reads back unchanged. Reports the space "
+            "saved.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='app_label.Model to process (repeatable, default: every model with a SegmentedTextField)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per batch and transaction (default: 500)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what segmentation would save')
+        parser.add_argument('--join', action='store_true', help='Store every value in its column again (before reverting to CompressedTextField)')
+        parser.add_argument('--prune', action='store_true', help='Afterwards delete segments no row references')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        for model, fields in self.segmented_models(options['model']):
+            names = [field.name for field in fields]
+            self.stdout.write(f"{model._meta.label} ({', '.join(names)})")
+            for field in fields:
+                if options['join']:
+                    stats = self.join(model, field, options)
+                else:
+                    stats = self.segment(model, field, options)
+                self.report(field, stats, options)
+
+        if options['prune']:
+            self.prune(options)
+
+    def segmented_models(self, labels):
+        if labels:
+            try:
+                candidates = [apps.get_model(label) for label in labels]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+        else:
+            candidates = apps.get_models()
+        found = []
+        for model in candidates:
+            fields = [field for field in model._meta.concrete_fields if isinstance(field, SegmentedTextField)]
+            if fields:
+                found.append((model, fields))
+            elif labels:
+                raise CommandError(f"{model._meta.label} has no SegmentedTextField")
+        return found
+
+    def batches(self, queryset, names, batch_size):
+        """Rows as (pk, values) in primary-key order, one query per batch."""
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', *names)[:batch_size])
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1][0]
+
+    def segment(self, model, field, options):
+        name, segments_field = field.name, field.segments_field
+        segment_model = field.get_segment_model()
+        min_length = get_text_segment_settings()['MIN_LENGTH']
+        # Plain values long enough to be segmented, and compressed ones, which may be
+        queryset = model.objects.filter(**{f'{segments_field}__isnull': True}).annotate(
+            stored=models.ExpressionWrapper(models.F(name), output_field=models.TextField()),
+            stored_length=Length(name),
+        ).filter(Q(stored_length__gte=min_length) | Q(**{f'{name}__startswith': COMPRESSED_PREFIX}))
+
+        stats = {'rows': 0, 'segments': 0, 'before': 0, 'after': 0}
+        # Segments this run has stored (or would store)
+        seen = set()
+        for rows in self.batches(queryset, [name, 'stored'], options['batch_size']):
+            changed = []
+            for pk, value, stored in rows:
+                if len(value) < min_length:
+                    continue
+                texts = split_segments(value)
+                hashes = [segment_hash(text) for text in texts]
+                new = {key: text for key, text in zip(hashes, texts) if key not in seen}
+                if new:
+                    new = {key: text for key, text in new.items() if key not in self.stored(segment_model, new)}
+                seen.update(hashes)
+                stats['rows'] += 1
+                stats['segments'] += len(new)
+                stats['before'] += len(stored.encode('utf-8'))
+                stats['after'] += len(json.dumps(hashes)) + sum(
+                    len(key) + len(compress_text(text).encode('utf-8')) for key, text in new.items()
+                )
+                changed.append((pk, value, texts))
+            if changed and not options['dry_run']:
+                self.write_batch(model, field, changed)
+        return stats
+
+    def stored(self, segment_model, hashes):
+        return set(segment_model.objects.filter(pk__in=hashes).values_list('pk', flat=True))
+
+    def write_batch(self, model, field, changed):
+        """Store the segments, empty the columns and check every row reads back unchanged."""
+        segment_model = field.get_segment_model()
+        with transaction.atomic():
+            for pk, value, texts in changed:
+                hashes = store_segments(segment_model, texts)
+                updates = {field.name: '', field.segments_field: hashes}
+                if field.length_field is not None:
+                    updates[field.length_field] = len(value)
+                model.objects.filter(pk=pk).update(**updates)
+            values = {pk: value for pk, value, _ in changed}
+            for instance in model.objects.filter(pk__in=values).only(field.name, field.segments_field):
+                if getattr(instance, field.name) != values[instance.pk]:
+                    raise CommandError(f"{model._meta.label} {instance.pk} does not read back unchanged; batch rolled back")
+
+    def join(self, model, field, options):
+        name, segments_field = field.name, field.segments_field
+        segment_model = field.get_segment_model()
+        queryset = model.objects.filter(**{f'{segments_field}__isnull': False, name: ''})
+
+        stats = {'rows': 0, 'before': 0, 'after': 0}
+        for rows in self.batches(queryset, [segments_field], options['batch_size']):
+            with transaction.atomic():
+                for pk, hashes in rows:
+                    value = join_segments(segment_model, hashes)
+                    stats['rows'] += 1
+                    stats['before'] += len(json.dumps(hashes))
+                    stats['after'] += len(compress_text(value, field.threshold).encode('utf-8'))
+                    if not options['dry_run']:
+                        # update() skips segmentation; the field still compresses the value
+                        updates = {name: value, segments_field: None}
+                        if field.length_field is not None:
+                            updates[field.length_field] = None
+                        model.objects.filter(pk=pk).update(**updates)
+        return stats
+
+    def prune(self, options):
+        """Delete segments no row of any model referencing their table uses."""
+        by_segment_model = {}
+        for model, fields in self.segmented_models(None):
+            for field in fields:
+                by_segment_model.setdefault(field.get_segment_model(), []).append((model, field))
+
+        cutoff = timezone.now() - PRUNE_MIN_AGE
+        for segment_model, users in by_segment_model.items():
+            referenced = set()
+            for model, field in users:
+                queryset = model.objects.filter(**{f'{field.segments_field}__isnull': False})
+                for rows in self.batches(queryset, [field.segments_field], options['batch_size']):
+                    for _, hashes in rows:
+                        referenced.update(hashes)
+            unused = [
+                key for key in segment_model.objects.filter(last_used_at__lt=cutoff).values_list('pk', flat=True).iterator()
+                if key not in referenced
+            ]
+            deleted = len(unused)
+            if not options['dry_run']:
+                deleted = 0
+                for start in range(0, len(unused), options['batch_size']):
+                    # last_used_at is checked again by the DELETE itself: a save that reused the segment since
+                    # the scan has touched it (or waits on its row lock and stores it again)
+                    deleted += segment_model.objects.filter(
+                        pk__in=unused[start:start + options['batch_size']], last_used_at__lt=cutoff
+                    ).delete()[0]
+            verb = 'Would delete' if options['dry_run'] else 'Deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f"{segment_model._meta.label}: {verb} {deleted} unused segments, {len(referenced)} in use"
+            ))
+
+    def report(self, field, stats, options):
+        change = f" ({(stats['after'] - stats['before']) / stats['before']:+.0%})" if stats['before'] else ''
+        verb = 'Would change' if options['dry_run'] else 'Changed'
+        segments = f", {stats['segments']} new segments" if 'segments' in stats else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"  {field.name}: {verb} {stats['rows']} rows{segments}: "
+            f"{stats['before']:,} -> {stats['after']:,} bytes{change}"
+        ))
@@ -1,13 +1,11 @@
-import csv
 import os
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.contrib.auth import get_user_model
-from allauth.account.models import EmailAddress
-from strongmsp_app.models import Questions, QuestionResponses, Assessments
-from .utils import clean_question
-
-User = get_user_model()
+from django.utils import timezone
+from strongmsp_app.models import QuestionResponses, Assessments
+from strongmsp_app.services.bulk_upsert import (
+    DEFAULT_UPSERT_CHUNK_SIZE, QuestionIndex, parse_response, read_sheet, upsert_responses, upsert_users
+)
 
 class Command(BaseCommand):
     help = 'Upsert users and their assessment responses from CSV file, and optionally update all responses to relate to a specific assessment'
@@ -30,6 +28,22 @@ class Command(BaseCommand):
             default='makemestrong!',
             help='Default password for new users (default: makemestrong)'
         )
+        parser.add_argument(
+            '--assessment',
+            type=int,
+            help='Assessment ID the imported responses belong to (required when importing)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_UPSERT_CHUNK_SIZE,
+            help=f'Responses written per INSERT (default: {DEFAULT_UPSERT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes used to hash passwords of new users (default: CPU count)'
+        )
         parser.add_argument(
             '--update-assessment',
             type=int,
@@ -53,11 +67,12 @@ class Command(BaseCommand):
         update_assessment = options['update_assessment']
         force_assessment = options['force_assessment']
         filter_questions = options['filter_questions']
+        assessment_id = options['assessment']
 
         # Handle assessment update if requested
         if update_assessment:
             self._update_responses_assessment(
-                update_assessment, dry_run, force_assessment, filter_questions
+                update_assessment, dry_run, force_assessment, filter_questions, options['chunk_size']
             )
             return
 
@@ -72,55 +87,46 @@ class Command(BaseCommand):
             )
             return
 
+        if not assessment_id:
+            raise CommandError('--assessment is required when importing responses')
         try:
-            with open(csv_path, 'r', encoding='utf-8') as file:
-                # Read the file content and split by lines
-                lines = file.readlines()
-                
-                if len(lines) < 3:
-                    self.stdout.write(
-                        self.style.ERROR('CSV file must have at least 3 lines: timestamp, questions, categories, and user responses')
-                    )
-                    return
-
-                # Parse the questions row (line 1, index 0)
-                questions_row = self._parse_csv_line(lines[0])
-                
-                # Parse the categories row (line 2, index 1) 
-                categories_row = self._parse_csv_line(lines[1])
-                
-                # Skip the first 3 columns (timestamp, email, name) and get actual questions
-                questions = questions_row[3:] if len(questions_row) > 3 else []
-                categories = categories_row[3:] if len(categories_row) > 3 else []
-                
-                if len(questions) != len(categories):
-                    self.stdout.write(
-                        self.style.WARNING(f'Warning: Questions ({len(questions)}) and categories ({len(categories)}) have different lengths. Using {min(len(questions), len(categories))} items.')
-                    )
-                
-                # Process user response rows (starting from line 3, index 2)
-                user_responses = []
-                for i in range(2, len(lines)):
-                    if lines[i].strip():  # Skip empty lines
-                        response_row = self._parse_csv_line(lines[i])
-                        if len(response_row) >= 3:  # Must have timestamp, email, name
-                            user_responses.append(response_row)
-                
-                if not user_responses:
-                    self.stdout.write(
-                        self.style.ERROR('No user response data found in CSV')
-                    )
-                    return
+            assessment = Assessments.objects.get(id=assessment_id)
+        except Assessments.DoesNotExist:
+            raise CommandError(f'Assessment with ID {assessment_id} does not exist')
+
+        try:
+            rows = read_sheet(csv_path)
+
+            if len(rows) < 3:
+                self.stdout.write(
+                    self.style.ERROR('CSV file must have at least 3 lines: timestamp, questions, categories, and user responses')
+                )
+                return
+
+            # Skip the first 3 columns (timestamp, email, name) and get actual questions
+            questions = rows[0][3:]
+            categories = rows[1][3:]
 
-                self.stdout.write(f'Processing {len(user_responses)} users with {len(questions)} questions each...')
+            if len(questions) != len(categories):
+                self.stdout.write(
+                    self.style.WARNING(f'Warning: Questions ({len(questions)}) and categories ({len(categories)}) have different lengths. Using {min(len(questions), len(categories))} items.')
+                )
 
-                if not dry_run:
-                    with transaction.atomic():
-                        self._process_users_and_responses(
-                            user_responses, questions, categories, default_password
-                        )
-                else:
-                    self._dry_run_process(user_responses, questions, categories)
+            # User response rows start on line 3 and need timestamp, email and name
+            user_responses = [row for row in rows[2:] if len(row) >= 3 and row[1] and row[2]]
+
+            if not user_responses:
+                self.stdout.write(
+                    self.style.ERROR('No user response data found in CSV')
+                )
+                return
+
+            self.stdout.write(f'Processing {len(user_responses)} users with {len(questions)} questions each...')
+
+            with transaction.atomic():
+                self._process_users_and_responses(
+                    user_responses, questions, categories, default_password, assessment, options, dry_run
+                )
 
         except Exception as e:
             self.stdout.write(
@@ -128,195 +134,69 @@ class Command(BaseCommand):
             )
             raise
 
-    def _parse_csv_line(self, line):
-        """Parse a CSV line, handling quoted fields properly"""
-        line = line.strip()
-        fields = []
-        current_field = ""
-        in_quotes = False
-        
-        for char in line:
-            if char == '"':
-                in_quotes = not in_quotes
-            elif char == ',' and not in_quotes:
-                fields.append(current_field.strip())
-                current_field = ""
-            else:
-                current_field += char
-        
-        # Add the last field
-        if current_field.strip():
-            fields.append(current_field.strip())
-        
-        return fields
-
-    def _process_users_and_responses(self, user_responses, questions, categories, default_password):
-        """Process users and their responses, creating/updating as needed"""
-        users_created = 0
-        users_updated = 0
-        responses_created = 0
-        responses_updated = 0
-        
-        # First, ensure all questions exist
-        question_objects = self._ensure_questions_exist(questions, categories)
-        
+    def _process_users_and_responses(self, user_responses, questions, categories, default_password, assessment, options, dry_run):
+        """Upsert questions, users and responses with one bulk pass per table"""
+        total = min(len(questions), len(categories))
+        question_objects, question_counts = QuestionIndex().upsert(
+            list(zip(questions[:total], categories[:total])), dry_run=dry_run
+        )
+
+        people = {}
         for user_row in user_responses:
-            if len(user_row) < 3:
-                continue
-                
-            timestamp_str = user_row[0]
-            email = user_row[1].strip()
-            name = user_row[2].strip()
-            responses = user_row[3:] if len(user_row) > 3 else []
-            
-            if not email or not name:
-                continue
-            
             # Parse name into first and last name
-            name_parts = name.split()
+            name_parts = user_row[2].split()
             first_name = name_parts[0] if name_parts else ""
             last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
-            
-            # Create or update user
-            user, user_created = User.objects.get_or_create(
-                email=email,
-                defaults={
-                    'username': email,
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'password': default_password,
-                }
-            )
-            
-            if user_created:
-                users_created += 1
-                # Mark the email as verified
-                EmailAddress.objects.create(
-                    user=user,
-                    email=email,
-                    verified=True,
-                    primary=True,
-                )
-                self.stdout.write(f'✓ Created user: {email} ({name})')
-            else:
-                users_updated += 1
-                # Update user info if needed
-                if user.first_name != first_name or user.last_name != last_name:
-                    user.first_name = first_name
-                    user.last_name = last_name
-                    user.save()
-                self.stdout.write(f'↻ Updated user: {email} ({name})')
-            
-            # Process responses for this user
-            for i, response_value in enumerate(responses):
-                if i >= len(question_objects) or i >= len(questions):
-                    break
-                    
-                if not response_value or response_value.strip() == "":
-                    continue
-                
-                try:
-                    response_int = int(response_value.strip())
-                    if 1 <= response_int <= 5:  # Valid response range
-                        question_obj = question_objects[i]
-                        
-                        # Create or update response
-                        response_obj, response_created = QuestionResponses.objects.get_or_create(
-                            author=user,
-                            question=question_obj,
-                            defaults={'response': response_int}
-                        )
-                        
-                        if response_created:
-                            responses_created += 1
-                        else:
-                            # Update existing response if different
-                            if response_obj.response != response_int:
-                                response_obj.response = response_int
-                                response_obj.save()
-                                responses_updated += 1
-                
-                except ValueError:
-                    # Skip non-numeric responses
+            people[user_row[1].lower()] = (user_row[1], first_name, last_name)
+
+        user_ids, user_counts, errors = upsert_users(
+            list(people.values()), default_password, workers=options['workers'], dry_run=dry_run
+        )
+        for email, message in errors:
+            self.stdout.write(self.style.WARNING(f'⚠ Skipped user {email}: {message}'))
+
+        skipped_users = {email.lower() for email, _ in errors}
+        cells = []
+        skipped_cells = 0
+        new_user_cells = 0
+        for user_row in user_responses:
+            user_id = user_ids.get(user_row[1].lower())
+            for i, response_value in enumerate(user_row[3:3 + total]):
+                response_int = parse_response(response_value)
+                question_obj = question_objects[i]
+                if response_int is None or question_obj is None:
+                    skipped_cells += bool(response_value)
                     continue
-        
+                if user_id is not None:
+                    cells.append((user_id, question_obj.id, response_int))
+                elif dry_run and user_row[1].lower() not in skipped_users:
+                    # Users that would be created have no id yet; all their cells are new
+                    new_user_cells += 1
+
+        response_counts = upsert_responses(
+            cells, assessment.id, chunk_size=options['chunk_size'], dry_run=dry_run
+        )
+        response_counts['created'] += new_user_cells
+
         # Summary
+        heading = '🔍 Dry run - would process' if dry_run else '🎉 Successfully processed users and responses'
         self.stdout.write(
             self.style.SUCCESS(
-                f'\n🎉 Successfully processed users and responses:\n'
-                f'  • Users created: {users_created}\n'
-                f'  • Users updated: {users_updated}\n'
-                f'  • Responses created: {responses_created}\n'
-                f'  • Responses updated: {responses_updated}\n'
-            )
-        )
-
-    def _ensure_questions_exist(self, questions, categories):
-        """Ensure all questions exist in the database, return list of question objects"""
-        question_objects = []
-        
-        # Map category names to valid choices
-        category_mapping = {
-            'Performance Mindset': 'performance_mindset',
-            'Emotional Regulation': 'emotional_regulation',
-            'Confidence': 'confidence',
-            'Resilience & Motivation': 'resilience__motivation',
-            'Concentration': 'concentration',
-            'Leadership': 'leadership',
-            'Mental Well-being': 'mental_wellbeing'
-        }
-        
-        for i, question_text in enumerate(questions):
-            if not question_text:
-                question_objects.append(None)
-                continue
-                
-            # Clean the question text
-            clean_question_text = clean_question(question_text)
-            
-            # Get category (default to mental_wellbeing if not found)
-            category = categories[i] if i < len(categories) else 'Mental Well-being'
-            mapped_category = category_mapping.get(category, 'mental_wellbeing')
-            
-            # Create or get question
-            question, created = Questions.objects.get_or_create(
-                title=clean_question_text,
-                defaults={
-                    'question_category': mapped_category,
-                    'scale': 'onetofive'
-                }
+                f'\n{heading}:\n'
+                f'  • Questions created: {question_counts["created"]}\n'
+                f'  • Questions updated: {question_counts["updated"]}\n'
+                f'  • Users created: {user_counts["created"]}\n'
+                f'  • Users updated: {user_counts["updated"]}\n'
+                f'  • Users unchanged: {user_counts["unchanged"]}\n'
+                f'  • Responses created: {response_counts["created"]}\n'
+                f'  • Responses updated: {response_counts["updated"]}\n'
+                f'  • Responses unchanged: {response_counts["unchanged"]}\n'
+                f'  • Invalid cells skipped: {skipped_cells}\n'
             )
-            
-            if created:
-                self.stdout.write(f'✓ Created question: {clean_question_text[:50]}... ({mapped_category})')
-            
-            question_objects.append(question)
-        
-        return question_objects
-
-    def _dry_run_process(self, user_responses, questions, categories):
-        """Show what would be done without making changes"""
-        self.stdout.write('\n🔍 Dry run - would process:')
-        
-        for user_row in user_responses:
-            if len(user_row) >= 3:
-                email = user_row[1].strip()
-                name = user_row[2].strip()
-                responses = user_row[3:] if len(user_row) > 3 else []
-                
-                if email and name:
-                    self.stdout.write(f'  • User: {email} ({name})')
-                    self.stdout.write(f'    Responses: {len([r for r in responses if r and r.strip()])} valid responses')
-        
-        self.stdout.write(f'\n  • Total questions to process: {len(questions)}')
-        self.stdout.write(f'  • Total users to process: {len(user_responses)}')
-        
-        self.stdout.write(
-            self.style.SUCCESS('\n🔍 Dry run completed - no changes made')
         )
 
-    def _update_responses_assessment(self, assessment_id, dry_run, force, filter_questions):
-        """Update all question responses to relate to a specific assessment"""
+    def _update_responses_assessment(self, assessment_id, dry_run, force, filter_questions, chunk_size=DEFAULT_UPSERT_CHUNK_SIZE):
+        """Update all question responses to relate to a specific assessment, chunk_size rows per UPDATE"""
         from django.db.models import Q
         
         # Check if the target assessment exists
@@ -389,6 +269,12 @@ class Command(BaseCommand):
             
             if responses.count() > 10:
                 self.stdout.write(f'  ... and {responses.count() - 10} more responses')
+
+            superseded_ids = self._find_superseded_responses(responses)
+            if superseded_ids:
+                self.stdout.write(
+                    self.style.WARNING(f'DRY RUN: Would delete {len(superseded_ids)} older duplicate responses (same athlete and question)')
+                )
             
             self.stdout.write(
                 self.style.SUCCESS(f'DRY RUN: Would update {responses.count()} responses to Assessment {assessment_id}')
@@ -405,15 +291,32 @@ class Command(BaseCommand):
         # Perform the update
         try:
             with transaction.atomic():
+                # One response per athlete and question can live on the assessment
+                # (unique_question_response); keep the newest and drop the others
+                superseded_ids = self._find_superseded_responses(responses)
+                if superseded_ids:
+                    QuestionResponses.objects.filter(id__in=superseded_ids).delete()
+                    self.stdout.write(
+                        self.style.WARNING(f'Deleted {len(superseded_ids)} older duplicate responses (same athlete and question)')
+                    )
+
+                # bulk_update skips auto_now, so modified_at is set here as save() did
+                now = timezone.now()
                 updated_count = 0
-                for response in responses:
-                    old_assessment = response.assessment.title if response.assessment else 'None'
+                batch = []
+                changed = responses.exclude(assessment_id=assessment_id).only('id').order_by('id')
+                for response in changed.iterator(chunk_size=chunk_size):
                     response.assessment_id = assessment_id
-                    response.save()
-                    updated_count += 1
-                    
-                    if updated_count % 100 == 0:
+                    response.modified_at = now
+                    batch.append(response)
+                    if len(batch) >= chunk_size:
+                        QuestionResponses.objects.bulk_update(batch, ['assessment', 'modified_at'])
+                        updated_count += len(batch)
+                        batch = []
                         self.stdout.write(f'Updated {updated_count} responses...')
+                if batch:
+                    QuestionResponses.objects.bulk_update(batch, ['assessment', 'modified_at'])
+                    updated_count += len(batch)
 
                 self.stdout.write(
                     self.style.SUCCESS(f'Successfully updated {updated_count} responses to Assessment {assessment_id}')
@@ -428,3 +331,20 @@ class Command(BaseCommand):
                 self.style.ERROR(f'Error updating responses: {e}')
             )
             raise
+
+    def _find_superseded_responses(self, responses):
+        """
+        IDs of responses that would collide once every response points at one
+        assessment: all but the most recently modified per athlete and question.
+        """
+        superseded_ids = []
+        seen = set()
+        rows = responses.order_by('author_id', 'question_id', '-modified_at', '-id').values_list(
+            'id', 'author_id', 'question_id'
+        )
+        for response_id, author_id, question_id in rows.iterator():
+            if (author_id, question_id) in seen:
+                superseded_ids.append(response_id)
+            else:
+                seen.add((author_id, question_id))
+        return superseded_ids
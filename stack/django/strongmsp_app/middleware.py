@@ -1,4 +1,8 @@
+from django.conf import settings
+
+from strongmsp_base.db.routers import get_replica_settings, primary_pin, replica_alias
 from .services.assignment_service import AssignmentService
+from .services.request_metrics import get_request_metrics_settings, record_request, report, should_sample
 
 
 class AssignmentServiceMiddleware:
@@ -22,3 +26,57 @@ class AssignmentServiceMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query counts, duplicate queries, external call time and latency
+    for a sample of requests (settings.REQUEST_METRICS). Unsampled requests
+    pass straight through.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_request_metrics_settings()
+        if not should_sample(request, config):
+            return self.get_response(request)
+
+        with record_request() as recorder:
+            response = self.get_response(request)
+        report(recorder.as_record(request, response, config), config)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica_reads(): a request that writes sets a short-lived
+    cookie, and while the client sends it back its reads stay on the primary.
+    Without a replica configured it passes straight through.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if replica_alias() is None:
+            return self.get_response(request)
+
+        config = get_replica_settings()
+        pinned = request.method not in self.SAFE_METHODS or config['COOKIE_NAME'] in request.COOKIES
+        with primary_pin(pinned) as pin:
+            response = self.get_response(request)
+
+        if pin.wrote:
+            response.set_cookie(
+                config['COOKIE_NAME'], '1',
+                max_age=config['STICKY_SECONDS'],
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.10 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0004_remove_users_real_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notifications',
+            index=models.Index(fields=['recipient', 'channel', 'modified_at'], name='strongmsp_a_recipie_1fd7ae_idx'),
+        ),
+    ]
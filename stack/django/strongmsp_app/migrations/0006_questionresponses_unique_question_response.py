@@ -0,0 +1,36 @@
+# Generated by Django 5.1.10 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_responses(apps, schema_editor):
+    """Keep only the latest response per athlete, assessment and question."""
+    QuestionResponses = apps.get_model('strongmsp_app', 'QuestionResponses')
+    duplicates = (
+        QuestionResponses.objects
+        .values('author_id', 'assessment_id', 'question_id')
+        .annotate(latest=Max('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        QuestionResponses.objects.filter(
+            author_id=row['author_id'],
+            assessment_id=row['assessment_id'],
+            question_id=row['question_id'],
+        ).exclude(id=row['latest']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0005_notifications_sync_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='questionresponses',
+            constraint=models.UniqueConstraint(fields=('author', 'assessment', 'question'), name='unique_question_response'),
+        ),
+    ]
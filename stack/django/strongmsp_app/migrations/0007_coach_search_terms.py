@@ -0,0 +1,33 @@
+# Generated by Django 5.1.10 on 2026-10-19 17:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0006_questionresponses_unique_question_response'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoachSearchTerms',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='Lowercased, accent-free word of a name, username or email', max_length=64, verbose_name='Term')),
+                ('weight', models.PositiveSmallIntegerField(default=1, verbose_name='Weight')),
+                ('display', models.CharField(max_length=255, verbose_name='Display Name')),
+                ('sort_name', models.CharField(max_length=255, verbose_name='Sort Name')),
+                ('photo', models.CharField(blank=True, max_length=255, null=True, verbose_name='Photo')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='strongmsp_app.organizations')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Coach Search Term',
+                'verbose_name_plural': 'Coach Search Terms',
+                'indexes': [models.Index(fields=['organization', 'term'], name='strongmsp_a_organiz_3034fc_idx')],
+            },
+        ),
+    ]
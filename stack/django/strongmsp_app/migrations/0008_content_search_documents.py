@@ -0,0 +1,52 @@
+# Generated by Django 5.1.10 on 2026-10-19 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FULLTEXT_INDEX = 'content_search_fulltext'
+
+
+def add_fulltext_index(apps, schema_editor):
+    # MySQL only; other backends fall back to a scan in services/content_search.py
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('strongmsp_app', 'ContentSearchDocuments')._meta.db_table)
+    schema_editor.execute(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON {table} (title, body)')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = schema_editor.quote_name(apps.get_model('strongmsp_app', 'ContentSearchDocuments')._meta.db_table)
+    schema_editor.execute(f'DROP INDEX {FULLTEXT_INDEX} ON {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0007_coach_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentSearchDocuments',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(choices=[('coach_content', 'Coach Content'), ('agent_response', 'Agent Response')], max_length=20, verbose_name='Document Type')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('purpose', models.CharField(blank=True, max_length=50, null=True, verbose_name='Purpose')),
+                ('title', models.TextField(verbose_name='Title')),
+                ('body', models.TextField(verbose_name='Body')),
+                ('modified_at', models.DateTimeField(verbose_name='Modified At')),
+                ('assignment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='strongmsp_app.paymentassignments', verbose_name='Payment Assignment')),
+                ('athlete', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Athlete')),
+            ],
+            options={
+                'verbose_name': 'Content Search Document',
+                'verbose_name_plural': 'Content Search Documents',
+                'constraints': [models.UniqueConstraint(fields=('doc_type', 'object_id'), name='unique_content_search_document')],
+            },
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.10 on 2026-10-19 17:27
+
+import utils.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0008_content_search_documents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentresponses',
+            name='ai_reasoning',
+            field=utils.fields.CompressedTextField(blank=True, null=True, verbose_name='AI Reasoning'),
+        ),
+        migrations.AlterField(
+            model_name='agentresponses',
+            name='ai_response',
+            field=utils.fields.CompressedTextField(verbose_name='AI Response'),
+        ),
+        migrations.AlterField(
+            model_name='agentresponses',
+            name='message_body',
+            field=utils.fields.CompressedTextField(verbose_name='Message Body'),
+        ),
+    ]
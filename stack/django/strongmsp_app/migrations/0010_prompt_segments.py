@@ -0,0 +1,37 @@
+# Generated by Django 5.1.10 on 2026-10-19 17:32
+
+import utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0009_compressed_agent_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptSegments',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('text', utils.fields.CompressedTextField(verbose_name='Text')),
+                ('length', models.PositiveIntegerField(verbose_name='Length')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Prompt Segment',
+                'verbose_name_plural': 'Prompt Segments',
+            },
+        ),
+        migrations.AddField(
+            model_name='agentresponses',
+            name='message_segments',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Message Segments'),
+        ),
+        migrations.AlterField(
+            model_name='agentresponses',
+            name='message_body',
+            field=utils.fields.SegmentedTextField(segment_model='strongmsp_app.PromptSegments', segments_field='message_segments', verbose_name='Message Body'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.10 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0010_prompt_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='phone_number',
+            field=models.CharField(blank=True, help_text='Used for SMS notifications', max_length=20, null=True, verbose_name='Phone Number'),
+        ),
+    ]
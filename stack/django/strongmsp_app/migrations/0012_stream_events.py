@@ -0,0 +1,28 @@
+# Generated by Django 5.1.10 on 2026-10-19 18:11
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0011_users_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamEvents',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_ids', models.JSONField(verbose_name='Recipient IDs')),
+                ('event', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Event')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Stream Event',
+                'verbose_name_plural': 'Stream Events',
+                'indexes': [models.Index(fields=['created_at'], name='strongmsp_a_created_17600b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.10 on 2026-10-19 18:15
+
+import utils.fields
+from django.db import migrations, models
+
+
+def backfill_message_length(apps, schema_editor):
+    """Sum the segment lengths of prompts segmented before the length was stored."""
+    AgentResponses = apps.get_model('strongmsp_app', 'AgentResponses')
+    PromptSegments = apps.get_model('strongmsp_app', 'PromptSegments')
+    rows = list(
+        AgentResponses.objects.filter(message_segments__isnull=False, message_body='')
+        .values_list('id', 'message_segments')
+    )
+    lengths = dict(
+        PromptSegments.objects.filter(pk__in={key for _, hashes in rows for key in hashes}).values_list('pk', 'length')
+    )
+    for response_id, hashes in rows:
+        AgentResponses.objects.filter(pk=response_id).update(
+            message_length=sum(lengths.get(key, 0) for key in hashes)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0012_stream_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentresponses',
+            name='message_length',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Message Length'),
+        ),
+        migrations.AlterField(
+            model_name='agentresponses',
+            name='message_body',
+            field=utils.fields.SegmentedTextField(length_field='message_length', segment_model='strongmsp_app.PromptSegments', segments_field='message_segments', verbose_name='Message Body'),
+        ),
+        migrations.RunPython(backfill_message_length, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.10 on 2026-10-19 18:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_last_used_at(apps, schema_editor):
+    """Existing segments were last used when they were created, as far as prune knows."""
+    PromptSegments = apps.get_model('strongmsp_app', 'PromptSegments')
+    PromptSegments.objects.update(last_used_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strongmsp_app', '0013_agentresponses_message_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promptsegments',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last Used At'),
+        ),
+        migrations.RunPython(backfill_last_used_at, migrations.RunPython.noop),
+    ]
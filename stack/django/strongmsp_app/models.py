@@ -2,11 +2,13 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
 from utils.models import BumpParentsModelMixin
+from utils.fields import CompressedTextField, SegmentedTextField
 from allauth.account.models import EmailAddress
 from django.dispatch import receiver
 from allauth.account.signals import email_confirmed
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 import os
 
@@ -55,6 +57,7 @@ class Users(AbstractUser, BumpParentsModelMixin):
 		help_text='Array of ethnicity choices - allows multiple selection')
 	birthdate = models.DateField(blank=True, null=True, verbose_name='Birthdate')
 	zip_code = models.CharField(max_length=10, blank=True, null=True, verbose_name='Zip Code')
+	phone_number = models.CharField(max_length=20, blank=True, null=True, verbose_name='Phone Number', help_text='Used for SMS notifications')
 	waiver_signed = models.BooleanField(default=False, verbose_name='Waiver Signed')
 	
 	# Assessment category scores (cached from most recent assessment)
@@ -313,6 +316,9 @@ class QuestionResponses(SuperModel):
 		abstract = False
 		verbose_name = "Question Response"
 		verbose_name_plural = "Question Responses"
+		constraints = [
+			models.UniqueConstraint(fields=['author', 'assessment', 'question'], name='unique_question_response'),
+		]
 
 	author = models.ForeignKey(get_user_model(), on_delete=models.PROTECT, related_name='+', null=False, verbose_name='Athlete')
 	question = models.ForeignKey('Questions', on_delete=models.PROTECT, related_name='+', null=False, verbose_name='Question')
@@ -485,9 +491,12 @@ class AgentResponses(SuperModel):
 	assignment = models.ForeignKey('PaymentAssignments', on_delete=models.CASCADE, related_name='+', null=False, verbose_name='Payment Assignment')
 	prompt_template = models.ForeignKey('PromptTemplates', on_delete=models.SET_NULL, related_name='+', null=True, verbose_name='Prompt Template')
 	purpose = models.CharField(max_length=50, choices=PurposeChoices.choices, verbose_name='Purpose')
-	message_body = models.TextField(verbose_name='Message Body')
-	ai_response = models.TextField(verbose_name='AI Response')
-	ai_reasoning = models.TextField(blank=True, null=True, verbose_name='AI Reasoning')
+	message_body = SegmentedTextField(segments_field='message_segments', segment_model='strongmsp_app.PromptSegments', length_field='message_length', verbose_name='Message Body')
+	ai_response = CompressedTextField(verbose_name='AI Response')
+	ai_reasoning = CompressedTextField(blank=True, null=True, verbose_name='AI Reasoning')
+	# Ordered PromptSegments hashes of a long message_body, whose column is then empty
+	message_segments = models.JSONField(blank=True, null=True, editable=False, verbose_name='Message Segments')
+	message_length = models.PositiveIntegerField(blank=True, null=True, editable=False, verbose_name='Message Length')
 
 	def __str__(self):
 		athlete_name = self.athlete.get_full_name() if self.athlete and self.athlete.get_full_name() else (self.athlete.username if self.athlete else 'Unknown Athlete')
@@ -549,6 +558,7 @@ class Notifications(SuperModel):
 			models.Index(fields=['channel', 'delivery_status']),
 			models.Index(fields=['notification_group']),
 			models.Index(fields=['recipient', 'seen']),
+			models.Index(fields=['recipient', 'channel', 'modified_at']),
 		]
 
 	recipient = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='notifications', verbose_name='Recipient')
@@ -667,3 +677,87 @@ class UserOrganizations(SuperModel):
 	
 	joined_at = models.DateTimeField(auto_now_add=True, verbose_name='Joined At')
 	is_active = models.BooleanField(default=True, verbose_name='Is Active')
+
+class CoachSearchTerms(models.Model):
+	"""
+	Prefix search index of the active coaches of each organization, one row per
+	search term (services/coach_search.py). The display fields are repeated on
+	every row so autocomplete results come from this table alone.
+	"""
+	class Meta:
+		verbose_name = "Coach Search Term"
+		verbose_name_plural = "Coach Search Terms"
+		indexes = [
+			models.Index(fields=['organization', 'term']),
+		]
+
+	organization = models.ForeignKey('Organizations', on_delete=models.CASCADE, related_name='+')
+	user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='+')
+	term = models.CharField(max_length=64, verbose_name='Term', help_text='Lowercased, accent-free word of a name, username or email')
+	weight = models.PositiveSmallIntegerField(default=1, verbose_name='Weight')
+	display = models.CharField(max_length=255, verbose_name='Display Name')
+	sort_name = models.CharField(max_length=255, verbose_name='Sort Name')
+	photo = models.CharField(max_length=255, blank=True, null=True, verbose_name='Photo')
+
+class ContentSearchDocuments(models.Model):
+	"""
+	Full-text search index over coach content and agent responses, one row per
+	source object (services/content_search.py). Assignment and athlete are
+	copied from the source so searches apply the same access rules as the
+	CoachContent and AgentResponses endpoints without joining them.
+	"""
+	class Meta:
+		verbose_name = "Content Search Document"
+		verbose_name_plural = "Content Search Documents"
+		constraints = [
+			models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_content_search_document'),
+		]
+
+	class Doc_typeChoices(models.TextChoices):
+		coach_content = ("coach_content", "Coach Content")
+		agent_response = ("agent_response", "Agent Response")
+
+	doc_type = models.CharField(max_length=20, choices=Doc_typeChoices.choices, verbose_name='Document Type')
+	object_id = models.PositiveBigIntegerField(verbose_name='Object ID')
+	assignment = models.ForeignKey('PaymentAssignments', on_delete=models.SET_NULL, related_name='+', null=True, blank=True, verbose_name='Payment Assignment')
+	athlete = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='+', null=True, blank=True, verbose_name='Athlete')
+	purpose = models.CharField(max_length=50, blank=True, null=True, verbose_name='Purpose')
+	title = models.TextField(verbose_name='Title')
+	body = models.TextField(verbose_name='Body')
+	modified_at = models.DateTimeField(verbose_name='Modified At')
+
+class PromptSegments(models.Model):
+	"""
+	Paragraphs of AgentResponses.message_body, stored once however many
+	prompts contain them and keyed by the SHA-256 of their text. System
+	instructions and assessment context repeat across the agents of a run and
+	across regenerations; a response keeps only the ordered hashes.
+	"""
+	class Meta:
+		verbose_name = "Prompt Segment"
+		verbose_name_plural = "Prompt Segments"
+
+	hash = models.CharField(max_length=64, primary_key=True, verbose_name='SHA-256')
+	text = CompressedTextField(verbose_name='Text')
+	length = models.PositiveIntegerField(verbose_name='Length')
+	created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+	# Refreshed when a save reuses the segment; segment_text_fields --prune only deletes idle ones
+	last_used_at = models.DateTimeField(default=timezone.now, verbose_name='Last Used At')
+
+class StreamEvents(models.Model):
+	"""
+	Short-lived outbox for server-pushed events (services/event_stream.py).
+	Every ASGI worker polls the recent rows it has not seen yet and hands them
+	to its own open streams, so events published by any process, including
+	the notification worker, reach clients connected to any worker.
+	"""
+	class Meta:
+		verbose_name = "Stream Event"
+		verbose_name_plural = "Stream Events"
+		indexes = [
+			models.Index(fields=['created_at']),
+		]
+
+	user_ids = models.JSONField(verbose_name='Recipient IDs')
+	event = models.JSONField(encoder=DjangoJSONEncoder, verbose_name='Event')
+	created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
@@ -4,10 +4,15 @@ Notification Service
 Helper functions for creating and managing multi-channel notifications.
 """
 import uuid
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import models
 from .models import Notifications
 
+# Unread dashboard counts are cached per recipient and dropped on every write
+UNREAD_COUNT_CACHE_KEY = 'notifications:unread:{user_id}'
+UNREAD_COUNT_CACHE_TTL = 60
+
 
 def create_notification_group(recipient, message, channels, notification_type=None, 
                             priority='normal', link=None, expires=None, remind_time=None,
@@ -57,47 +62,36 @@ def create_notification_group(recipient, message, channels, notification_type=No
 
 def send_notification(notification_id):
     """
-    Send notification via its channel (email/SMS).
+    Queue a notification for delivery via its channel (email/SMS).
+    
+    Email and SMS are only ever sent by the deliver_notifications worker, which
+    leases rows before sending, so the request thread never waits on SMTP,
+    Twilio or the rate limiter and a row cannot be sent twice. Sent or failed
+    rows are queued again; pending rows are left alone as they may be in flight.
     
     Args:
         notification_id: ID of the notification to send
     
     Returns:
-        Boolean indicating success
+        Boolean indicating the notification is delivered or queued
     """
     try:
         notification = Notifications.objects.get(id=notification_id)
-        
-        if notification.channel == 'dashboard':
-            # Dashboard notifications are already "delivered" when created
-            notification.delivery_status = 'delivered'
-            notification.save()
-            return True
-            
-        elif notification.channel == 'email':
-            # TODO: Integrate with your email service (SendGrid, AWS SES, etc.)
-            # For now, just mark as sent
-            notification.delivery_status = 'sent'
-            notification.sent_at = timezone.now()
-            notification.save()
-            return True
-            
-        elif notification.channel == 'sms':
-            # TODO: Integrate with your SMS service (Twilio, AWS SNS, etc.)
-            # For now, just mark as sent
-            notification.delivery_status = 'sent'
-            notification.sent_at = timezone.now()
-            notification.save()
-            return True
-            
     except Notifications.DoesNotExist:
         return False
-    except Exception as e:
-        # Log error and mark as failed
-        notification.delivery_status = 'failed'
-        notification.delivery_error = str(e)
-        notification.save()
-        return False
+
+    if notification.channel == 'dashboard':
+        # Dashboard notifications are already "delivered" when created
+        if notification.delivery_status != 'delivered':
+            notification.delivery_status = 'delivered'
+            notification.save()
+        return True
+
+    # A single UPDATE, so a worker that claims the row concurrently is never overwritten
+    Notifications.objects.filter(id=notification_id).exclude(delivery_status='pending').update(
+        delivery_status='pending', delivery_error=None, remind_time=None, modified_at=timezone.now()
+    )
+    return True
 
 
 def mark_group_seen(notification_group_id):
@@ -110,10 +104,127 @@ def mark_group_seen(notification_group_id):
     Returns:
         Number of notifications marked as seen
     """
-    return Notifications.objects.filter(
+    queryset = Notifications.objects.filter(
         notification_group=notification_group_id,
         channel='dashboard'
-    ).update(seen=True)
+    )
+    recipient_ids = set(queryset.values_list('recipient_id', flat=True))
+    updated = queryset.update(seen=True, modified_at=timezone.now())
+    for recipient_id in recipient_ids:
+        invalidate_unread_count(recipient_id)
+    return updated
+
+
+def get_unread_count(user):
+    """
+    Get the number of unseen, unexpired dashboard notifications for a user.
+    
+    Served from cache; on a miss a single COUNT runs over the (recipient, seen) index.
+    
+    Args:
+        user: User instance
+    
+    Returns:
+        Integer unread count
+    """
+    key = UNREAD_COUNT_CACHE_KEY.format(user_id=user.id)
+    count = cache.get(key)
+    if count is None:
+        now = timezone.now()
+        count = Notifications.objects.filter(
+            recipient=user,
+            seen=False,
+            channel='dashboard'
+        ).filter(
+            models.Q(expires__isnull=True) | models.Q(expires__gt=now)
+        ).count()
+        cache.set(key, count, UNREAD_COUNT_CACHE_TTL)
+    return count
+
+
+def invalidate_unread_count(user_id):
+    """
+    Drop the cached unread count for a recipient.
+    
+    Args:
+        user_id: ID of the recipient
+    """
+    cache.delete(UNREAD_COUNT_CACHE_KEY.format(user_id=user_id))
+
+
+def encode_sync_cursor(modified_at, last_id=0):
+    """
+    Build the opaque ?since= token handed to dashboard clients.
+    
+    Args:
+        modified_at: modified_at of the last row the client has seen
+        last_id: ID of that row, to break ties between rows sharing a timestamp
+    
+    Returns:
+        Cursor string "<ISO 8601 datetime>~<id>"
+    """
+    return f"{modified_at.isoformat()}~{last_id}"
+
+
+def parse_sync_cursor(token):
+    """
+    Parse a ?since= token from encode_sync_cursor(). A bare ISO 8601 datetime
+    is accepted as a cursor positioned before every row at that time.
+    
+    Args:
+        token: Cursor string from the client
+    
+    Returns:
+        Tuple of (aware datetime, last id), or None if the token is invalid
+    """
+    from django.utils.dateparse import parse_datetime
+
+    timestamp, _, last_id = token.partition('~')
+    try:
+        since = parse_datetime(timestamp)
+        last_id = int(last_id) if last_id else 0
+    except ValueError:
+        return None
+    if since is None:
+        return None
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since, last_id
+
+
+def get_dashboard_changes(user, since, last_id=0, limit=50):
+    """
+    Get dashboard notifications created or modified after a sync cursor.
+    
+    Results are ordered by (modified_at, id) and the cursor is the same pair,
+    so a page that ends among rows sharing a timestamp (bulk writes) picks up
+    the rest of them on the next call.
+    
+    Args:
+        user: User instance
+        since: modified_at of the client's cursor
+        last_id: ID of the client's cursor row (default: 0)
+        limit: Maximum rows to return, at least 1 (default: 50)
+    
+    Returns:
+        Tuple of (list of notifications, next cursor token, has_more)
+    """
+    limit = max(limit, 1)
+    rows = list(
+        Notifications.objects.filter(
+            recipient=user,
+            channel='dashboard'
+        ).filter(
+            models.Q(modified_at__gt=since) | models.Q(modified_at=since, id__gt=last_id)
+        ).order_by('modified_at', 'id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursor = encode_sync_cursor(rows[-1].modified_at, rows[-1].id)
+    else:
+        cursor = encode_sync_cursor(since, last_id)
+    return rows, cursor, has_more
 
 
 def get_user_notifications(user, channel=None, seen=None, notification_type=None):
@@ -1,6 +1,7 @@
 import logging
 
 from django.db.models import ImageField, FileField
+from django.db.models.functions import Length, Substr
 from rest_framework import serializers
 # from .schema_annotations import ExpandedRelationsMixin  # not needed for schema; using extension
 
@@ -30,6 +31,20 @@ from django.core.exceptions import FieldDoesNotExist
 from google.auth.exceptions import DefaultCredentialsError
 
 ####OBJECT-ACTIONS-SERIALIZERS-STARTS####
+# Characters of a deferred text field returned as its preview in summary responses
+DEFERRED_PREVIEW_LENGTH = 200
+
+
+def requested_fields(request):
+    """Field names asked for with ?fields=a,b (or repeated ?fields=)."""
+    if request is None:
+        return set()
+    return {
+        name.strip()
+        for value in request.query_params.getlist('fields', [])
+        for name in value.split(',') if name.strip()
+    }
+
 class CustomUsersSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         # Get the original representation
@@ -79,6 +94,61 @@ class CustomSerializer(serializers.ModelSerializer):
                 validated_data['author'] = request.user
         return super().update(instance, validated_data)
 
+    @classmethod
+    def get_deferred_fields(cls):
+        """Heavy text fields (Meta.deferred_fields) that summary responses leave out."""
+        return tuple(getattr(cls.Meta, 'deferred_fields', ()))
+
+    @classmethod
+    def get_summary_deferred_fields(cls, request):
+        return tuple(name for name in cls.get_deferred_fields() if name not in requested_fields(request))
+
+    @classmethod
+    def summarize_queryset(cls, queryset, request):
+        """
+        Defer the fields a summary response leaves out and annotate their length
+        and preview instead, so the full text never leaves the database.
+        """
+        deferred = cls.get_summary_deferred_fields(request)
+        if not deferred:
+            return queryset
+        annotations = {}
+        for name in deferred:
+            model_field = cls.Meta.model._meta.get_field(name)
+            if hasattr(model_field, 'summary_annotations'):
+                # e.g. CompressedTextField, whose stored form SQL cannot measure
+                annotations.update(model_field.summary_annotations(name, DEFERRED_PREVIEW_LENGTH))
+            else:
+                annotations[f'{name}_length'] = Length(name)
+                annotations[f'{name}_preview'] = Substr(name, 1, DEFERRED_PREVIEW_LENGTH)
+        return queryset.defer(*deferred).annotate(**annotations)
+
+    def summary_fields(self):
+        """Deferred fields left out of this response: in summary mode (context['summary']) unless requested."""
+        if not self.context.get('summary'):
+            return ()
+        return self.get_summary_deferred_fields(self.context.get('request'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.summary_fields():
+            fields.pop(name, None)
+        return fields
+
+    def deferred_summary(self, instance, name):
+        """Length and preview of a left out field, or None when only a query per row could tell."""
+        if hasattr(instance, f'{name}_length'):
+            preview = getattr(instance, f'{name}_preview')
+            length = getattr(instance, f'{name}_length')
+            if length is None and not getattr(instance, f'{name}_segmented', False):
+                # No SQL length (NULL or compressed): the preview holds the whole value
+                length = len(preview or '')
+            return {'length': length, 'preview': preview[:DEFERRED_PREVIEW_LENGTH] if preview is not None else None}
+        if name in instance.get_deferred_fields():
+            return None
+        value = getattr(instance, name)
+        return {'length': len(value or ''), 'preview': value[:DEFERRED_PREVIEW_LENGTH] if value is not None else None}
+
     def has_field(self, field_name):
         model = self.Meta.model
         try:
@@ -160,12 +230,20 @@ class CustomSerializer(serializers.ModelSerializer):
                     for related in related_instances:
                         representation[field_name].append(self.normalize_instance(related, field_name))
 
+        summary_fields = self.summary_fields()
+        if summary_fields:
+            representation['_deferred'] = {}
+            for name in summary_fields:
+                summary = self.deferred_summary(instance, name)
+                if summary is not None:
+                    representation['_deferred'][name] = summary
+
         return representation
 
 class UsersSerializer(CustomUsersSerializer):
     class Meta:
         model = Users
-        exclude = ('password', 'email', 'is_active', 'is_staff', 'is_superuser')
+        exclude = ('password', 'email', 'phone_number', 'is_active', 'is_staff', 'is_superuser')
         
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -177,6 +255,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'ethnicity',
             'birthdate',
             'zip_code',
+            'phone_number',
             'bio',
             'avatar',
             'photo',
@@ -223,6 +302,8 @@ class AssessmentsSerializer(serializers.ModelSerializer):
                 "help_text": "Question help text",
                 "question_category": "confidence",
                 "scale": "onetofive",
+                "scale_choice_labels": null,
+                "conditions": null,
                 "id": 1,
                 "_type": "Questions"
             }
@@ -244,8 +325,8 @@ class AssessmentsSerializer(serializers.ModelSerializer):
         questions_data = []
 
         try:
-            # Get all AssessmentQuestions for this assessment, ordered by order
-            assessment_questions = obj.questions.all().order_by('order')
+            # Sort in Python so prefetch_related('questions__question') is used
+            assessment_questions = sorted(obj.questions.all(), key=lambda aq: (aq.order, aq.id))
 
             # Get athlete_id from context to include responses
             athlete_id = self.context.get('athlete_id')
@@ -270,6 +351,7 @@ class AssessmentsSerializer(serializers.ModelSerializer):
                         'question_category': assessment_question.question.question_category,
                         'scale': assessment_question.question.scale,
                         'scale_choice_labels': assessment_question.question.scale_choice_labels,
+                        'conditions': assessment_question.conditions,
                         'id': assessment_question.question.id,
                         '_type': 'Questions'
                     }
@@ -292,6 +374,23 @@ class QuestionResponsesSerializer(CustomSerializer):
         model = QuestionResponses
         fields = '__all__'
         read_only_fields = ['author']
+
+    def create(self, validated_data):
+        # One response per athlete, assessment and question: answering again replaces it
+        request = self.context.get('request', None)
+        author = validated_data.get('author')
+        if request and hasattr(request, 'user') and request.user.is_authenticated:
+            author = request.user
+        if author is None:
+            return super().create(validated_data)
+        response, _ = QuestionResponses.objects.update_or_create(
+            author=author,
+            assessment=validated_data['assessment'],
+            question=validated_data['question'],
+            defaults={'response': validated_data['response']},
+        )
+        return response
+
 class PromptTemplatesSerializer(CustomSerializer):
     class Meta:
         model = PromptTemplates
@@ -300,13 +399,17 @@ class PromptTemplatesSerializer(CustomSerializer):
 class AgentResponsesSerializer(CustomSerializer):
     class Meta:
         model = AgentResponses
-        fields = '__all__'
+        # message_body is reassembled from its segments
+        exclude = ('message_segments', 'message_length')
         read_only_fields = ['author', 'assignment']
+        # The processed prompt alone is often many KB
+        deferred_fields = ('message_body', 'ai_response', 'ai_reasoning')
 class CoachContentSerializer(CustomSerializer):
     class Meta:
         model = CoachContent
         fields = '__all__'
         read_only_fields = ['author', 'assignment', 'source_draft', 'athlete']
+        deferred_fields = ('body',)
 class SharesSerializer(CustomSerializer):
     class Meta:
         model = Shares
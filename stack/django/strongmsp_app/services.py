@@ -1,9 +1,8 @@
 from django.conf import settings
-from twilio.rest import Client
+from utils.helpers import get_twilio_client
 
 def send_sms(phone_number, message):
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    client.messages.create(
+    get_twilio_client().messages.create(
         body=message,
         from_=settings.TWILIO_PHONE_NUMBER,
         to=phone_number
@@ -12,6 +12,8 @@ import logging
 from ..models import AgentResponses, PromptTemplates, PaymentAssignments
 from .confidence_analyzer import ConfidenceAnalyzer
 from .agentic_context_builder import AgenticContextBuilder
+from .prompt_registry import get_prompt_registry
+from .request_metrics import external_call
 
 logger = logging.getLogger(__name__)
 
@@ -137,7 +139,8 @@ class AgentCompletionService:
                 completion_kwargs['response_format'] = {'type': 'json_object'}
             
             # Run completion
-            response = self.client.chat.completions.create(**completion_kwargs)
+            with external_call('openai'):
+                response = self.client.chat.completions.create(**completion_kwargs)
             
             # Extract response content
             ai_response = response.choices[0].message.content
@@ -148,7 +151,9 @@ class AgentCompletionService:
                 ai_reasoning = response.choices[0].message.reasoning
             
             # Get processed prompt for storage (with tokens replaced)
-            processed_prompt = context_builder.replace_template_tokens(prompt_template.prompt)
+            processed_prompt = context_builder.replace_template_tokens(
+                prompt_template.prompt, get_prompt_registry().tokens(prompt_template)['prompt']
+            )
             
             # Create AgentResponse record
             # Author must be coach (content creator), no fallback
@@ -176,7 +181,9 @@ class AgentCompletionService:
                 context_builder = AgenticContextBuilder()
                 context_builder.add_athlete_context(athlete)
                 context_builder.add_assessment_context(assessment)
-                processed_prompt = context_builder.replace_template_tokens(prompt_template.prompt)
+                processed_prompt = context_builder.replace_template_tokens(
+                    prompt_template.prompt, get_prompt_registry().tokens(prompt_template)['prompt']
+                )
             except:
                 pass  # Use original prompt if context building fails
             
@@ -364,7 +371,8 @@ class AgentCompletionService:
                 completion_kwargs['response_format'] = {'type': 'json_object'}
             
             # Run completion
-            response = self.client.chat.completions.create(**completion_kwargs)
+            with external_call('openai'):
+                response = self.client.chat.completions.create(**completion_kwargs)
             
             # Extract response content
             ai_response = response.choices[0].message.content
@@ -375,7 +383,9 @@ class AgentCompletionService:
                 ai_reasoning = response.choices[0].message.reasoning
             
             # Get processed prompt for storage (with tokens replaced)
-            processed_prompt = context_builder.replace_template_tokens(prompt_template.prompt)
+            processed_prompt = context_builder.replace_template_tokens(
+                prompt_template.prompt, get_prompt_registry().tokens(prompt_template)['prompt']
+            )
             
             # Create AgentResponse record
             # Author must be coach (content creator), no fallback
@@ -403,7 +413,9 @@ class AgentCompletionService:
                 context_builder = AgenticContextBuilder()
                 context_builder.add_athlete_context(athlete)
                 context_builder.add_assessment_context(assessment)
-                processed_prompt = context_builder.replace_template_tokens(prompt_template.prompt)
+                processed_prompt = context_builder.replace_template_tokens(
+                    prompt_template.prompt, get_prompt_registry().tokens(prompt_template)['prompt']
+                )
             except:
                 pass  # Use original prompt if context building fails
             
@@ -3,14 +3,17 @@ Agent Orchestrator Service
 
 Manages agent execution flow with async/sync patterns and notifications.
 """
+import contextvars
 import threading
 import logging
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from strongmsp_base.db import with_closed_connections
 
-from ..models import PromptTemplates, AgentResponses, Payments, PaymentAssignments, Assessments
+from ..models import AgentResponses, Payments, PaymentAssignments, Assessments
 from .agent_completion_service import AgentCompletionService
 from .confidence_analyzer import ConfidenceAnalyzer
+from .prompt_registry import get_prompt_registry
 from ..notification_service import create_notification_group
 
 logger = logging.getLogger(__name__)
@@ -218,7 +221,7 @@ class AgentOrchestrator:
     
     def get_prompt_template_by_purpose(self, purpose):
         """
-        Get active prompt template by purpose.
+        Get active prompt template by purpose, from the in-memory template registry.
         
         Args:
             purpose: Purpose string (feedbackreport, talkingpoints, etc.)
@@ -227,10 +230,7 @@ class AgentOrchestrator:
             PromptTemplates instance or None
         """
         try:
-            template = PromptTemplates.objects.filter(
-                purpose=purpose,
-                status='active'
-            ).first()
+            template = get_prompt_registry().get(purpose)
             
             if not template:
                 logger.warning(f"No active template found for purpose: {purpose}")
@@ -283,6 +283,8 @@ class AgentOrchestrator:
             # Create threads for parallel execution
             threads = []
             
+            # Agent threads run outside the request cycle, so close their DB connections explicitly
+            @with_closed_connections
             def run_agent(purpose):
                 try:
                     template = self.get_prompt_template_by_purpose(purpose)
@@ -314,7 +316,8 @@ class AgentOrchestrator:
             
             # Start threads
             for purpose in purposes:
-                thread = threading.Thread(target=run_agent, args=(purpose,))
+                # Carry the request's context so request metrics see the completion time
+                thread = threading.Thread(target=contextvars.copy_context().run, args=(run_agent, purpose))
                 thread.start()
                 threads.append(thread)
             
@@ -81,6 +81,16 @@ TOKEN_FUNCTIONS = {
 }
 
 
+def template_tokens(text: Optional[str]) -> tuple:
+    """
+    TOKEN_FUNCTIONS keys a text uses, in upper- or lowercase. Prompt templates
+    are parsed once when the registry loads them (prompt_registry.py).
+    """
+    if not text:
+        return ()
+    return tuple(token for token in TOKEN_FUNCTIONS if token in text or token.lower() in text)
+
+
 class AgenticContextBuilder:
     """
     Builds structured context for OpenAI completions with clear prefixes and formatting.
@@ -420,12 +430,14 @@ class AgenticContextBuilder:
         """
         return self.context_parts.get(key, '')
     
-    def replace_template_tokens(self, template_text: str) -> str:
+    def replace_template_tokens(self, template_text: str, tokens: Optional[tuple] = None) -> str:
         """
-        Replace tokens in prompt text using context data.
+        Replace tokens in prompt text using context data. Only the tokens the
+        text uses are resolved.
         
         Args:
             template_text: Template text with {tokens}
+            tokens: Tokens the text uses if already known (template_tokens())
             
         Returns:
             Text with tokens replaced
@@ -434,10 +446,12 @@ class AgenticContextBuilder:
             return template_text
         
         result = template_text
+        if tokens is None:
+            tokens = template_tokens(template_text)
         
-        for token, resolver in TOKEN_FUNCTIONS.items():
+        for token in tokens:
             try:
-                value = resolver(self)
+                value = TOKEN_FUNCTIONS[token](self)
                 # Support both uppercase and lowercase tokens
                 result = result.replace(token, str(value))
                 result = result.replace(token.lower(), str(value))
@@ -0,0 +1,305 @@
+"""
+API Benchmark Service
+
+Measures latency and query count of the API hot paths against a fixed
+synthetic dataset (see synthetic_data.py). Requests go through the full
+Django stack with the test client, OpenAI is replaced by a local stub, and
+results are plain dicts ready to be dumped as JSON and diffed between commits.
+"""
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import django
+import openai
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from ..models import Assessments, Organizations, PaymentAssignments, PromptTemplates
+from .synthetic_data import SyntheticDataGenerator, get_load_profile
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Small enough to seed in a few seconds, large enough for N+1 patterns to show
+DEFAULT_BENCHMARK_PROFILE = {
+    'ORGANIZATIONS': 2,
+    'ATHLETES': 400,
+    'ATHLETES_PER_COACH': 40,
+    'QUESTIONS': 50,
+    'NOTIFICATIONS_PER_USER': 20,
+    'TEXT_WORDS': 300,
+}
+
+DEFAULT_BENCHMARK_PREFIX = 'bench'
+DEFAULT_BENCHMARK_ITERATIONS = 20
+DEFAULT_BENCHMARK_WARMUP = 2
+
+STUB_COMPLETION = 'Benchmark completion. ' * 50
+
+ASSESSMENT_AGENT_PURPOSES = ['feedback_report', 'talking_points', 'scheduling_email']
+
+
+class BenchmarkError(ValueError):
+    """Raised when the dataset lacks the users a scenario needs."""
+
+
+class StubOpenAI:
+    """Stands in for openai.OpenAI: chat.completions.create returns canned text without a network call."""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=STUB_COMPLETION, reasoning=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@contextmanager
+def stub_openai():
+    """Replace openai.OpenAI for the duration of the block."""
+    original = openai.OpenAI
+    openai.OpenAI = StubOpenAI
+    try:
+        yield
+    finally:
+        openai.OpenAI = original
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def is_failure(status_code):
+    return status_code >= 500
+
+
+def summarize(timings, query_counts, statuses):
+    """
+    Latency and queries cover successful calls only: a 5xx is counted under
+    `failures` so a broken endpoint does not look fast.
+    """
+    ok = [i for i, code in enumerate(statuses) if not is_failure(code)]
+    ok_timings = [timings[i] for i in ok]
+    ok_queries = [query_counts[i] for i in ok]
+    return {
+        'iterations': len(timings),
+        'failures': len(timings) - len(ok),
+        'status': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        'latency_ms': {
+            'mean': round(statistics.fmean(ok_timings), 2),
+            'p50': round(percentile(ok_timings, 0.5), 2),
+            'p95': round(percentile(ok_timings, 0.95), 2),
+            'max': round(max(ok_timings), 2),
+        } if ok else None,
+        'queries': {
+            'mean': round(statistics.fmean(ok_queries), 1),
+            'max': max(ok_queries),
+        } if ok else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class ApiBenchmark:
+    """
+    Seeds the benchmark dataset, runs every scenario and returns the results.
+
+    A scenario is one endpoint called as one kind of user. Each scenario gets
+    `warmup` untimed calls and `iterations` timed calls; query counts come
+    from CaptureQueriesContext, so DEBUG does not need to be on.
+    """
+
+    def __init__(self, prefix=DEFAULT_BENCHMARK_PREFIX, seed=0, profile=None, iterations=DEFAULT_BENCHMARK_ITERATIONS,
+                 warmup=DEFAULT_BENCHMARK_WARMUP, keep=False, only=None, log=None):
+        self.prefix = prefix
+        self.seed = seed
+        self.profile = get_load_profile({**DEFAULT_BENCHMARK_PROFILE, **(profile or {})})
+        self.iterations = iterations
+        self.warmup = warmup
+        self.keep = keep
+        self.only = only
+        self.log = log or logger.info
+        self.generator = SyntheticDataGenerator(prefix=prefix, seed=seed, profile=self.profile, log=self.log)
+        self.template_ids = []
+
+    def run(self):
+        """
+        Returns:
+            Dict with 'meta' (revision, seed, profile, database) and 'endpoints'
+            (latency percentiles, query counts, status codes and 5xx failures
+            per scenario)
+
+        Raises:
+            BenchmarkError: The dataset has no coach or athlete to call the API as
+        """
+        if self.generator.exists():
+            self.log(f"Removing previous benchmark dataset '{self.prefix}'")
+            self.generator.flush()
+        counts = self.generator.generate()
+
+        setup_test_environment()
+        try:
+            with stub_openai():
+                self.create_prompt_templates()
+                endpoints = {}
+                for name, scenario in self.scenarios():
+                    if self.only and not any(name.startswith(item) for item in self.only):
+                        continue
+                    self.log(f"Benchmarking {name}")
+                    endpoints[name] = self.measure(scenario)
+        finally:
+            teardown_test_environment()
+            if not self.keep:
+                self.generator.flush()
+                PromptTemplates.objects.filter(id__in=self.template_ids).delete()
+
+        return {
+            'meta': {
+                'revision': git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'seed': self.seed,
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'profile': self.profile,
+                'rows': counts,
+            },
+            'endpoints': endpoints,
+        }
+
+    # Dataset ------------------------------------------------------------
+
+    def create_prompt_templates(self):
+        """complete() only triggers agents that have an active template."""
+        for purpose in ASSESSMENT_AGENT_PURPOSES:
+            if not PromptTemplates.objects.filter(purpose=purpose, status='active').exists():
+                template = PromptTemplates.objects.create(
+                    purpose=purpose, status='active', prompt=f'{self.prefix} prompt for {{athlete_name}}',
+                    author=PromptTemplates.get_default_author(),
+                )
+                self.template_ids.append(template.id)
+
+    def pick_users(self):
+        """The busiest coach, and athletes with a paid assignment, a coach and a complete assessment."""
+        org = Organizations.objects.get(slug=f'{self.prefix}-0')
+        assignments = PaymentAssignments.objects.filter(organization=org)
+        coach_id = (
+            PaymentAssignments.coaches.through.objects.filter(paymentassignments__organization=org)
+            .values('users_id').annotate(total=Count('id')).order_by('-total', 'users_id')
+            .values_list('users_id', flat=True).first()
+        )
+        athletes = list(
+            assignments.filter(payment__status='succeeded', pre_assessment_submitted_at__isnull=False, coaches__isnull=False)
+            .order_by('athlete_id').values_list('athlete_id', flat=True).distinct()
+        )
+        if coach_id is None:
+            raise BenchmarkError(f"No coach has an assignment in '{org.slug}'; the dataset is too small")
+        if not athletes:
+            raise BenchmarkError(
+                f"No athlete in '{org.slug}' has a paid assignment with a coach and a submitted assessment; "
+                f"the dataset is too small"
+            )
+        return org, coach_id, athletes
+
+    # Scenarios ----------------------------------------------------------
+
+    def scenarios(self):
+        org, coach_id, athlete_ids = self.pick_users()
+        assessment = Assessments.objects.get(title=f'{self.prefix} assessment')
+        referer = f'https://{org.slug}.benchmark.local/'
+
+        anonymous = Client(HTTP_REFERER=referer, raise_request_exception=False)
+        coach = self.client(coach_id, referer)
+        athlete = self.client(athlete_ids[0], referer)
+        # Every complete() call needs a fresh athlete, or later calls measure a different path
+        completers = [self.client(user_id, referer) for user_id in athlete_ids[1:self.warmup + self.iterations + 1]] or [athlete]
+
+        yield 'athlete_assignments.coach', [(coach, 'get', '/api/athlete-assignments?limit=25', None)]
+        yield 'context_current.coach', [(coach, 'get', '/api/context/current', None)]
+        yield 'context_current.anonymous', [(anonymous, 'get', '/api/context/current', None)]
+        yield 'assessment_retrieve.athlete', [(athlete, 'get', f'/api/assessments/{assessment.id}', None)]
+        yield 'assessment_complete.athlete', [
+            (client, 'post', '/api/assessments/complete', {'assessment_id': assessment.id}) for client in completers
+        ]
+        yield 'coach_content_list.coach', [(coach, 'get', '/api/coach-content?limit=15', None)]
+        yield 'notifications_dashboard.coach', [(coach, 'get', '/api/notifications/dashboard?limit=50', None)]
+        yield 'coach_search.autocomplete', [(anonymous, 'get', f'/api/users/search-coaches?q=coach&organization={org.slug}', None)]
+        yield 'coach_search.detail', [(anonymous, 'get', f'/api/users/search-coaches?detail=1&organization={org.slug}', None)]
+
+    def client(self, user_id, referer):
+        client = Client(HTTP_REFERER=referer, raise_request_exception=False)
+        client.force_login(User.objects.get(id=user_id))
+        return client
+
+    def measure(self, requests):
+        """Run the warmup and timed calls, cycling through the scenario's requests."""
+        timings, query_counts, statuses = [], [], []
+        for i in range(self.warmup + self.iterations):
+            client, method, path, data = requests[i % len(requests)]
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                if method == 'post':
+                    response = client.post(path, data, content_type='application/json')
+                else:
+                    response = client.get(path)
+                elapsed = (time.perf_counter() - started) * 1000
+            if i < self.warmup:
+                continue
+            timings.append(elapsed)
+            query_counts.append(len(queries))
+            statuses.append(response.status_code)
+
+        result = summarize(timings, query_counts, statuses)
+        result['method'] = requests[0][1].upper()
+        result['path'] = requests[0][2]
+        return result
+
+
+def compare_results(baseline, current):
+    """
+    Per-scenario change between two benchmark results.
+
+    Returns:
+        List of (name, baseline p50, current p50, baseline mean queries,
+        current mean queries); missing values are None
+    """
+    def value(result, group, key):
+        return result[group][key] if result and result.get(group) else None
+
+    rows = []
+    names = sorted(set(baseline.get('endpoints', {})) | set(current.get('endpoints', {})))
+    for name in names:
+        before = baseline.get('endpoints', {}).get(name)
+        after = current.get('endpoints', {}).get(name)
+        rows.append((
+            name,
+            value(before, 'latency_ms', 'p50'),
+            value(after, 'latency_ms', 'p50'),
+            value(before, 'queries', 'mean'),
+            value(after, 'queries', 'mean'),
+        ))
+    return rows
@@ -0,0 +1,282 @@
+"""
+Assessment Condition Service
+
+Evaluates AssessmentQuestions.conditions to decide which questions an athlete
+sees, given their current answers. Conditions are compiled into plain Python
+predicates once per assessment definition version and kept in memory, so
+serving the next batch of questions or validating completion only needs the
+athlete's responses.
+
+Condition format (JSON, stored on AssessmentQuestions.conditions):
+
+    null                                        always visible
+    {"question": 12, "op": "gte", "value": 4}   compare the answer to question 12
+    {"question": 12, "op": "answered"}          question 12 has a visible answer
+    {"all": [...]} / {"any": [...]}             and / or of nested conditions
+    {"not": {...}}                              negation
+    [...]                                       shorthand for {"all": [...]}
+
+Comparison ops: eq (default), ne, gt, gte, lt, lte, in, not_in, between
+([low, high], inclusive), answered, unanswered. A comparison against an
+unanswered or hidden question is false. Conditions may only refer to questions
+that come earlier in the assessment.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from .assessment_definitions import get_assessment_definition, get_definition_version
+
+logger = logging.getLogger(__name__)
+
+COMPILED_CACHE_SIZE = 256
+
+DEFAULT_BATCH_SIZE = 5
+MAX_BATCH_SIZE = 50
+
+COMPARISONS = {
+    'eq': lambda answer, value: answer == value,
+    'ne': lambda answer, value: answer != value,
+    'gt': lambda answer, value: answer > value,
+    'gte': lambda answer, value: answer >= value,
+    'lt': lambda answer, value: answer < value,
+    'lte': lambda answer, value: answer <= value,
+    'in': lambda answer, value: answer in value,
+    'not_in': lambda answer, value: answer not in value,
+    'between': lambda answer, value: value[0] <= answer <= value[1],
+}
+
+
+class ConditionError(ValueError):
+    """Raised when a condition does not follow the condition format."""
+
+
+def always_visible(answers):
+    return True
+
+
+def compile_condition(condition):
+    """
+    Compile a condition into a predicate.
+
+    Args:
+        condition: Condition in the format described in the module docstring
+
+    Returns:
+        (predicate, depends) where predicate(answers) -> bool takes a dict of
+        question_id -> response, and depends is the set of question ids the
+        condition reads
+
+    Raises:
+        ConditionError: If the condition is malformed
+    """
+    if condition is None or condition == {} or condition == []:
+        return always_visible, set()
+
+    if isinstance(condition, list):
+        return compile_condition({'all': condition})
+
+    if not isinstance(condition, dict):
+        raise ConditionError(f"Condition must be an object or a list, got {type(condition).__name__}")
+
+    if 'all' in condition or 'any' in condition:
+        key = 'all' if 'all' in condition else 'any'
+        parts = condition[key]
+        if not isinstance(parts, list):
+            raise ConditionError(f"'{key}' must be a list of conditions")
+        compiled = [compile_condition(part) for part in parts]
+        predicates = tuple(predicate for predicate, _ in compiled)
+        depends = set().union(*(part_depends for _, part_depends in compiled))
+        combine = all if key == 'all' else any
+        return (lambda answers: combine(predicate(answers) for predicate in predicates)), depends
+
+    if 'not' in condition:
+        predicate, depends = compile_condition(condition['not'])
+        return (lambda answers: not predicate(answers)), depends
+
+    if 'question' not in condition:
+        raise ConditionError("Condition needs one of 'question', 'all', 'any' or 'not'")
+
+    try:
+        question_id = int(condition['question'])
+    except (TypeError, ValueError):
+        raise ConditionError(f"Invalid question id: {condition['question']!r}")
+
+    op = condition.get('op', 'eq')
+    if op == 'answered':
+        return (lambda answers: question_id in answers), {question_id}
+    if op == 'unanswered':
+        return (lambda answers: question_id not in answers), {question_id}
+
+    if op not in COMPARISONS:
+        raise ConditionError(f"Unknown operator: {op!r}")
+    if 'value' not in condition:
+        raise ConditionError(f"Operator '{op}' needs a 'value'")
+
+    value = condition['value']
+    if op in ('in', 'not_in'):
+        if not isinstance(value, list):
+            raise ConditionError(f"Operator '{op}' needs a list value")
+        value = frozenset(value)
+    elif op == 'between' and (not isinstance(value, list) or len(value) != 2):
+        raise ConditionError("Operator 'between' needs a [low, high] value")
+
+    compare = COMPARISONS[op]
+
+    def predicate(answers):
+        answer = answers.get(question_id)
+        if answer is None:
+            return False
+        try:
+            return compare(answer, value)
+        except TypeError:
+            return False
+
+    return predicate, {question_id}
+
+
+class CompiledAssessment:
+    """
+    The questions of one assessment version with their compiled conditions.
+
+    Questions are evaluated in assessment order and only answers to visible
+    questions are passed on to later conditions, so an answer left behind by
+    a question that has since been hidden never affects what comes after it.
+    """
+
+    def __init__(self, definition):
+        self.questions = definition.get('questions') or []
+        self.predicates = []
+        self.depends = []
+        seen = set()
+
+        for question_data in self.questions:
+            try:
+                predicate, depends = compile_condition(question_data.get('conditions'))
+            except ConditionError as e:
+                # Fail open: a broken condition must not hide a question for good
+                logger.error(f"Invalid conditions on assessment question {question_data.get('assessment_question_id')}: {e}")
+                predicate, depends = always_visible, set()
+
+            forward = depends - seen
+            if forward:
+                logger.warning(
+                    f"Assessment question {question_data.get('assessment_question_id')} has conditions on "
+                    f"later or unknown questions {sorted(forward)}; they are treated as unanswered"
+                )
+            self.predicates.append(predicate)
+            self.depends.append(depends)
+            seen.add(question_data['id'])
+
+        self.question_ids = seen
+
+    def evaluate(self, responses):
+        """
+        Walk the questions in order.
+
+        Args:
+            responses: Dict of question_id -> response
+
+        Returns:
+            List of (question_data, visible, answered) tuples
+        """
+        effective = {}
+        results = []
+        for question_data, predicate in zip(self.questions, self.predicates):
+            visible = predicate(effective)
+            answered = question_data['id'] in responses
+            if visible and answered:
+                effective[question_data['id']] = responses[question_data['id']]
+            results.append((question_data, visible, answered))
+        return results
+
+    def visible_questions(self, responses):
+        """Questions the athlete currently sees, in order."""
+        return [question_data for question_data, visible, _ in self.evaluate(responses) if visible]
+
+    def missing_questions(self, responses):
+        """Visible questions that still need an answer, in order."""
+        return [
+            question_data for question_data, visible, answered in self.evaluate(responses)
+            if visible and not answered
+        ]
+
+    def next_batch(self, responses, limit=DEFAULT_BATCH_SIZE):
+        """
+        The next unanswered visible questions, up to `limit`.
+
+        The batch stops before any question whose visibility depends on an
+        answer still pending in the batch, so everything returned is known to
+        be visible until the batch has been answered.
+
+        Returns:
+            Dict with the batch and the athlete's progress
+        """
+        batch = []
+        pending = set()
+        visible_count = 0
+        answered_count = 0
+        stopped = False
+
+        for (question_data, visible, answered), depends in zip(self.evaluate(responses), self.depends):
+            if visible:
+                visible_count += 1
+                answered_count += answered
+            if stopped or (visible and answered):
+                continue
+            if depends & pending or len(batch) >= limit:
+                stopped = True
+                continue
+            if visible:
+                batch.append(question_data)
+                pending.add(question_data['id'])
+
+        return {
+            'questions': batch,
+            'answered': answered_count,
+            'visible': visible_count,
+            'remaining': visible_count - answered_count,
+            'complete': visible_count == answered_count,
+        }
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_assessment(assessment, version=None):
+    """
+    Get the compiled conditions for the current version of an assessment.
+
+    Compiled assessments are kept in a per-process LRU keyed by the definition
+    version, so a content change is picked up on the next call.
+
+    Args:
+        assessment: Assessments instance
+        version: Content version from get_definition_version (optional)
+
+    Returns:
+        CompiledAssessment
+    """
+    version = version or get_definition_version(assessment.id)
+    key = (assessment.id, version)
+
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = CompiledAssessment(get_assessment_definition(assessment, version))
+
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def clear_compiled_assessments():
+    """Drop every compiled assessment held by this process."""
+    with _compiled_lock:
+        _compiled.clear()
@@ -0,0 +1,107 @@
+"""
+Assessment Definition Service
+
+Caches the serialized definition of an assessment (ordered questions with their
+categories, scales, labels and conditions). Each assessment has a content
+version that is replaced whenever its questions change; the version is part of
+the cache key and of the ETag, so stale definitions are never served and
+clients can revalidate with If-None-Match.
+"""
+import hashlib
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
+
+from ..models import AssessmentQuestions, QuestionResponses
+from .tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+DEFINITION_VERSION_KEY = 'assessments:definition-version:{assessment_id}'
+DEFINITION_CACHE_KEY = '{assessment_id}:{version}'
+DEFINITION_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_definition_version(assessment_id):
+    """
+    Current content version of an assessment. A missing version (first use,
+    eviction) gets a fresh random token, which can never match an older
+    cached definition.
+    """
+    key = DEFINITION_VERSION_KEY.format(assessment_id=assessment_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_definition_version(assessment_ids):
+    """Give the assessments a new content version after their questions changed."""
+    for assessment_id in set(assessment_ids):
+        cache.set(DEFINITION_VERSION_KEY.format(assessment_id=assessment_id), uuid.uuid4().hex[:12], timeout=None)
+
+
+def build_assessment_definition(assessment):
+    """
+    Serialize an assessment without athlete responses, loading its questions
+    in a single prefetch query.
+    """
+    from ..serializers import AssessmentsSerializer
+
+    prefetch_related_objects([assessment], Prefetch(
+        'questions',
+        queryset=AssessmentQuestions.objects.select_related('question')
+    ))
+    return dict(AssessmentsSerializer(assessment).data)
+
+
+def get_assessment_definition(assessment, version=None):
+    """
+    Get the cached definition for an assessment, building it on a miss.
+
+    Args:
+        assessment: Assessments instance
+        version: Content version from get_definition_version (optional)
+
+    Returns:
+        Dict in the AssessmentsSerializer format, without responses
+    """
+    version = version or get_definition_version(assessment.id)
+    # Versioned keys never change, so the in-process tier can keep them safely
+    return get_tiered_cache().get_or_set(
+        'assessment_definitions', DEFINITION_CACHE_KEY.format(assessment_id=assessment.id, version=version),
+        lambda: build_assessment_definition(assessment), timeout=DEFINITION_CACHE_TIMEOUT
+    )
+
+
+def get_athlete_responses(assessment_id, athlete_id):
+    """Map question_id -> response for one athlete's answers to an assessment."""
+    if not athlete_id:
+        return {}
+    return dict(
+        QuestionResponses.objects
+        .filter(author_id=athlete_id, assessment_id=assessment_id)
+        .values_list('question_id', 'response')
+    )
+
+
+def get_definition_etag(assessment_id, version, responses):
+    """ETag covering the definition version and the athlete's current responses."""
+    digest = hashlib.md5(repr(sorted(responses.items())).encode()).hexdigest()[:12]
+    return f'"assessment-{assessment_id}-{version}-{digest}"'
+
+
+def merge_responses(definition, responses):
+    """Copy the cached definition with the athlete's responses filled in."""
+    merged = dict(definition)
+    questions = []
+    for question_data in definition['questions']:
+        if question_data['id'] in responses:
+            question_data = dict(question_data, response=responses[question_data['id']])
+        questions.append(question_data)
+    merged['questions'] = questions
+    return merged
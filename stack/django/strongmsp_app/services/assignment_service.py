@@ -1,7 +1,8 @@
 from django.db.models import Q
-from django.db import connection
+from django.db import connections
 from django.utils import timezone
 from ..models import PaymentAssignments, Assessments
+from strongmsp_base.db import read_alias, replica_reads
 from utils.helpers import get_subdomain_from_request
 from ..models import AgentResponses, CoachContent
 from django.db.models import Q
@@ -18,6 +19,7 @@ class AssignmentService:
         self.user = request.user
         self.organization_slug = get_subdomain_from_request(request)
 
+    @replica_reads()
     def get_all_paginated(self, limit=None, offset=None, pre_assessment_submitted=None, sort_by=None):
         """
         Get paginated athlete assignments with optional filtering and sorting.
@@ -131,7 +133,7 @@ class AssignmentService:
         # Data query: add pagination to base query
         data_sql = base_query + limit_offset_clause + ";"
 
-        with connection.cursor() as cursor:
+        with connections[read_alias()].cursor() as cursor:
             # Get total count
             cursor.execute(count_sql, params)
             total_count = cursor.fetchone()[0]
@@ -0,0 +1,334 @@
+"""
+Bulk Upsert Service
+
+Shared write layer for the sheet import commands (upsert_assessment_questions,
+create_assessment_from_questions and upsert_user_responses). Sheets are read
+with the csv module, questions are matched by normalized title against an
+in-memory index built with a single query, and rows are written in chunks with
+bulk_create / bulk_update, using bulk_create(update_conflicts=True) for
+responses.
+"""
+import csv
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from ..models import AssessmentQuestions, Assessments, QuestionResponses, Questions
+from .assessment_definitions import bump_definition_version
+from .user_import import MIN_POOL_PASSWORDS, hash_passwords, init_hash_worker
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_UPSERT_CHUNK_SIZE = 1000
+
+CATEGORY_MAPPING = {
+    'Performance Mindset': 'performance_mindset',
+    'Emotional Regulation': 'emotional_regulation',
+    'Confidence': 'confidence',
+    'Resilience & Motivation': 'resilience__motivation',
+    'Concentration': 'concentration',
+    'Leadership': 'leadership',
+    'Mental Well-being': 'mental_wellbeing'
+}
+DEFAULT_CATEGORY = 'mental_wellbeing'
+DEFAULT_SCALE = 'onetofive'
+
+# Valid values on the onetofive scale used by the response sheets
+RESPONSE_RANGE = (1, 5)
+
+NUMBERING_PATTERN = re.compile(r'^[\s).]*\d{1,2}\s*[.)]+\s*')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def read_sheet(path):
+    """Read every row of a CSV sheet with surrounding whitespace stripped from each cell."""
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return [[cell.strip() for cell in row] for row in csv.reader(file)]
+
+
+def clean_title(text):
+    """Question title without its leading numbering ("7.", "13. ", "1.) ")."""
+    return NUMBERING_PATTERN.sub('', (text or '').lstrip(') .')).strip()
+
+
+def normalize_title(text):
+    """
+    Matching key for a question title: numbering, quotes, case, repeated
+    whitespace and trailing periods do not matter.
+    """
+    title = clean_title(text).replace('"', '').casefold()
+    return WHITESPACE_PATTERN.sub(' ', title).rstrip(' .')
+
+
+def map_category(label):
+    return CATEGORY_MAPPING.get((label or '').strip(), DEFAULT_CATEGORY)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class QuestionIndex:
+    """
+    Every Question keyed by normalized title, loaded with one query. When
+    several questions normalize to the same title the oldest one wins.
+    """
+
+    def __init__(self):
+        self.questions = {}
+        for question in Questions.objects.order_by('id').only('id', 'title', 'question_category', 'scale'):
+            self.questions.setdefault(normalize_title(question.title), question)
+
+    def get(self, title):
+        """The Question matching a title, or None."""
+        return self.questions.get(normalize_title(title))
+
+    def upsert(self, entries, dry_run=False):
+        """
+        Create missing questions and update the category and scale of existing ones.
+
+        Args:
+            entries: List of (title, category label) pairs
+            dry_run: Only count what would change
+
+        Returns:
+            (questions, counts): the Question for each entry (None for empty
+            titles) and a dict of created/updated/unchanged counts
+        """
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+        new_questions = {}
+        changed = {}
+
+        for title, label in entries:
+            key = normalize_title(title)
+            if not key or key in new_questions:
+                continue
+            category = map_category(label)
+            question = self.questions.get(key)
+            if question is None:
+                new_questions[key] = Questions(
+                    title=clean_title(title), question_category=category, scale=DEFAULT_SCALE
+                )
+            elif question.question_category != category or question.scale != DEFAULT_SCALE:
+                question.question_category = category
+                question.scale = DEFAULT_SCALE
+                question.modified_at = timezone.now()
+                changed[question.id] = question
+            else:
+                counts['unchanged'] += 1
+
+        counts['created'] = len(new_questions)
+        counts['updated'] = len(changed)
+
+        if not dry_run:
+            if changed:
+                Questions.objects.bulk_update(list(changed.values()), ['question_category', 'scale', 'modified_at'])
+            if new_questions:
+                author = Questions.get_default_author()
+                for question in new_questions.values():
+                    question.author = author
+                Questions.objects.bulk_create(list(new_questions.values()))
+                # MySQL does not return primary keys from bulk inserts
+                titles = [question.title for question in new_questions.values()]
+                for question in Questions.objects.filter(title__in=titles).order_by('id'):
+                    self.questions.setdefault(normalize_title(question.title), question)
+        else:
+            self.questions.update({key: question for key, question in new_questions.items()})
+
+        return [self.questions.get(normalize_title(title)) for title, _ in entries], counts
+
+
+def set_assessment_questions(assessment, questions):
+    """
+    Replace the questions of an assessment, in order.
+
+    Args:
+        assessment: Assessments instance
+        questions: Questions in display order
+
+    Returns:
+        Number of AssessmentQuestions created
+    """
+    AssessmentQuestions.objects.filter(questions_to_assessments=assessment).delete()
+
+    author = AssessmentQuestions.get_default_author()
+    assessment_questions = [
+        AssessmentQuestions(question=question, order=order, conditions=None, author=author)
+        for order, question in enumerate(questions, 1)
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        AssessmentQuestions.objects.bulk_create(assessment_questions)
+    else:
+        # Without returned ids the rows could not be linked to the assessment
+        for assessment_question in assessment_questions:
+            assessment_question.save()
+
+    Through = Assessments.questions.through
+    Through.objects.bulk_create([
+        Through(assessments_id=assessment.id, assessmentquestions_id=assessment_question.id)
+        for assessment_question in assessment_questions
+    ])
+    # bulk_create sends no m2m_changed, so bump the cached definition here
+    bump_definition_version([assessment.id])
+    return len(assessment_questions)
+
+
+def upsert_users(people, password, workers=None, dry_run=False):
+    """
+    Create missing users (with a verified primary email address) and update
+    the names of existing ones, matched by email.
+
+    Args:
+        people: List of (email, first_name, last_name)
+        password: Raw password for new users
+        workers: Processes used to hash passwords (default: CPU count)
+        dry_run: Only count what would change
+
+    Returns:
+        (user_ids, counts, errors): lowercased email -> user id, a dict of
+        created/updated/unchanged counts and a list of (email, message)
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    errors = []
+    emails = [email for email, _, _ in people]
+
+    existing = {}
+    usernames = set()
+    for chunk in chunked(emails, DEFAULT_UPSERT_CHUNK_SIZE):
+        for user in User.objects.filter(email__in=chunk).only('id', 'email', 'username', 'first_name', 'last_name'):
+            existing.setdefault(user.email.lower(), user)
+        usernames.update(name.lower() for name in User.objects.filter(username__in=chunk).values_list('username', flat=True))
+
+    user_ids = {}
+    changed = []
+    new_people = []
+    for email, first_name, last_name in people:
+        key = email.lower()
+        user = existing.get(key)
+        if user is None:
+            if key in usernames:
+                errors.append((email, 'Username already taken by another user'))
+                continue
+            new_people.append((email, first_name, last_name))
+            usernames.add(key)
+            continue
+        user_ids[key] = user.id
+        if user.first_name != first_name or user.last_name != last_name:
+            user.first_name = first_name
+            user.last_name = last_name
+            changed.append(user)
+        else:
+            counts['unchanged'] += 1
+
+    counts['created'] = len(new_people)
+    counts['updated'] = len(changed)
+    if dry_run:
+        return user_ids, counts, errors
+
+    if changed:
+        User.objects.bulk_update(changed, ['first_name', 'last_name'], batch_size=DEFAULT_UPSERT_CHUNK_SIZE)
+
+    if new_people:
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        pool = None
+        if workers > 1 and len(new_people) >= MIN_POOL_PASSWORDS:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=init_hash_worker)
+        try:
+            passwords = hash_passwords(password, len(new_people), pool, workers)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        User.objects.bulk_create([
+            User(username=email, email=email, first_name=first_name, last_name=last_name, password=hashed)
+            for (email, first_name, last_name), hashed in zip(new_people, passwords)
+        ], batch_size=DEFAULT_UPSERT_CHUNK_SIZE)
+
+        new_ids = {}
+        for chunk in chunked([email for email, _, _ in new_people], DEFAULT_UPSERT_CHUNK_SIZE):
+            new_ids.update(User.objects.filter(username__in=chunk).values_list('username', 'id'))
+        EmailAddress.objects.bulk_create([
+            EmailAddress(user_id=new_ids[email], email=email, verified=True, primary=True)
+            for email, _, _ in new_people
+        ], batch_size=DEFAULT_UPSERT_CHUNK_SIZE)
+        user_ids.update((email.lower(), user_id) for email, user_id in new_ids.items())
+
+    return user_ids, counts, errors
+
+
+def upsert_responses(cells, assessment_id, chunk_size=DEFAULT_UPSERT_CHUNK_SIZE, dry_run=False):
+    """
+    Write responses for one assessment, one row per athlete and question.
+
+    Existing responses are loaded with one query so unchanged cells are not
+    written at all; the rest go out in chunks of INSERT ... ON CONFLICT /
+    ON DUPLICATE KEY UPDATE.
+
+    Args:
+        cells: Iterable of (user_id, question_id, response)
+        assessment_id: Assessment the responses belong to
+        chunk_size: Rows per INSERT
+
+    Returns:
+        Dict of created/updated/unchanged counts
+    """
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    cells = {(user_id, question_id): response for user_id, question_id, response in cells}
+    user_ids = sorted({user_id for user_id, _ in cells})
+
+    existing = {}
+    for chunk in chunked(user_ids, DEFAULT_UPSERT_CHUNK_SIZE):
+        existing.update(
+            ((author_id, question_id), response) for author_id, question_id, response in
+            QuestionResponses.objects
+            .filter(assessment_id=assessment_id, author_id__in=chunk)
+            .values_list('author_id', 'question_id', 'response')
+        )
+
+    rows = []
+    for (user_id, question_id), response in cells.items():
+        current = existing.get((user_id, question_id))
+        if current == response:
+            counts['unchanged'] += 1
+            continue
+        counts['created' if current is None else 'updated'] += 1
+        rows.append(QuestionResponses(
+            author_id=user_id, question_id=question_id, assessment_id=assessment_id, response=response
+        ))
+
+    if not dry_run:
+        # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target and Django rejects
+        # unique_fields there; unique_question_response is the only key a new row can hit
+        conflict_options = {}
+        if connection.features.supports_update_conflicts_with_target:
+            conflict_options['unique_fields'] = ['author', 'assessment', 'question']
+        for chunk in chunked(rows, chunk_size):
+            QuestionResponses.objects.bulk_create(
+                chunk,
+                update_conflicts=True,
+                update_fields=['response', 'modified_at'],
+                **conflict_options
+            )
+        if rows:
+            logger.info(f"Upserted {len(rows)} responses for assessment {assessment_id}")
+
+    return counts
+
+
+def parse_response(value):
+    """A sheet cell as a response in RESPONSE_RANGE, or None for blank and invalid cells."""
+    try:
+        response = int(value)
+    except (TypeError, ValueError):
+        return None
+    low, high = RESPONSE_RANGE
+    return response if low <= response <= high else None
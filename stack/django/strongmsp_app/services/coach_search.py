@@ -0,0 +1,288 @@
+"""
+Coach Search Service
+
+Prefix search over the active coaches of an organization for the anonymous
+CoachSearchView autocomplete. Names, username and email are split into
+lowercased, accent-free terms stored in CoachSearchTerms together with the
+display fields, so a search is one indexed range scan on
+(organization, term) and never loads Users rows.
+
+The index follows Users and UserOrganizations changes through signals.
+Writes that bypass signals (bulk imports, synthetic data) need
+`python manage.py rebuild_coach_search`.
+"""
+import logging
+import re
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, Value, When
+
+from ..models import CoachSearchTerms, Organizations, UserOrganizations
+from .tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COACH_SEARCH_SETTINGS = {
+    'MAX_RESULTS': 20,
+    # Words of a query beyond this are ignored
+    'MAX_QUERY_WORDS': 5,
+    # Cached detail (About page) listings per organization
+    'DETAIL_CACHE_TIMEOUT': 300,
+    'REBUILD_BATCH_SIZE': 1000,
+}
+
+COACH_SEARCH_NAMESPACE = 'coach_search'
+
+# Term weights: names rank above usernames, usernames above email addresses
+NAME_WEIGHT = 3
+USERNAME_WEIGHT = 2
+EMAIL_WEIGHT = 1
+# An exact term match counts this many times its weight
+EXACT_MATCH_FACTOR = 2
+
+TERM_MAX_LENGTH = CoachSearchTerms._meta.get_field('term').max_length
+WORD_SPLIT_PATTERN = re.compile(r'[^0-9a-z]+')
+
+
+def get_coach_search_settings():
+    """Merge COACH_SEARCH from settings over the defaults."""
+    config = DEFAULT_COACH_SEARCH_SETTINGS.copy()
+    config.update(getattr(settings, 'COACH_SEARCH', {}) or {})
+    return config
+
+
+def normalize(text):
+    """Lowercase and strip accents, so 'José' and 'jose' index the same."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def query_words(query):
+    words = [word for word in WORD_SPLIT_PATTERN.split(normalize(query)) if word]
+    return [word[:TERM_MAX_LENGTH] for word in words[:get_coach_search_settings()['MAX_QUERY_WORDS']]]
+
+
+def user_terms(user):
+    """
+    Search terms of a user with their weights.
+
+    Returns:
+        Dict of term to weight (the highest weight when a term comes from several fields)
+    """
+    terms = {}
+
+    def add(text, weight, whole=False):
+        text = normalize(text).strip()
+        words = [word for word in WORD_SPLIT_PATTERN.split(text) if word]
+        if whole and text:
+            words.append(text)
+        for word in words:
+            word = word[:TERM_MAX_LENGTH]
+            terms[word] = max(terms.get(word, 0), weight)
+
+    add(user.first_name, NAME_WEIGHT)
+    add(user.last_name, NAME_WEIGHT)
+    add(user.username, USERNAME_WEIGHT, whole=True)
+    if user.email:
+        add(user.email.split('@')[0], EMAIL_WEIGHT, whole=True)
+        add(user.email, EMAIL_WEIGHT, whole=True)
+    return terms
+
+
+def index_rows(user, organization_ids):
+    display = user.get_full_name() or user.username
+    sort_name = normalize(f'{user.last_name} {user.first_name}').strip()[:255]
+    photo = user.photo.name if user.photo else None
+    return [
+        CoachSearchTerms(
+            organization_id=organization_id, user_id=user.pk, term=term, weight=weight,
+            display=display[:255], sort_name=sort_name, photo=photo,
+        )
+        for organization_id in organization_ids
+        for term, weight in user_terms(user).items()
+    ]
+
+
+def coach_organization_ids(user_id):
+    return list(
+        UserOrganizations.objects
+        .filter(user_id=user_id, is_coach=True, is_active=True)
+        .values_list('organization_id', flat=True)
+    )
+
+
+def reindex_user(user_id):
+    """
+    Replace a user's index rows with one set per organization they actively coach in.
+    Drops the cached detail listings of every organization that changed.
+    """
+    user = get_user_model().objects.filter(pk=user_id).first()
+    organization_ids = coach_organization_ids(user_id) if user else []
+    with transaction.atomic():
+        stale = set(CoachSearchTerms.objects.filter(user_id=user_id).values_list('organization_id', flat=True))
+        CoachSearchTerms.objects.filter(user_id=user_id).delete()
+        if organization_ids:
+            CoachSearchTerms.objects.bulk_create(index_rows(user, organization_ids))
+    for slug in organization_slugs(stale | set(organization_ids)):
+        get_tiered_cache().invalidate_on_commit(COACH_SEARCH_NAMESPACE, slug)
+
+
+def reindex_users(user_ids):
+    """
+    Reindex the users among user_ids who coach somewhere or still have index
+    rows, e.g. after a bulk_update that sent no signals.
+
+    Returns:
+        Number of users reindexed
+    """
+    config = get_coach_search_settings()
+    user_ids = list(user_ids)
+    indexed = set()
+    for start in range(0, len(user_ids), config['REBUILD_BATCH_SIZE']):
+        batch = user_ids[start:start + config['REBUILD_BATCH_SIZE']]
+        indexed.update(
+            UserOrganizations.objects
+            .filter(user_id__in=batch, is_coach=True, is_active=True)
+            .values_list('user_id', flat=True)
+        )
+        indexed.update(CoachSearchTerms.objects.filter(user_id__in=batch).values_list('user_id', flat=True))
+    for user_id in sorted(indexed):
+        reindex_user(user_id)
+    return len(indexed)
+
+
+def reindex_user_on_commit(user_id):
+    transaction.on_commit(lambda: reindex_user(user_id))
+
+
+def rebuild_index(organization=None):
+    """
+    Rebuild the index from UserOrganizations, for every organization or one.
+
+    Args:
+        organization: Optional Organizations instance
+
+    Returns:
+        Number of index rows written
+    """
+    config = get_coach_search_settings()
+    memberships = UserOrganizations.objects.filter(is_coach=True, is_active=True, user__isnull=False)
+    existing = CoachSearchTerms.objects.all()
+    if organization is not None:
+        memberships = memberships.filter(organization=organization)
+        existing = existing.filter(organization=organization)
+
+    organizations_by_user = {}
+    for user_id, organization_id in memberships.values_list('user_id', 'organization_id').order_by('user_id'):
+        organizations_by_user.setdefault(user_id, []).append(organization_id)
+
+    written = 0
+    with transaction.atomic():
+        existing.delete()
+        user_ids = list(organizations_by_user)
+        for start in range(0, len(user_ids), config['REBUILD_BATCH_SIZE']):
+            batch = get_user_model().objects.filter(pk__in=user_ids[start:start + config['REBUILD_BATCH_SIZE']])
+            rows = []
+            for user in batch:
+                rows.extend(index_rows(user, organizations_by_user[user.pk]))
+            CoachSearchTerms.objects.bulk_create(rows, batch_size=config['REBUILD_BATCH_SIZE'])
+            written += len(rows)
+    slugs = [organization.slug] if organization is not None else Organizations.objects.values_list('slug', flat=True)
+    for slug in slugs:
+        get_tiered_cache().invalidate_on_commit(COACH_SEARCH_NAMESPACE, slug)
+    return written
+
+
+def organization_slugs(organization_ids):
+    if not organization_ids:
+        return []
+    return list(Organizations.objects.filter(id__in=organization_ids).values_list('slug', flat=True))
+
+
+def ranked_matches(organization_slug, words):
+    """
+    Index rows grouped per coach whose terms start with every word, best first:
+    exact term matches and name matches score highest, ties go by last and
+    first name.
+    """
+    matched = {
+        f'matched_{index}': Max(Case(When(term__istartswith=word, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for index, word in enumerate(words)
+    }
+    exact = [When(term=word, then=F('weight') * EXACT_MATCH_FACTOR) for word in words]
+    prefix = [When(term__istartswith=word, then=F('weight')) for word in words]
+    score = Sum(Case(*exact, *prefix, default=Value(0), output_field=IntegerField()))
+
+    return (
+        CoachSearchTerms.objects
+        .filter(organization__slug=organization_slug)
+        .filter(reduce(or_, [Q(term__istartswith=word) for word in words]))
+        .values('user_id', 'display', 'photo', 'sort_name')
+        .annotate(score=score, **matched)
+        .filter(**{name: 1 for name in matched})
+        .order_by('-score', 'sort_name', 'user_id')
+    )
+
+
+def search_coaches(organization_slug, query, limit=None):
+    """
+    Ranked prefix search for autocomplete.
+
+    Args:
+        organization_slug: Organization slug
+        query: Search text; words shorter than a full term match as prefixes
+        limit: Maximum results (default MAX_RESULTS)
+
+    Returns:
+        List of {'user_id', 'display', 'photo', 'score'}
+    """
+    words = query_words(query)
+    if not words:
+        return []
+    rows = ranked_matches(organization_slug, words)[:limit or get_coach_search_settings()['MAX_RESULTS']]
+    return [
+        {'user_id': row['user_id'], 'display': row['display'], 'photo': row['photo'], 'score': row['score']}
+        for row in rows
+    ]
+
+
+def matching_coach_ids(organization_slug, query):
+    """Ids of every coach matching a query, unranked and unlimited."""
+    words = query_words(query)
+    if not words:
+        return set()
+    return {row['user_id'] for row in ranked_matches(organization_slug, words).order_by()}
+
+
+def photo_url(name):
+    """URL of a stored photo without loading its Users row."""
+    if not name:
+        return None
+    return get_user_model()._meta.get_field('photo').storage.url(name)
+
+
+def get_coach_details(organization_slug, cache_key, compute):
+    """
+    Cached detail listing (About page) of an organization.
+
+    Args:
+        organization_slug: Organization slug, the invalidation scope
+        cache_key: Key within the organization, e.g. the request host
+        compute: Callable returning the serialized coaches
+    """
+    return get_tiered_cache().get_or_set(
+        COACH_SEARCH_NAMESPACE, f'detail:{cache_key}', compute,
+        organization=organization_slug,
+        timeout=get_coach_search_settings()['DETAIL_CACHE_TIMEOUT']
+    )
+
+
+def invalidate_user_organizations(user_id):
+    """Drop the cached detail listings of every organization a user coaches in."""
+    for slug in organization_slugs(coach_organization_ids(user_id)):
+        get_tiered_cache().invalidate_on_commit(COACH_SEARCH_NAMESPACE, slug)
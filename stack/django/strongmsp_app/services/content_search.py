@@ -0,0 +1,342 @@
+"""
+Content Search Service
+
+Full-text search over coach content and agent responses. Each CoachContent
+and AgentResponses row has one ContentSearchDocuments row with its title,
+text, assignment and athlete; a search is one query on that table with the
+access rules of CoachContentViewSet and AgentResponsesViewSet applied:
+
+- coach content: the user is its athlete, or the athlete, a coach, a parent
+  or the payer of its assignment
+- agent responses: the same, and the assignment belongs to the current
+  organization
+
+On MySQL the table has a FULLTEXT index on (title, body) and results are
+ranked by MATCH ... AGAINST in boolean mode. Other backends (SQLite in
+development) scan with icontains and rank title matches above body matches.
+
+Documents follow saves and deletes through signals. Writes that bypass
+signals (bulk imports, synthetic data) need
+`python manage.py rebuild_content_search`.
+"""
+import html
+import logging
+import re
+import unicodedata
+from functools import reduce
+from operator import add, and_
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, Value, When
+
+from ..models import AgentResponses, CoachContent, ContentSearchDocuments, PaymentAssignments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_SEARCH_SETTINGS = {
+    'DEFAULT_LIMIT': 20,
+    'MAX_RESULTS': 50,
+    # Words of a query beyond this are ignored
+    'MAX_QUERY_WORDS': 8,
+    # Shorter words are not indexed by MySQL (innodb_ft_min_token_size)
+    'MIN_WORD_LENGTH': 3,
+    # Characters of text around the first match
+    'SNIPPET_LENGTH': 200,
+    'REBUILD_BATCH_SIZE': 1000,
+}
+
+COACH_CONTENT = ContentSearchDocuments.Doc_typeChoices.coach_content
+AGENT_RESPONSE = ContentSearchDocuments.Doc_typeChoices.agent_response
+
+# Source model of each document type and the fields its document is built from
+SOURCES = {
+    COACH_CONTENT: (CoachContent, {'title', 'body', 'assignment', 'athlete', 'purpose'}),
+    AGENT_RESPONSE: (AgentResponses, {'ai_response', 'assignment', 'athlete', 'purpose'}),
+}
+
+# InnoDB's default full-text stopwords; a required stopword would match nothing
+STOPWORDS = frozenset(
+    'a about an are as at be by com de en for from how i in is it la of on or that the this to was what when '
+    'where who will with und www'.split()
+)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Relevance of a title and a body match on backends without full-text search
+TITLE_WEIGHT = 2
+BODY_WEIGHT = 1
+
+
+def get_content_search_settings():
+    """Merge CONTENT_SEARCH from settings over the defaults."""
+    config = DEFAULT_CONTENT_SEARCH_SETTINGS.copy()
+    config.update(getattr(settings, 'CONTENT_SEARCH', {}) or {})
+    return config
+
+
+def fold(text):
+    """
+    Lowercase and strip accents one character at a time, so offsets in the
+    result are offsets in the original text.
+    """
+    folded = []
+    for char in text or '':
+        base = [part for part in unicodedata.normalize('NFKD', char) if not unicodedata.combining(part)]
+        folded.append((base[0] if base else char).lower()[0])
+    return ''.join(folded)
+
+
+def query_words(query):
+    """Searchable words of a query: folded, without stopwords and words too short to be indexed."""
+    config = get_content_search_settings()
+    words = []
+    for word in WORD_PATTERN.findall(fold(query)):
+        if len(word) >= config['MIN_WORD_LENGTH'] and word not in STOPWORDS and word not in words:
+            words.append(word)
+    return words[:config['MAX_QUERY_WORDS']]
+
+
+# Indexing ---------------------------------------------------------------
+
+def purpose_label(purpose):
+    """Agent responses have no title; their purpose stands in for one."""
+    try:
+        return AgentResponses.PurposeChoices(purpose).label
+    except ValueError:
+        return purpose or ''
+
+
+def document_for(doc_type, row):
+    """
+    Unsaved document for a source object or a values() row of it.
+
+    Args:
+        doc_type: COACH_CONTENT or AGENT_RESPONSE
+        row: Model instance or dict with the source fields
+    """
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    if doc_type == COACH_CONTENT:
+        title, body = get('title'), get('body')
+    else:
+        title, body = purpose_label(get('purpose')), get('ai_response')
+    return ContentSearchDocuments(
+        doc_type=doc_type, object_id=get('id'), assignment_id=get('assignment_id'), athlete_id=get('athlete_id'),
+        purpose=get('purpose'), title=title or '', body=body or '', modified_at=get('modified_at'),
+    )
+
+
+def index_object(doc_type, instance, update_fields=None):
+    """
+    Write the document of a saved source object. Saves that only touch
+    fields outside the document are skipped.
+    """
+    _, indexed = SOURCES[doc_type]
+    if update_fields and not indexed & set(update_fields):
+        return
+    document = document_for(doc_type, instance)
+    ContentSearchDocuments.objects.update_or_create(
+        doc_type=doc_type, object_id=instance.pk,
+        defaults={
+            field: getattr(document, field)
+            for field in ('assignment_id', 'athlete_id', 'purpose', 'title', 'body', 'modified_at')
+        },
+    )
+
+
+def remove_object(doc_type, object_id):
+    ContentSearchDocuments.objects.filter(doc_type=doc_type, object_id=object_id).delete()
+
+
+def source_rows(doc_type, organization=None):
+    model, _ = SOURCES[doc_type]
+    fields = ['id', 'assignment_id', 'athlete_id', 'purpose', 'modified_at']
+    fields += ['title', 'body'] if doc_type == COACH_CONTENT else ['ai_response']
+    queryset = model.objects.all()
+    if organization is not None:
+        queryset = queryset.filter(assignment__organization=organization)
+    # values() keeps prompts and reasoning out of memory
+    return queryset.order_by('id').values(*fields)
+
+
+def rebuild_index(organization=None):
+    """
+    Rebuild the documents from CoachContent and AgentResponses, for every organization or one.
+
+    Args:
+        organization: Optional Organizations instance; only sources with an assignment in it are rebuilt
+
+    Returns:
+        Number of documents written
+    """
+    config = get_content_search_settings()
+    existing = ContentSearchDocuments.objects.all()
+    if organization is not None:
+        existing = existing.filter(assignment__organization=organization)
+
+    written = 0
+    with transaction.atomic():
+        existing.delete()
+        for doc_type in SOURCES:
+            batch = []
+            for row in source_rows(doc_type, organization).iterator(chunk_size=config['REBUILD_BATCH_SIZE']):
+                batch.append(document_for(doc_type, row))
+                if len(batch) >= config['REBUILD_BATCH_SIZE']:
+                    ContentSearchDocuments.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                ContentSearchDocuments.objects.bulk_create(batch)
+                written += len(batch)
+    return written
+
+
+# Searching --------------------------------------------------------------
+
+class MatchAgainst(Func):
+    """MATCH (columns) AGAINST (query IN BOOLEAN MODE), MySQL only."""
+    output_field = FloatField()
+
+    def __init__(self, *columns, query):
+        super().__init__(*columns, Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        *columns, query = self.get_source_expressions()
+        column_sql, params = [], []
+        for column in columns:
+            sql, column_params = compiler.compile(column)
+            column_sql.append(sql)
+            params.extend(column_params)
+        query_sql, query_params = compiler.compile(query)
+        return f"MATCH ({', '.join(column_sql)}) AGAINST ({query_sql} IN BOOLEAN MODE)", (*params, *query_params)
+
+
+def boolean_query(words):
+    """Every word required, as a prefix: 'focus rout' -> '+focus* +rout*'."""
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def accessible_documents(user, organization_slug):
+    """Documents the user may read under the CoachContent and AgentResponses list rules."""
+    assignments = PaymentAssignments.objects.filter(
+        Q(athlete=user) | Q(coaches=user) | Q(parents=user) | Q(payment__author=user)
+    ).values('id')
+    return ContentSearchDocuments.objects.filter(
+        Q(athlete=user) | Q(assignment__in=assignments)
+    ).filter(
+        Q(doc_type=COACH_CONTENT) | Q(assignment__organization__slug=organization_slug)
+    )
+
+
+def ranked_documents(queryset, words):
+    """Filter to documents containing every word and annotate 'relevance'."""
+    if connections[queryset.db].vendor == 'mysql':
+        return queryset.annotate(
+            relevance=MatchAgainst(F('title'), F('body'), query=boolean_query(words))
+        ).filter(relevance__gt=0)
+
+    matches = [Q(title__icontains=word) | Q(body__icontains=word) for word in words]
+    scores = [
+        Case(When(title__icontains=word, then=Value(TITLE_WEIGHT)), default=Value(0), output_field=IntegerField())
+        + Case(When(body__icontains=word, then=Value(BODY_WEIGHT)), default=Value(0), output_field=IntegerField())
+        for word in words
+    ]
+    return queryset.filter(reduce(and_, matches)).annotate(relevance=reduce(add, scores))
+
+
+def highlight(text, words, length=None):
+    """
+    HTML-escaped text with matches of the words (as prefixes) wrapped in <mark>.
+
+    Args:
+        text: Plain text
+        words: Folded query words
+        length: Optional snippet length; the text is cut to a window around the first match
+
+    Returns:
+        HTML string
+    """
+    text = text or ''
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\w*')
+    folded = fold(text)
+    matches = list(pattern.finditer(folded)) if words else []
+
+    start, end = 0, len(text)
+    if length and len(text) > length:
+        first = matches[0].start() if matches else 0
+        start = max(0, min(first - length // 4, len(text) - length))
+        end = start + length
+        # Do not cut words in half
+        if start > 0:
+            space = text.find(' ', start, first if matches else end)
+            start = space + 1 if space != -1 else start
+        if end < len(text):
+            space = text.rfind(' ', start, end)
+            end = space if space > start else end
+
+    parts = ['…'] if start > 0 else []
+    position = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(html.escape(text[position:match.start()]))
+        parts.append(f'<mark>{html.escape(text[match.start():match.end()])}</mark>')
+        position = match.end()
+    parts.append(html.escape(text[position:end]))
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def search_documents(user, organization_slug, query, doc_type=None, limit=None, offset=0):
+    """
+    Ranked full-text search within what the user may read.
+
+    Args:
+        user: Authenticated user
+        organization_slug: Current organization; agent responses outside it are excluded
+        query: Search text; every word must match, the last characters of a word may be missing
+        doc_type: Optional COACH_CONTENT or AGENT_RESPONSE
+        limit: Maximum results (default DEFAULT_LIMIT, at most MAX_RESULTS)
+        offset: Results to skip
+
+    Returns:
+        Dict with 'count' and 'results', a list of {'type', 'id', 'assignment_id', 'athlete_id',
+        'purpose', 'title', 'highlighted_title', 'snippet', 'score', 'modified_at'}
+    """
+    config = get_content_search_settings()
+    words = query_words(query)
+    if not words or not user.is_authenticated:
+        return {'count': 0, 'results': []}
+    limit = max(1, min(limit or config['DEFAULT_LIMIT'], config['MAX_RESULTS']))
+    offset = max(0, offset)
+
+    documents = accessible_documents(user, organization_slug)
+    if doc_type:
+        documents = documents.filter(doc_type=doc_type)
+    ranked = ranked_documents(documents, words)
+    rows = ranked.order_by('-relevance', '-modified_at', '-id').values(
+        'doc_type', 'object_id', 'assignment_id', 'athlete_id', 'purpose', 'title', 'body', 'relevance', 'modified_at'
+    )[offset:offset + limit]
+
+    results = [
+        {
+            'type': row['doc_type'],
+            'id': row['object_id'],
+            'assignment_id': row['assignment_id'],
+            'athlete_id': row['athlete_id'],
+            'purpose': row['purpose'],
+            'title': row['title'],
+            'highlighted_title': highlight(row['title'], words),
+            'snippet': highlight(row['body'], words, config['SNIPPET_LENGTH']),
+            'score': round(float(row['relevance']), 4),
+            'modified_at': row['modified_at'],
+        }
+        for row in rows
+    ]
+    # The first page usually holds every match, so counting is only needed past it
+    if offset == 0 and len(results) < limit:
+        count = len(results)
+    else:
+        count = ranked.count()
+    return {'count': count, 'results': results}
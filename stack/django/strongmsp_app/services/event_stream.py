@@ -0,0 +1,347 @@
+"""
+Event Stream Service
+
+Publish/subscribe for server-pushed events (new dashboard notifications,
+completed agent responses). Subscribers are per user and per organization.
+The default DatabaseEventBackend relays events through the StreamEvents table
+so they cross process boundaries (several ASGI workers, the notification
+worker); InMemoryEventBackend is enough for a single process and for tests.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_STREAM_SETTINGS = {
+    'BACKEND': 'strongmsp_app.services.event_stream.DatabaseEventBackend',
+    'KEEPALIVE_SECONDS': 15,
+    'QUEUE_SIZE': 100,
+    # DatabaseEventBackend only
+    'POLL_SECONDS': 1.0,
+    # rows are re-read for this long, since auto-increment ids can commit out of order
+    'LOOKBACK_SECONDS': 30,
+    'RETENTION_SECONDS': 300,
+}
+
+
+def get_event_stream_settings():
+    """Merge EVENT_STREAM from settings over the defaults."""
+    config = DEFAULT_EVENT_STREAM_SETTINGS.copy()
+    config.update(getattr(settings, 'EVENT_STREAM', {}) or {})
+    return config
+
+
+class Subscription:
+    """
+    One open stream. Events are handed over to the subscriber's event loop with
+    call_soon_threadsafe, so publish() can be called from any sync thread.
+
+    When the queue is full the oldest event is dropped; clients resync through
+    GET /api/notifications/dashboard?since=... after reconnecting anyway.
+    """
+
+    def __init__(self, user_id, organization_id=None, queue_size=100):
+        self.user_id = user_id
+        self.organization_id = organization_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def accepts(self, event):
+        if self.user_id not in event.get('user_ids', [self.user_id]):
+            return False
+        organization_ids = event.get('organization_ids')
+        if organization_ids is None:
+            org_id = event.get('organization_id')
+            return org_id is None or org_id == self.organization_id
+        return self.organization_id in organization_ids
+
+    def put(self, event):
+        if not self.accepts(event):
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put_nowait, event)
+        except RuntimeError:
+            # Event loop already closed; the stream is gone
+            pass
+
+    def _put_nowait(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Wait for the next event. Returns None on timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryEventBackend:
+    """
+    Fans events out to subscriptions held in this process. Suitable for a
+    single ASGI process and for tests; with several processes use
+    DatabaseEventBackend.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id, organization_id=None):
+        subscription = Subscription(user_id, organization_id, self.queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        with self.lock:
+            targets = [s for user_id in user_ids for s in self.subscriptions.get(user_id, ())]
+        for subscription in targets:
+            subscription.put(event)
+        return len(targets)
+
+    def subscriber_count(self, user_id=None):
+        with self.lock:
+            if user_id is not None:
+                return len(self.subscriptions.get(user_id, ()))
+            return sum(len(s) for s in self.subscriptions.values())
+
+
+class DatabaseEventBackend(InMemoryEventBackend):
+    """
+    Cross-process backend. publish() inserts one StreamEvents row, and a
+    daemon thread in every process with open streams fans new rows out to its
+    local subscriptions. The poller only queries while this process has
+    subscribers, and deletes rows older than RETENTION_SECONDS as it goes.
+
+    Auto-increment ids can commit out of order, so the poller does not stop at
+    the highest id it has read: every poll re-reads the ids created in the last
+    LOOKBACK_SECONDS and delivers the ones it has not seen yet.
+    """
+
+    def __init__(self, queue_size=100):
+        super().__init__(queue_size)
+        config = get_event_stream_settings()
+        self.poll_seconds = config['POLL_SECONDS']
+        self.lookback = timedelta(seconds=config['LOOKBACK_SECONDS'])
+        self.retention = timedelta(seconds=max(config['RETENTION_SECONDS'], config['LOOKBACK_SECONDS']))
+        # id -> created_at of the rows inside the lookback window already delivered
+        self.seen = None
+        self.poller = None
+
+    def subscribe(self, user_id, organization_id=None):
+        subscription = super().subscribe(user_id, organization_id)
+        with self.lock:
+            if self.poller is None or not self.poller.is_alive():
+                self.poller = threading.Thread(target=self.poll_forever, name='event-stream-poller', daemon=True)
+                self.poller.start()
+        return subscription
+
+    def publish(self, user_ids, event):
+        from ..models import StreamEvents
+        StreamEvents.objects.create(user_ids=sorted(user_ids), event=event)
+        return None
+
+    def poll_forever(self):
+        last_pruned_at = None
+        while True:
+            if self.subscriber_count():
+                close_old_connections()
+                try:
+                    self.poll_once()
+                    now = timezone.now()
+                    if last_pruned_at is None or now - last_pruned_at > self.retention:
+                        self.prune(now)
+                        last_pruned_at = now
+                except Exception as e:
+                    logger.warning(f"Event stream poll failed: {e}")
+            else:
+                # Nobody is listening; skip what was published meanwhile when streams reconnect
+                self.seen = None
+            time.sleep(self.poll_seconds)
+
+    def poll_once(self, now=None):
+        """Deliver rows published since the previous poll. Returns the number of rows delivered."""
+        from ..models import StreamEvents
+
+        now = now or timezone.now()
+        window_start = now - self.lookback
+        recent = dict(StreamEvents.objects.filter(created_at__gte=window_start).values_list('id', 'created_at'))
+
+        if self.seen is None:
+            self.seen = recent
+            return 0
+
+        new_ids = recent.keys() - self.seen.keys()
+        rows = list(
+            StreamEvents.objects.filter(id__in=new_ids)
+            .order_by('id')
+            .values_list('id', 'user_ids', 'event')
+        ) if new_ids else []
+        for row_id, user_ids, event in rows:
+            # The row id is unique across processes, unlike the publisher's counter
+            super().publish(user_ids, dict(event, id=row_id))
+            self.seen[row_id] = recent[row_id]
+
+        # Rows that left the window are never read again
+        self.seen = {row_id: created_at for row_id, created_at in self.seen.items() if created_at >= window_start}
+        return len(rows)
+
+    def prune(self, now):
+        from ..models import StreamEvents
+        StreamEvents.objects.filter(created_at__lt=now - self.retention).delete()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_event_ids = itertools.count(1)
+
+
+def get_event_backend():
+    """Get the process-wide event backend configured in EVENT_STREAM['BACKEND']."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            config = get_event_stream_settings()
+            _backend = import_string(config['BACKEND'])(queue_size=config['QUEUE_SIZE'])
+        return _backend
+
+
+def reset_event_backend():
+    """Drop the cached backend, e.g. after changing EVENT_STREAM."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def publish_event(user_ids, event_type, data, organization_id=None, organization_ids=None):
+    """
+    Publish an event to every open stream of the given users once the current
+    transaction commits, so clients never fetch rows that were rolled back.
+
+    Args:
+        user_ids: Iterable of recipient user IDs
+        event_type: Event name sent as the SSE `event:` field
+        data: JSON-serializable payload
+        organization_id: Only streams opened for this organization receive the
+            event; None delivers to all of the user's streams
+        organization_ids: Only streams opened for one of these organizations
+            receive the event, for events that belong to the user rather than
+            to a single organization
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if not user_ids:
+        return
+
+    event = {
+        'id': next(_event_ids),
+        'type': event_type,
+        'user_ids': sorted(user_ids),
+        'organization_id': organization_id,
+        'organization_ids': sorted(organization_ids) if organization_ids is not None else None,
+        'created_at': timezone.now().isoformat(),
+        'data': data,
+    }
+
+    def send():
+        try:
+            get_event_backend().publish(user_ids, event)
+        except Exception as e:
+            logger.warning(f"Failed to publish {event_type} event: {e}")
+
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    """Serialize an event as a Server-Sent Events frame."""
+    payload = json.dumps({
+        'type': event['type'],
+        'organization_id': event['organization_id'],
+        'created_at': event['created_at'],
+        'data': event['data'],
+    }, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+def publish_notification_created(notification):
+    """
+    Push a new dashboard notification to its recipient's streams opened for
+    one of the organizations they belong to.
+    """
+    from ..models import UserOrganizations
+
+    if notification.channel != 'dashboard':
+        return
+    organization_ids = set(
+        UserOrganizations.objects
+        .filter(user_id=notification.recipient_id, is_active=True)
+        .values_list('organization_id', flat=True)
+    )
+    publish_event([notification.recipient_id], 'notification.created', {
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'priority': notification.priority,
+        'message': notification.message,
+        'link': notification.link,
+        'notification_group': notification.notification_group,
+        'created_at': notification.created_at,
+    }, organization_ids=organization_ids)
+
+
+def publish_agent_response_completed(agent_response):
+    """
+    Push a completed agent response to everyone who can read it: the athlete,
+    the assignment's coaches and parents, and the payment author.
+    """
+    from ..models import PaymentAssignments
+
+    assignment = (
+        PaymentAssignments.objects
+        .filter(pk=agent_response.assignment_id)
+        .values('organization_id', 'athlete_id', 'payment__author_id')
+        .first()
+    )
+    if assignment is None:
+        return
+
+    user_ids = {agent_response.athlete_id, assignment['athlete_id'], assignment['payment__author_id']}
+    user_ids.update(
+        PaymentAssignments.coaches.through.objects
+        .filter(paymentassignments_id=agent_response.assignment_id)
+        .values_list('users_id', flat=True)
+    )
+    user_ids.update(
+        PaymentAssignments.parents.through.objects
+        .filter(paymentassignments_id=agent_response.assignment_id)
+        .values_list('users_id', flat=True)
+    )
+
+    publish_event(user_ids, 'agent_response.completed', {
+        'id': agent_response.id,
+        'purpose': agent_response.purpose,
+        'athlete_id': agent_response.athlete_id,
+        'assignment_id': agent_response.assignment_id,
+        'created_at': agent_response.created_at,
+    }, organization_id=assignment['organization_id'])
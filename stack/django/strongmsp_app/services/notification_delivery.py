@@ -0,0 +1,360 @@
+"""
+Notification Delivery Service
+
+Delivers pending email and SMS Notifications in batches. Rows are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED over the (channel, delivery_status) index and
+leased by pushing remind_time forward, so several workers can run side by side
+without double-sending and no row lock is held while talking to SMTP or Twilio.
+"""
+import logging
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import Notifications
+from .request_metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_SETTINGS = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_SECONDS': 60,
+    'RETRY_BACKOFF_MAX_SECONDS': 3600,
+    # a claimed row is hidden from other workers this long; if the worker dies it is retried afterwards
+    'CLAIM_LEASE_SECONDS': 300,
+    'EMAIL_RATE_PER_SECOND': 10,
+    'SMS_RATE_PER_SECOND': 1,
+    'SMS_BACKEND': 'strongmsp_app.services.notification_delivery.TwilioSmsBackend',
+}
+
+DELIVERY_CHANNELS = ['email', 'sms']
+
+# delivery_error is prefixed with the attempt number so retries survive restarts
+ATTEMPT_PATTERN = re.compile(r'^\[attempt (\d+)\]')
+
+EMAIL_SUBJECTS = {
+    'agent-response': 'New agent response ready',
+    'coach-content': 'New content available',
+    'payment': 'Payment reminder',
+    'invoice': 'New invoice',
+    'assessment-submitted': 'Assessment submitted',
+}
+
+
+def get_delivery_settings():
+    """Merge NOTIFICATION_DELIVERY from settings over the defaults."""
+    config = DEFAULT_DELIVERY_SETTINGS.copy()
+    config.update(getattr(settings, 'NOTIFICATION_DELIVERY', {}) or {})
+    return config
+
+
+class PermanentDeliveryError(Exception):
+    """Raised when retrying a notification can never succeed (e.g. no address)."""
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate_per_second, burst=None):
+        self.rate = float(rate_per_second) if rate_per_second else 0.0
+        self.capacity = float(burst or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class TwilioSmsBackend:
+    """Sends SMS through the process-wide Twilio client."""
+
+    def send(self, to, body):
+        from utils.helpers import get_twilio_client
+        with external_call('twilio'):
+            message = get_twilio_client().messages.create(
+                body=body,
+                from_=settings.TWILIO_PHONE_NUMBER,
+                to=to
+            )
+        return message.sid
+
+
+class ConsoleSmsBackend:
+    """Logs SMS instead of sending them. Useful for local development."""
+
+    def send(self, to, body):
+        logger.info(f"[SMS] to={to}: {body}")
+        return None
+
+
+class LocmemSmsBackend:
+    """Stores SMS in LocmemSmsBackend.outbox, mirroring django.core.mail.outbox."""
+
+    outbox = []
+
+    def send(self, to, body):
+        self.outbox.append({'to': to, 'body': body})
+        return f"locmem-{len(self.outbox)}"
+
+
+class EmailProvider:
+    """
+    Sends email notifications over a Django mail connection that stays open for
+    the whole batch instead of reconnecting per message. Connections are kept
+    per thread because SMTP connections are not thread-safe.
+    """
+
+    channel = 'email'
+
+    def __init__(self, rate_per_second):
+        self.limiter = RateLimiter(rate_per_second)
+        self.local = threading.local()
+
+    def open(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = get_connection()
+            self.local.connection.open()
+        return self.local.connection
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            try:
+                connection.close()
+            finally:
+                self.local.connection = None
+
+    def send(self, notification):
+        address = notification.recipient.email
+        if not address:
+            raise PermanentDeliveryError("Recipient has no email address")
+
+        connection = self.open()
+        self.limiter.acquire()
+        message = EmailMultiAlternatives(
+            subject=EMAIL_SUBJECTS.get(notification.notification_type, 'New notification'),
+            body=notification.message_text or notification.message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[address],
+            connection=connection,
+        )
+        if notification.message_html:
+            message.attach_alternative(notification.message_html, 'text/html')
+        message.send()
+
+
+class SmsProvider:
+    """Sends SMS notifications through the configured SMS backend."""
+
+    channel = 'sms'
+
+    def __init__(self, rate_per_second, backend_path):
+        self.limiter = RateLimiter(rate_per_second)
+        self.backend = import_string(backend_path)()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, notification):
+        phone = notification.recipient.phone_number
+        if not phone:
+            raise PermanentDeliveryError("Recipient has no phone number")
+
+        self.limiter.acquire()
+        self.backend.send(phone, notification.message_text or notification.message)
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(channel):
+    """
+    Get the process-wide provider for a channel so rate limits and clients are
+    shared by every worker thread.
+    """
+    with _providers_lock:
+        if channel not in _providers:
+            config = get_delivery_settings()
+            if channel == 'email':
+                _providers[channel] = EmailProvider(config['EMAIL_RATE_PER_SECOND'])
+            elif channel == 'sms':
+                _providers[channel] = SmsProvider(config['SMS_RATE_PER_SECOND'], config['SMS_BACKEND'])
+            else:
+                raise ValueError(f"No delivery provider for channel: {channel}")
+        return _providers[channel]
+
+
+def reset_providers():
+    """Drop cached providers, e.g. after changing NOTIFICATION_DELIVERY."""
+    with _providers_lock:
+        for provider in _providers.values():
+            provider.close()
+        _providers.clear()
+
+
+def get_attempt_count(notification):
+    """Number of failed attempts recorded in delivery_error."""
+    match = ATTEMPT_PATTERN.match(notification.delivery_error or '')
+    return int(match.group(1)) if match else 0
+
+
+class NotificationDeliveryWorker:
+    """
+    Claims pending email/SMS notifications in batches and delivers them.
+
+    Notifications whose remind_time is in the future are left for a later run,
+    expired ones are marked failed without sending, and transient errors are
+    retried with exponential backoff by pushing remind_time forward.
+    """
+
+    def __init__(self, channels=None, batch_size=None):
+        self.config = get_delivery_settings()
+        self.channels = channels or DELIVERY_CHANNELS
+        self.batch_size = batch_size or self.config['BATCH_SIZE']
+
+    def get_pending_queryset(self, now):
+        return Notifications.objects.filter(
+            channel__in=self.channels,
+            delivery_status='pending',
+        ).filter(
+            Q(remind_time__isnull=True) | Q(remind_time__lte=now)
+        )
+
+    def run_once(self):
+        """
+        Claim and deliver a single batch.
+
+        Returns:
+            Dict of counts: claimed, sent, retried, failed, expired
+        """
+        stats = {'claimed': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'expired': 0}
+        now = timezone.now()
+
+        batch = self.claim_batch(now)
+        stats['claimed'] = len(batch)
+
+        try:
+            for notification in batch:
+                outcome = self.deliver(notification, now)
+                stats[outcome] += 1
+        finally:
+            for channel in {n.channel for n in batch}:
+                get_provider(channel).close()
+
+        return stats
+
+    def claim_batch(self, now):
+        """
+        Lock a batch, lease it by moving remind_time past the lease window and
+        commit straight away. Each outcome is then written by its own UPDATE, so
+        a crash mid-batch only re-sends the row that was in flight once its
+        lease runs out.
+        """
+        with transaction.atomic():
+            batch = list(
+                self.get_pending_queryset(now)
+                .select_related('recipient')
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('id')[:self.batch_size]
+            )
+            if batch:
+                lease_until = now + timedelta(seconds=self.config['CLAIM_LEASE_SECONDS'])
+                Notifications.objects.filter(pk__in=[n.pk for n in batch]).update(
+                    remind_time=lease_until, modified_at=timezone.now()
+                )
+        return batch
+
+    def run_forever(self, interval=5, max_batches=None):
+        """
+        Keep delivering batches, sleeping for `interval` seconds whenever the
+        queue is empty.
+        """
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            # Outside the request cycle nothing else drops dead or expired connections
+            close_old_connections()
+            stats = self.run_once()
+            batches += 1
+            if stats['claimed']:
+                logger.info(f"Notification delivery batch: {stats}")
+            else:
+                time.sleep(interval)
+
+    def deliver(self, notification, now=None):
+        """
+        Deliver one notification and record the outcome on the row.
+
+        Returns:
+            One of 'sent', 'retried', 'failed', 'expired'
+        """
+        now = now or timezone.now()
+
+        if notification.expires and notification.expires <= now:
+            self.update_notification(notification, delivery_status='failed', delivery_error="Expired before delivery")
+            return 'expired'
+
+        try:
+            get_provider(notification.channel).send(notification)
+        except PermanentDeliveryError as e:
+            return self.record_failure(notification, str(e), now, permanent=True)
+        except Exception as e:
+            logger.warning(f"Delivery of notification {notification.id} failed: {e}")
+            return self.record_failure(notification, str(e), now)
+
+        self.update_notification(notification, delivery_status='sent', sent_at=timezone.now(), delivery_error=None)
+        return 'sent'
+
+    def record_failure(self, notification, error, now, permanent=False):
+        attempt = get_attempt_count(notification) + 1
+        fields = {'delivery_error': f"[attempt {attempt}] {error}"}
+
+        if permanent or attempt >= self.config['MAX_ATTEMPTS']:
+            fields['delivery_status'] = 'failed'
+            outcome = 'failed'
+        else:
+            backoff = min(
+                self.config['RETRY_BACKOFF_SECONDS'] * (2 ** (attempt - 1)),
+                self.config['RETRY_BACKOFF_MAX_SECONDS']
+            )
+            fields['remind_time'] = now + timedelta(seconds=backoff)
+            outcome = 'retried'
+
+        self.update_notification(notification, **fields)
+        return outcome
+
+    def update_notification(self, notification, **fields):
+        """
+        Write delivery fields with a single UPDATE. SuperModel.save() would look
+        up a default author for every author-less notification.
+        """
+        fields['modified_at'] = timezone.now()
+        for name, value in fields.items():
+            setattr(notification, name, value)
+        Notifications.objects.filter(pk=notification.pk).update(**fields)
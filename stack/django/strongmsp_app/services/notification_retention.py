@@ -0,0 +1,199 @@
+"""
+Notification Retention Service
+
+Removes expired and old Notifications in bounded batches and compacts the
+bodies of delivered email/SMS rows, following a policy that can be tuned per
+notification_type through settings.NOTIFICATION_RETENTION.
+"""
+import gzip
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Notifications
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_POLICY = {
+    'EXPIRED_GRACE_DAYS': 7,
+    'SEEN_DAYS': 90,
+    'UNSEEN_DAYS': None,
+    'DELIVERED_DAYS': 180,
+    'COMPACT_AFTER_DAYS': 14,
+}
+
+DEFAULT_RETENTION_BATCH_SIZE = 1000
+
+OUTBOUND_CHANNELS = ['email', 'sms']
+
+# Order matters: rows deleted by an earlier rule are not compacted afterwards
+RETENTION_RULES = ['expired', 'seen', 'unseen', 'delivered', 'compacted']
+
+
+def get_retention_settings():
+    """Read NOTIFICATION_RETENTION from settings."""
+    return getattr(settings, 'NOTIFICATION_RETENTION', {}) or {}
+
+
+def get_retention_policy(notification_type):
+    """
+    Get the retention policy for a notification_type (None for untyped rows):
+    DEFAULT_RETENTION_POLICY, overridden by NOTIFICATION_RETENTION['DEFAULT'],
+    overridden by NOTIFICATION_RETENTION['TYPES'][notification_type].
+    """
+    config = get_retention_settings()
+    policy = DEFAULT_RETENTION_POLICY.copy()
+    policy.update(config.get('DEFAULT') or {})
+    if notification_type:
+        policy.update((config.get('TYPES') or {}).get(notification_type) or {})
+    return policy
+
+
+def get_notification_types():
+    """All notification_type values, plus None for untyped notifications."""
+    field = Notifications._meta.get_field('notification_type')
+    return [value for value, _ in field.choices] + [None]
+
+
+class NotificationRetentionService:
+    """
+    Applies the retention policy to every notification_type.
+
+    Each rule walks the matching rows by primary key in batches of
+    `batch_size`, so one run never holds long locks or loads the whole table.
+    Deleted rows can be written to a gzipped NDJSON archive first.
+    """
+
+    def __init__(self, batch_size=None, dry_run=False, archive_path=None, now=None):
+        self.batch_size = batch_size or get_retention_settings().get('BATCH_SIZE', DEFAULT_RETENTION_BATCH_SIZE)
+        self.dry_run = dry_run
+        self.archive_path = archive_path
+        self.now = now or timezone.now()
+        self.archive = None
+
+    def get_rule_filter(self, rule, policy):
+        """
+        Build the filter for one rule, or None when the policy disables it.
+        """
+        def cutoff(key):
+            days = policy.get(key)
+            return None if days is None else self.now - timedelta(days=days)
+
+        if rule == 'expired':
+            before = cutoff('EXPIRED_GRACE_DAYS')
+            return None if before is None else Q(expires__lt=before)
+
+        if rule == 'seen':
+            before = cutoff('SEEN_DAYS')
+            return None if before is None else Q(channel='dashboard', seen=True, created_at__lt=before)
+
+        if rule == 'unseen':
+            before = cutoff('UNSEEN_DAYS')
+            return None if before is None else Q(channel='dashboard', seen=False, created_at__lt=before)
+
+        if rule == 'delivered':
+            before = cutoff('DELIVERED_DAYS')
+            if before is None:
+                return None
+            return Q(channel__in=OUTBOUND_CHANNELS, created_at__lt=before) & ~Q(delivery_status='pending')
+
+        if rule == 'compacted':
+            before = cutoff('COMPACT_AFTER_DAYS')
+            if before is None:
+                return None
+            return Q(
+                channel__in=OUTBOUND_CHANNELS,
+                delivery_status__in=['sent', 'delivered'],
+                sent_at__lt=before,
+            ) & (Q(message_html__isnull=False) | Q(message_text__isnull=False))
+
+        raise ValueError(f"Unknown retention rule: {rule}")
+
+    def run(self, notification_types=None):
+        """
+        Apply every rule to every notification_type.
+
+        Args:
+            notification_types: Limit the run to these types (optional)
+
+        Returns:
+            Dict mapping notification_type (None as 'untyped') to a dict of
+            row counts per rule
+        """
+        report = {}
+        types = notification_types or get_notification_types()
+
+        if self.archive_path and not self.dry_run:
+            self.archive = gzip.open(self.archive_path, 'at', encoding='utf-8')
+
+        try:
+            for notification_type in types:
+                policy = get_retention_policy(notification_type)
+                if notification_type is None:
+                    base = Notifications.objects.filter(notification_type__isnull=True)
+                else:
+                    base = Notifications.objects.filter(notification_type=notification_type)
+
+                counts = {}
+                deleted_filter = None
+                for rule in RETENTION_RULES:
+                    rule_filter = self.get_rule_filter(rule, policy)
+                    if rule_filter is None:
+                        counts[rule] = 0
+                        continue
+                    queryset = base.filter(rule_filter)
+                    if self.dry_run and deleted_filter is not None:
+                        # Nothing was deleted yet, so skip rows an earlier rule would take
+                        queryset = queryset.exclude(deleted_filter)
+                    counts[rule] = self.apply(rule, queryset)
+                    deleted_filter = rule_filter if deleted_filter is None else deleted_filter | rule_filter
+                report[notification_type or 'untyped'] = counts
+        finally:
+            if self.archive is not None:
+                self.archive.close()
+                self.archive = None
+
+        return report
+
+    def apply(self, rule, queryset):
+        """Run one rule over a queryset in primary-key batches. Returns rows affected."""
+        if self.dry_run:
+            return queryset.count()
+
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            with transaction.atomic():
+                batch = Notifications.objects.filter(id__in=ids)
+                if rule == 'compacted':
+                    total += batch.update(message_html=None, message_text=None, modified_at=timezone.now())
+                else:
+                    if self.archive is not None:
+                        self.write_archive(rule, batch)
+                    total += batch.delete()[0]
+
+            if len(ids) < self.batch_size:
+                break
+
+        if total:
+            logger.info(f"Notification retention: {rule} removed/compacted {total} rows")
+        return total
+
+    def write_archive(self, rule, queryset):
+        for row in queryset.values():
+            row['retention_rule'] = rule
+            self.archive.write(json.dumps(row, default=str) + '\n')
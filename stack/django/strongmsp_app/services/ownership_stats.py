@@ -0,0 +1,148 @@
+"""
+Ownership Stats Service
+
+Row counts per author and per author group for GroupStatsView and
+UserStatsView. Each result is one query with a COUNT subquery per model,
+kept in the tiered cache for CACHE_TIMEOUT seconds and invalidated when
+authored rows, groups or group memberships change (see signals.py).
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OWNERSHIP_STATS_SETTINGS = {
+    # Also bounds staleness after writes that send no signals (bulk imports, queryset updates)
+    'CACHE_TIMEOUT': 60,
+}
+
+GROUP_STATS_NAMESPACE = 'group_stats'
+USER_STATS_NAMESPACE = 'user_stats'
+
+
+def get_ownership_stats_settings():
+    """Merge OWNERSHIP_STATS from settings over the defaults."""
+    config = DEFAULT_OWNERSHIP_STATS_SETTINGS.copy()
+    config.update(getattr(settings, 'OWNERSHIP_STATS', {}) or {})
+    return config
+
+
+def authored_models(model_names=None):
+    """
+    (name, model) pairs of strongmsp_app models with an author.
+
+    Args:
+        model_names: Optional model names to limit to, in their order; unknown names are skipped
+
+    Returns:
+        List of (model name, model class)
+    """
+    if model_names is None:
+        candidates = [(model.__name__, model) for model in apps.get_app_config('strongmsp_app').get_models()]
+    else:
+        candidates = []
+        for name in model_names:
+            try:
+                candidates.append((name, apps.get_model('strongmsp_app', name)))
+            except LookupError:
+                continue
+    return [(name, model) for name, model in candidates if hasattr(model, 'author')]
+
+
+def count_subquery(queryset):
+    """Row count of a correlated queryset as an annotation, 0 when it is empty."""
+    # COUNT as a plain Func keeps Django from adding a GROUP BY
+    counted = queryset.order_by().annotate(row_count=Func(F('pk'), function='COUNT')).values('row_count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def compute_groups_stats():
+    memberships = get_user_model().groups.through.objects.filter(group_id=OuterRef('pk'))
+    return list(
+        Group.objects.annotate(member_count=count_subquery(memberships))
+        .order_by('id')
+        .values('id', 'name', 'member_count')
+    )
+
+
+def compute_group_stats(group_name, model_names):
+    models = authored_models(model_names)
+    annotations = {
+        'member_count': count_subquery(get_user_model().groups.through.objects.filter(group_id=OuterRef('pk'))),
+    }
+    for index, (name, model) in enumerate(models):
+        annotations[f'model_{index}'] = count_subquery(model.objects.filter(author__groups=OuterRef('pk')))
+
+    row = Group.objects.filter(name=group_name).annotate(**annotations).values('id', 'name', *annotations).first()
+    if row is None:
+        return None
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'member_count': row['member_count'],
+        'model_counts': {name: row[f'model_{index}'] for index, (name, _) in enumerate(models)},
+    }
+
+
+def compute_user_counts(user_id):
+    models = authored_models()
+    annotations = {
+        f'model_{index}': count_subquery(model.objects.filter(author_id=OuterRef('pk')))
+        for index, (name, model) in enumerate(models)
+    }
+    row = get_user_model().objects.filter(pk=user_id).annotate(**annotations).values(*annotations).first() or {}
+    return {name: row.get(f'model_{index}', 0) for index, (name, _) in enumerate(models)}
+
+
+def get_groups_stats():
+    """
+    Member count of every group.
+
+    Returns:
+        List of {'id', 'name', 'member_count'} ordered by id
+    """
+    return get_tiered_cache().get_or_set(
+        GROUP_STATS_NAMESPACE, 'all', compute_groups_stats,
+        timeout=get_ownership_stats_settings()['CACHE_TIMEOUT']
+    )
+
+
+def get_group_stats(group_name, model_names):
+    """
+    Member count of a group and the rows its members authored per model.
+
+    Args:
+        group_name: Group name
+        model_names: Models to count; those without an author are skipped
+
+    Returns:
+        Dict with id, name, member_count and model_counts, or None if the group does not exist
+    """
+    model_names = list(model_names)
+    return get_tiered_cache().get_or_set(
+        GROUP_STATS_NAMESPACE, f"group:{group_name}:{','.join(model_names)}",
+        lambda: compute_group_stats(group_name, model_names),
+        timeout=get_ownership_stats_settings()['CACHE_TIMEOUT']
+    )
+
+
+def get_user_counts(user_id):
+    """
+    Rows a user authored, for every model with an author.
+
+    Returns:
+        Dict of model name to count (0 for unknown users)
+    """
+    return get_tiered_cache().get_or_set(
+        USER_STATS_NAMESPACE, 'counts', lambda: compute_user_counts(user_id),
+        organization=user_id,
+        timeout=get_ownership_stats_settings()['CACHE_TIMEOUT']
+    )
@@ -0,0 +1,107 @@
+"""
+Prompt Template Registry
+
+Every active PromptTemplates row, loaded with one query per process and served
+from memory: the template of each purpose, and the tokens its prompt and
+instructions use (parsed once, see agentic_context_builder.template_tokens).
+
+Templates only change in the admin. Saving or deleting one bumps the
+'prompt_templates' tiered cache generation (signals.py); a process reloads on
+its first lookup after that, within TIERED_CACHE['GENERATION_TTL'] seconds,
+and right away in the process that made the change.
+
+When a purpose has several active templates, the most recently created wins.
+"""
+import logging
+import threading
+
+from ..models import PromptTemplates
+from .agentic_context_builder import template_tokens
+from .tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'prompt_templates'
+
+
+class RegistrySnapshot:
+    """Active templates as loaded at one generation."""
+
+    def __init__(self, generation, templates):
+        self.generation = generation
+        self.templates = {}
+        self.by_purpose = {}
+        self.tokens = {}
+        for template in templates:
+            self.templates[template.pk] = template
+            self.by_purpose.setdefault(template.purpose, template)
+            self.tokens[template.pk] = {
+                'prompt': template_tokens(template.prompt),
+                'instructions': template_tokens(template.instructions),
+            }
+
+
+class PromptTemplateRegistry:
+    """
+    Usage:
+        registry = get_prompt_registry()
+        template = registry.get('feedback_report')
+        tokens = registry.tokens(template)['prompt']
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = None
+
+    def snapshot(self):
+        generation = get_tiered_cache().generation(NAMESPACE)
+        current = self.current
+        if current is not None and current.generation == generation:
+            return current
+        with self.lock:
+            if self.current is None or self.current.generation != generation:
+                # The generation is read before loading, so a change during the load triggers another
+                templates = PromptTemplates.objects.filter(status='active').order_by('-created_at', '-id')
+                self.current = RegistrySnapshot(generation, list(templates))
+                logger.debug(f"Loaded {len(self.current.templates)} active prompt templates (generation {generation})")
+            return self.current
+
+    def get(self, purpose):
+        """Active template of a purpose, or None."""
+        return self.snapshot().by_purpose.get(purpose)
+
+    def by_purpose(self):
+        """Dict of purpose to its active template."""
+        return dict(self.snapshot().by_purpose)
+
+    def tokens(self, template):
+        """
+        Tokens the prompt and instructions of a template use.
+
+        Returns:
+            Dict with 'prompt' and 'instructions' tuples; templates outside the
+            registry (archived, or edited since it loaded) are parsed on the spot
+        """
+        snapshot = self.snapshot()
+        registered = snapshot.templates.get(template.pk)
+        if registered is not None and (registered.prompt, registered.instructions) == (template.prompt, template.instructions):
+            return snapshot.tokens[template.pk]
+        return {'prompt': template_tokens(template.prompt), 'instructions': template_tokens(template.instructions)}
+
+    def clear(self):
+        """Drop this process's templates; the next lookup reloads them."""
+        with self.lock:
+            self.current = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry():
+    """Process-wide PromptTemplateRegistry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PromptTemplateRegistry()
+        return _registry
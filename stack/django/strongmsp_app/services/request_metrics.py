@@ -0,0 +1,264 @@
+"""
+Request Metrics Service
+
+Opt-in, sampled per-request instrumentation: view name, DB query count (also
+per database alias) and time, duplicate-query fingerprints (the N+1
+signature), time spent in external calls (OpenAI, Twilio, storage) and total
+latency. RequestMetricsMiddleware
+records sampled requests; each one is logged as a structured line and folded
+into per-process aggregates served by GET /api/metrics/requests (staff only).
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_METRICS_SETTINGS = {
+    'ENABLED': False,
+    # Fraction of requests instrumented (1.0 = every request)
+    'SAMPLE_RATE': 0.1,
+    'LOG': True,
+    # Sampled requests slower than this are logged at WARNING
+    'SLOW_REQUEST_MS': 1000,
+    # A query fingerprint repeated this often in one request is reported as a duplicate
+    'DUPLICATE_THRESHOLD': 2,
+    'MAX_DUPLICATES': 5,
+    # Latencies kept per view for the percentiles
+    'RESERVOIR_SIZE': 500,
+    'EXCLUDE_PATHS': ['/api/events/stream', '/static/', '/media/'],
+}
+
+EXTERNAL_SERVICES = ('openai', 'twilio', 'storage')
+
+IN_LIST_PATTERN = re.compile(r'\bIN \((?:%s, )*%s\)')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def get_request_metrics_settings():
+    """Merge REQUEST_METRICS from settings over the defaults."""
+    config = DEFAULT_REQUEST_METRICS_SETTINGS.copy()
+    config.update(getattr(settings, 'REQUEST_METRICS', {}) or {})
+    return config
+
+
+def fingerprint(sql):
+    """
+    Query shape without its parameters. Django passes SQL with placeholders,
+    so only IN lists of different lengths need folding.
+    """
+    shape = IN_LIST_PATTERN.sub('IN (...)', WHITESPACE_PATTERN.sub(' ', sql.strip()))
+    return hashlib.sha1(shape.encode()).hexdigest()[:12], shape
+
+
+class RequestRecorder:
+    """
+    Counters for one request. External calls may run in worker threads (the
+    agent orchestrator runs completions in parallel), hence the lock.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.queries = {}
+        self.aliases = {}
+        self.external_ms = {}
+        self.external_calls = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook: times every query on this request's connections."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            key, shape = fingerprint(sql)
+            alias = context['connection'].alias
+            with self.lock:
+                self.db_queries += 1
+                self.db_ms += elapsed
+                self.aliases[alias] = self.aliases.get(alias, 0) + 1
+                entry = self.queries.setdefault(key, [0, 0.0, shape])
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def add_external(self, service, elapsed):
+        with self.lock:
+            self.external_ms[service] = self.external_ms.get(service, 0.0) + elapsed
+            self.external_calls[service] = self.external_calls.get(service, 0) + 1
+
+    def duplicates(self, threshold, limit):
+        found = [
+            {'fingerprint': key, 'count': count, 'ms': round(ms, 2), 'sql': shape[:300]}
+            for key, (count, ms, shape) in self.queries.items() if count >= threshold
+        ]
+        found.sort(key=lambda item: (-item['count'], -item['ms']))
+        return found[:limit]
+
+    def as_record(self, request, response, config):
+        duplicates = self.duplicates(config['DUPLICATE_THRESHOLD'], config['MAX_DUPLICATES'])
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'view': match.view_name if match and match.view_name else '<unresolved>',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_ms, 2),
+            'db_aliases': dict(self.aliases),
+            'duplicate_queries': sum(item['count'] - 1 for item in duplicates),
+            'duplicates': duplicates,
+            'external_ms': {service: round(ms, 2) for service, ms in self.external_ms.items()},
+            'external_calls': dict(self.external_calls),
+        }
+
+
+@contextmanager
+def record_request():
+    """Install a recorder on every database connection for the current request."""
+    recorder = RequestRecorder()
+    token = _current.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def external_call(service):
+    """
+    Time a call to an external service. A no-op outside sampled requests.
+
+        with external_call('openai'):
+            response = client.chat.completions.create(...)
+    """
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_external(service, (time.perf_counter() - started) * 1000)
+
+
+class MetricsAggregator:
+    """Per-process totals by view. Each gunicorn worker keeps its own; the structured logs cover all of them."""
+
+    def __init__(self, reservoir_size=500):
+        self.reservoir_size = reservoir_size
+        self.lock = threading.Lock()
+        self.views = {}
+        self.since = time.time()
+
+    def add(self, record):
+        key = f"{record['method']} {record['view']}"
+        with self.lock:
+            stats = self.views.get(key)
+            if stats is None:
+                stats = self.views[key] = {
+                    'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_queries': 0, 'db_ms': 0.0,
+                    'max_db_queries': 0, 'duplicate_queries': 0, 'db_aliases': {}, 'external_ms': {},
+                    'latencies': deque(maxlen=self.reservoir_size), 'fingerprints': {},
+                }
+            stats['requests'] += 1
+            stats['errors'] += record['status'] >= 500
+            stats['total_ms'] += record['total_ms']
+            stats['max_ms'] = max(stats['max_ms'], record['total_ms'])
+            stats['db_queries'] += record['db_queries']
+            stats['db_ms'] += record['db_ms']
+            stats['max_db_queries'] = max(stats['max_db_queries'], record['db_queries'])
+            stats['duplicate_queries'] += record['duplicate_queries']
+            stats['latencies'].append(record['total_ms'])
+            for alias, count in record['db_aliases'].items():
+                stats['db_aliases'][alias] = stats['db_aliases'].get(alias, 0) + count
+            for service, ms in record['external_ms'].items():
+                stats['external_ms'][service] = stats['external_ms'].get(service, 0.0) + ms
+            for duplicate in record['duplicates']:
+                seen = stats['fingerprints'].setdefault(duplicate['fingerprint'], {'requests': 0, 'count': 0, 'sql': duplicate['sql']})
+                seen['requests'] += 1
+                seen['count'] += duplicate['count']
+
+    def snapshot(self):
+        """Aggregates per view, slowest total time first."""
+        with self.lock:
+            views = []
+            for key, stats in self.views.items():
+                requests = stats['requests']
+                latencies = sorted(stats['latencies'])
+                fingerprints = sorted(
+                    ({'fingerprint': fp, **seen} for fp, seen in stats['fingerprints'].items()),
+                    key=lambda item: -item['count']
+                )
+                views.append({
+                    'view': key,
+                    'requests': requests,
+                    'errors': stats['errors'],
+                    'mean_ms': round(stats['total_ms'] / requests, 2),
+                    'p50_ms': round(latencies[len(latencies) // 2], 2),
+                    'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                    'max_ms': round(stats['max_ms'], 2),
+                    'mean_db_queries': round(stats['db_queries'] / requests, 1),
+                    'max_db_queries': stats['max_db_queries'],
+                    'mean_db_ms': round(stats['db_ms'] / requests, 2),
+                    'duplicate_queries': stats['duplicate_queries'],
+                    'db_aliases': dict(stats['db_aliases']),
+                    'external_ms': {service: round(ms, 2) for service, ms in stats['external_ms'].items()},
+                    'top_duplicates': fingerprints[:5],
+                    'total_ms': round(stats['total_ms'], 2),
+                })
+            views.sort(key=lambda item: -item['total_ms'])
+            return {'since': self.since, 'views': views}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.since = time.time()
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = MetricsAggregator(get_request_metrics_settings()['RESERVOIR_SIZE'])
+        return _aggregator
+
+
+def should_sample(request, config):
+    if not config['ENABLED'] or config['SAMPLE_RATE'] <= 0:
+        return False
+    if any(request.path.startswith(prefix) for prefix in config['EXCLUDE_PATHS']):
+        return False
+    return config['SAMPLE_RATE'] >= 1 or random.random() < config['SAMPLE_RATE']
+
+
+def report(record, config):
+    """Fold a request into the aggregates and write its structured log line."""
+    get_aggregator().add(record)
+    if not config['LOG']:
+        return
+    level = logging.WARNING if record['total_ms'] >= config['SLOW_REQUEST_MS'] else logging.INFO
+    logger.log(level, f"request_metrics {json.dumps(record, sort_keys=True)}", extra={'request_metrics': record})
@@ -0,0 +1,453 @@
+"""
+Synthetic Data Service
+
+Generates a deterministic, production-sized dataset for load testing:
+organizations, athletes, coaches, parents, payments, assignments, question
+responses, agent responses, coach content and notifications. Everything is
+written with bulk_create in chunks, and rows are found again through natural
+keys (username, slug, Stripe ids) because MySQL does not return primary keys
+from bulk inserts. All names start with a prefix so a dataset can be removed
+again with flush().
+"""
+import json
+import logging
+import random
+import re
+import time
+import zlib
+from decimal import Decimal, ROUND_HALF_UP
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    AgentResponses, Assessments, CoachContent, ContentSearchDocuments, Notifications, Organizations,
+    PaymentAssignments, Payments, Products, QuestionResponses, Questions, UserOrganizations
+)
+from .bulk_upsert import set_assessment_questions
+from .coach_search import rebuild_index
+from .content_search import rebuild_index as rebuild_content_search
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_SYNTHETIC_PASSWORD = 'makemestrong'
+
+DEFAULT_LOAD_PROFILE = {
+    'ORGANIZATIONS': 5,
+    'ATHLETES': 20000,
+    # Zipf exponent for athletes per organization (0 spreads them evenly)
+    'ORG_SKEW': 1.0,
+    'ATHLETES_PER_COACH': 25,
+    'COACHES_PER_ATHLETE': {'1': 0.8, '2': 0.2},
+    'PARENT_RATE': 0.7,
+    'QUESTIONS': 50,
+    'COMPLETION': {'complete': 0.8, 'partial': 0.15, 'none': 0.05},
+    # Relative frequency of the answers 1..5
+    'RESPONSE_WEIGHTS': [1, 2, 4, 5, 3],
+    'PAYMENT_STATUS': {'succeeded': 0.9, 'pending': 0.04, 'failed': 0.03, 'refunded': 0.03},
+    # One agent response per purpose for every athlete who completed the assessment
+    'AGENT_PURPOSES': ['feedback_report', 'talking_points', 'scheduling_email'],
+    'CONTENT_RATE': 0.5,
+    'NOTIFICATIONS_PER_USER': 2,
+    'TEXT_WORDS': 300,
+}
+
+DEFAULT_SYNTHETIC_CHUNK_SIZE = 5000
+
+CATEGORY_FIELDS = {
+    'performance_mindset': 'category_performance_mindset',
+    'emotional_regulation': 'category_emotional_regulation',
+    'confidence': 'category_confidence',
+    'resilience__motivation': 'category_resilience_motivation',
+    'concentration': 'category_concentration',
+    'leadership': 'category_leadership',
+    'mental_wellbeing': 'category_mental_wellbeing',
+}
+
+WORDS = (
+    'focus confidence routine pressure goal practice team coach breathe reset visualize compete '
+    'mindset growth resilience energy calm plan review effort feedback leader trust habit'
+).split()
+
+TEXT_POOL_SIZE = 64
+
+
+def get_load_profile(overrides=None, path=None):
+    """
+    DEFAULT_LOAD_PROFILE, overridden by a JSON profile file, overridden by `overrides`.
+    """
+    profile = dict(DEFAULT_LOAD_PROFILE)
+    if path:
+        with open(path, 'r', encoding='utf-8') as file:
+            profile.update(json.load(file))
+    profile.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    return profile
+
+
+def weighted_choice(rng, distribution):
+    """Pick a key of a {value: weight} dict."""
+    keys = list(distribution)
+    return rng.choices(keys, weights=[distribution[key] for key in keys])[0]
+
+
+class SyntheticDataGenerator:
+    """
+    Builds one dataset for a prefix. The same seed and profile always produce
+    the same rows: every athlete draws from its own random stream, so adding
+    organizations or changing chunk sizes does not reshuffle other athletes.
+    """
+
+    def __init__(self, prefix='load', seed=0, profile=None, chunk_size=None, log=None):
+        self.prefix = prefix
+        self.seed = seed
+        self.profile = profile or get_load_profile()
+        self.chunk_size = chunk_size or DEFAULT_SYNTHETIC_CHUNK_SIZE
+        self.log = log or logger.info
+        self.counts = {}
+        self.texts = []
+        self.author = None
+
+    # Keys -------------------------------------------------------------
+
+    def username(self, role, org_index, index):
+        return f'{self.prefix}-o{org_index}-{role}{index}@example.com'
+
+    def athlete_rng(self, athlete_index):
+        return random.Random(f'{self.seed}:athlete:{athlete_index}')
+
+    # The regexes match the generated names exactly, so prefix 'load' leaves a 'load-x' dataset alone;
+    # startswith keeps the index range scan on username, slug and title
+
+    def organizations(self):
+        return Organizations.objects.filter(
+            slug__startswith=f'{self.prefix}-', slug__regex=rf'^{re.escape(self.prefix)}-[0-9]+$'
+        )
+
+    def users(self):
+        return User.objects.filter(
+            username__startswith=f'{self.prefix}-',
+            username__regex=rf'^{re.escape(self.prefix)}-o[0-9]+-(coach|parent|athlete)[0-9]+@example\.com$',
+        )
+
+    def questions(self):
+        return Questions.objects.filter(
+            title__startswith=f'{self.prefix} question ', title__regex=rf'^{re.escape(self.prefix)} question [0-9]+$'
+        )
+
+    # Entry points -----------------------------------------------------
+
+    def exists(self):
+        return self.organizations().exists()
+
+    def generate(self):
+        """
+        Create the dataset in one transaction.
+
+        Returns:
+            Dict mapping table name to rows created
+        """
+        started = time.perf_counter()
+        self.texts = [self.make_text(random.Random(f'{self.seed}:text:{i}')) for i in range(TEXT_POOL_SIZE)]
+
+        with transaction.atomic():
+            self.author = Questions.get_default_author()
+            assessment, questions = self.create_assessment()
+            product = Products.objects.create(
+                title=f'{self.prefix} product', price=Decimal('99.00'), is_active=True, pre_assessment=assessment,
+                author=self.author,
+            )
+            orgs = self.create_organizations()
+            people = self.plan_people(orgs, questions)
+            user_ids = self.create_users(people, questions)
+            self.create_memberships(people, user_ids, orgs)
+            assignments = self.create_assignments(people, user_ids, orgs, product)
+            self.create_responses(people, user_ids, assessment, questions)
+            self.create_agent_output(people, user_ids, assignments, assessment)
+            self.create_notifications(people, user_ids)
+            # bulk_create sends no signals, so index the new coaches and content directly
+            for org in orgs:
+                rebuild_index(org)
+                documents = rebuild_content_search(org)
+                self.counts['content_search_documents'] = self.counts.get('content_search_documents', 0) + documents
+
+        self.log(f"Generated synthetic dataset '{self.prefix}' in {time.perf_counter() - started:.1f}s")
+        return self.counts
+
+    def flush(self):
+        """
+        Delete every row of the dataset for this prefix.
+
+        Returns:
+            Dict mapping table name to rows deleted
+        """
+        deleted = {}
+        users = self.users()
+        orgs = self.organizations()
+
+        with transaction.atomic():
+            for label, queryset in [
+                ('content_search_documents', ContentSearchDocuments.objects.filter(assignment__organization__in=orgs)),
+                ('question_responses', QuestionResponses.objects.filter(author__in=users)),
+                ('coach_content', CoachContent.objects.filter(assignment__organization__in=orgs)),
+                ('agent_responses', AgentResponses.objects.filter(assignment__organization__in=orgs)),
+                ('notifications', Notifications.objects.filter(recipient__in=users)),
+                ('payment_assignments', PaymentAssignments.objects.filter(organization__in=orgs)),
+                ('payments', Payments.objects.filter(organization__in=orgs)),
+                ('users', users),
+                ('organizations', orgs),
+                ('products', Products.objects.filter(title=f'{self.prefix} product')),
+                ('assessments', Assessments.objects.filter(title=f'{self.prefix} assessment')),
+                ('questions', self.questions()),
+            ]:
+                deleted[label] = queryset.delete()[1].get(queryset.model._meta.label, 0)
+        return deleted
+
+    # Steps ------------------------------------------------------------
+
+    def insert(self, label, model, objects):
+        """bulk_create an iterable in chunks without holding it all in memory."""
+        total = 0
+        chunk = []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= self.chunk_size:
+                model.objects.bulk_create(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            model.objects.bulk_create(chunk)
+            total += len(chunk)
+        self.counts[label] = self.counts.get(label, 0) + total
+        self.log(f"  {label}: {total}")
+        return total
+
+    def create_assessment(self):
+        categories = list(CATEGORY_FIELDS)
+        author = self.author
+        titles = [f'{self.prefix} question {i}' for i in range(self.profile['QUESTIONS'])]
+        self.insert('questions', Questions, (
+            Questions(title=title, question_category=categories[i % len(categories)], scale='onetofive', author=author)
+            for i, title in enumerate(titles)
+        ))
+        by_title = {question.title: question for question in Questions.objects.filter(title__in=titles)}
+        questions = [by_title[title] for title in titles]
+
+        assessment = Assessments.objects.create(title=f'{self.prefix} assessment', author=author)
+        set_assessment_questions(assessment, questions)
+        return assessment, questions
+
+    def create_organizations(self):
+        self.insert('organizations', Organizations, (
+            Organizations(name=f'{self.prefix} organization {i}', slug=f'{self.prefix}-{i}', author=self.author)
+            for i in range(self.profile['ORGANIZATIONS'])
+        ))
+        by_slug = {org.slug: org for org in self.organizations()}
+        return [by_slug[f'{self.prefix}-{i}'] for i in range(self.profile['ORGANIZATIONS'])]
+
+    def plan_people(self, orgs, questions):
+        """
+        Decide every user and relationship up front (cheap tuples only).
+
+        Returns:
+            Dict with 'athletes', 'coaches' and 'parents' lists
+        """
+        skew = self.profile['ORG_SKEW']
+        weights = [1 / (i + 1) ** skew for i in range(len(orgs))]
+        total_weight = sum(weights)
+        sizes = [int(self.profile['ATHLETES'] * weight / total_weight) for weight in weights]
+        sizes[0] += self.profile['ATHLETES'] - sum(sizes)
+
+        athletes, coaches, parents = [], [], []
+        coaches_per_athlete = {int(key): value for key, value in self.profile['COACHES_PER_ATHLETE'].items()}
+        athlete_index = 0
+
+        for org_index, size in enumerate(sizes):
+            org_coaches = [
+                self.username('coach', org_index, i)
+                for i in range(max(1, -(-size // self.profile['ATHLETES_PER_COACH'])))
+            ]
+            coaches.extend((username, org_index) for username in org_coaches)
+
+            for i in range(size):
+                rng = self.athlete_rng(athlete_index)
+                completion = weighted_choice(rng, self.profile['COMPLETION'])
+                answered = len(questions) if completion == 'complete' else (
+                    rng.randint(1, len(questions) - 1) if completion == 'partial' and len(questions) > 1 else 0
+                )
+                parent = None
+                if rng.random() < self.profile['PARENT_RATE']:
+                    parent = self.username('parent', org_index, i)
+                    parents.append((parent, org_index))
+                count = min(weighted_choice(rng, coaches_per_athlete), len(org_coaches))
+                athletes.append({
+                    'index': athlete_index,
+                    'username': self.username('athlete', org_index, i),
+                    'org_index': org_index,
+                    'answered': answered,
+                    'complete': completion == 'complete',
+                    'parent': parent,
+                    'coaches': rng.sample(org_coaches, count),
+                    'status': weighted_choice(rng, self.profile['PAYMENT_STATUS']),
+                    'content': rng.random() < self.profile['CONTENT_RATE'],
+                })
+                athlete_index += 1
+
+        return {'athletes': athletes, 'coaches': coaches, 'parents': parents}
+
+    def responses_for(self, athlete, questions):
+        """The athlete's answers, regenerated from its own random stream."""
+        rng = random.Random(f'{self.seed}:responses:{athlete["index"]}')
+        values = rng.choices(range(1, 6), weights=self.profile['RESPONSE_WEIGHTS'], k=athlete['answered'])
+        return list(zip(questions, values))
+
+    def category_scores(self, answers):
+        totals = {}
+        for question, value in answers:
+            totals.setdefault(question.question_category, []).append(value)
+        scores = {
+            CATEGORY_FIELDS[category]: Decimal(sum(values) / len(values)).quantize(Decimal('0.01'), ROUND_HALF_UP)
+            for category, values in totals.items()
+        }
+        if scores:
+            scores['category_total_score'] = sum(scores.values())
+        return scores
+
+    def create_users(self, people, questions):
+        # One shared hash: hashing tens of thousands of users one salt at a time would take hours
+        password = make_password(DEFAULT_SYNTHETIC_PASSWORD)
+
+        def users():
+            for username, _ in people['coaches']:
+                yield User(username=username, email=username, first_name='Coach', last_name=username.split('@')[0], password=password)
+            for username, _ in people['parents']:
+                yield User(username=username, email=username, first_name='Parent', last_name=username.split('@')[0], password=password)
+            for athlete in people['athletes']:
+                scores = self.category_scores(self.responses_for(athlete, questions)) if athlete['complete'] else {}
+                yield User(
+                    username=athlete['username'], email=athlete['username'], first_name='Athlete',
+                    last_name=athlete['username'].split('@')[0], password=password, **scores
+                )
+
+        self.insert('users', User, users())
+        user_ids = dict(self.users().values_list('username', 'id'))
+        self.insert('email_addresses', EmailAddress, (
+            EmailAddress(user_id=user_id, email=username, verified=True, primary=True)
+            for username, user_id in user_ids.items()
+        ))
+        return user_ids
+
+    def create_memberships(self, people, user_ids, orgs):
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in ['athlete', 'coach', 'parent']}
+        members = (
+            [(username, org_index, 'coach') for username, org_index in people['coaches']]
+            + [(username, org_index, 'parent') for username, org_index in people['parents']]
+            + [(athlete['username'], athlete['org_index'], 'athlete') for athlete in people['athletes']]
+        )
+        self.insert('group_memberships', User.groups.through, (
+            User.groups.through(users_id=user_ids[username], group_id=groups[role].id)
+            for username, _, role in members
+        ))
+        self.insert('user_organizations', UserOrganizations, (
+            UserOrganizations(
+                user_id=user_ids[username], organization=orgs[org_index], is_coach=role == 'coach', is_active=True,
+                author=self.author,
+            )
+            for username, org_index, role in members
+        ))
+
+    def create_assignments(self, people, user_ids, orgs, product):
+        """One payment and one assignment per athlete. Returns athlete username -> assignment id."""
+        now = timezone.now()
+        athletes = people['athletes']
+
+        def payments():
+            for athlete in athletes:
+                payer = athlete['parent'] or athlete['username']
+                yield Payments(
+                    product=product, paid=product.price, status=athlete['status'], organization=orgs[athlete['org_index']],
+                    stripe_payment_intent_id=f'{self.prefix}-pi-{athlete["index"]}', author_id=user_ids[payer],
+                )
+
+        self.insert('payments', Payments, payments())
+        payment_ids = dict(
+            Payments.objects.filter(organization__in=orgs, stripe_payment_intent_id__startswith=f'{self.prefix}-pi-')
+            .values_list('stripe_payment_intent_id', 'id')
+        )
+
+        self.insert('payment_assignments', PaymentAssignments, (
+            PaymentAssignments(
+                payment_id=payment_ids[f'{self.prefix}-pi-{athlete["index"]}'],
+                athlete_id=user_ids[athlete['username']],
+                organization=orgs[athlete['org_index']],
+                pre_assessment=product.pre_assessment,
+                pre_assessment_submitted_at=now if athlete['complete'] else None,
+                author_id=user_ids[athlete['parent'] or athlete['username']],
+            )
+            for athlete in athletes
+        ))
+        by_athlete = dict(
+            PaymentAssignments.objects.filter(organization__in=orgs).values_list('athlete_id', 'id')
+        )
+        assignments = {athlete['username']: by_athlete[user_ids[athlete['username']]] for athlete in athletes}
+
+        self.insert('assignment_coaches', PaymentAssignments.coaches.through, (
+            PaymentAssignments.coaches.through(paymentassignments_id=assignments[athlete['username']], users_id=user_ids[coach])
+            for athlete in athletes for coach in athlete['coaches']
+        ))
+        self.insert('assignment_parents', PaymentAssignments.parents.through, (
+            PaymentAssignments.parents.through(paymentassignments_id=assignments[athlete['username']], users_id=user_ids[athlete['parent']])
+            for athlete in athletes if athlete['parent']
+        ))
+        return assignments
+
+    def create_responses(self, people, user_ids, assessment, questions):
+        self.insert('question_responses', QuestionResponses, (
+            QuestionResponses(author_id=user_ids[athlete['username']], question=question, assessment=assessment, response=value)
+            for athlete in people['athletes'] for question, value in self.responses_for(athlete, questions)
+        ))
+
+    def create_agent_output(self, people, user_ids, assignments, assessment):
+        completed = [athlete for athlete in people['athletes'] if athlete['complete']]
+        purposes = self.profile['AGENT_PURPOSES']
+        self.insert('agent_responses', AgentResponses, (
+            AgentResponses(
+                athlete_id=user_ids[athlete['username']], assessment=assessment, assignment_id=assignments[athlete['username']],
+                purpose=purpose, message_body=self.text(athlete, purpose, 'prompt'), ai_response=self.text(athlete, purpose, 'response'),
+                author_id=user_ids[athlete['coaches'][0]] if athlete['coaches'] else None,
+            )
+            for athlete in completed for purpose in purposes
+        ))
+        self.insert('coach_content', CoachContent, (
+            CoachContent(
+                author_id=user_ids[athlete['coaches'][0]], assignment_id=assignments[athlete['username']],
+                athlete_id=user_ids[athlete['username']], title=f'{purposes[0].replace("_", " ").title()} for {athlete["username"]}',
+                body=self.text(athlete, purposes[0], 'content'), purpose=purposes[0], privacy='mentioned',
+            )
+            for athlete in completed if athlete['content'] and athlete['coaches'] and purposes
+        ))
+
+    def create_notifications(self, people, user_ids):
+        per_user = self.profile['NOTIFICATIONS_PER_USER']
+        types = ['agent-response', 'coach-content', 'assessment-submitted']
+        self.insert('notifications', Notifications, (
+            Notifications(
+                recipient_id=user_id, message=f'Synthetic notification {i} for {username}', channel='dashboard',
+                delivery_status='delivered', notification_type=types[i % len(types)], seen=i % 2 == 1,
+            )
+            for username, user_id in user_ids.items() for i in range(per_user)
+        ))
+
+    # Text ---------------------------------------------------------------
+
+    def make_text(self, rng):
+        words = rng.choices(WORDS, k=self.profile['TEXT_WORDS'])
+        return ' '.join(words).capitalize() + '.'
+
+    def text(self, athlete, purpose, kind):
+        return self.texts[zlib.crc32(f"{athlete['index']}:{purpose}:{kind}".encode()) % len(self.texts)]
@@ -0,0 +1,404 @@
+"""
+Tiered Cache Service
+
+Two cache tiers for read-mostly lookups (organizations, prompt templates,
+assessment definitions):
+
+1. A bounded in-process LRU with a short TTL, so repeated lookups in one worker
+   never leave the process.
+2. The shared Django cache (settings.CACHES, see settings/cache.py), so workers
+   and instances share one computed value.
+
+Keys are namespaced, and optionally scoped to an organization. Each namespace
+and organization has a generation token in the shared tier; invalidating
+replaces it, which orphans every key of that scope at once. Other processes
+pick up a new generation within GENERATION_TTL seconds. Tokens are random, so
+an evicted generation key never brings back values of an older generation.
+
+Misses are recomputed once (single flight): threads of a process wait on a
+lock, and processes wait on a short-lived lock key in the shared tier.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIERED_CACHE_SETTINGS = {
+    'BACKEND_ALIAS': 'default',
+    # Entries kept in each process
+    'LOCAL_MAX_ENTRIES': 1000,
+    # Upper bound on how long a process serves a value without asking the shared tier
+    'LOCAL_TIMEOUT': 30,
+    # Seconds a process trusts its copy of a generation token
+    'GENERATION_TTL': 5,
+    'DEFAULT_TIMEOUT': 300,
+    # Cross-process recompute lock: held at most LOCK_TIMEOUT, waited on at most LOCK_WAIT
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 5,
+    'LOCK_POLL_INTERVAL': 0.05,
+}
+
+_MISSING = object()
+
+
+def get_tiered_cache_settings():
+    """Merge TIERED_CACHE from settings over the defaults."""
+    config = DEFAULT_TIERED_CACHE_SETTINGS.copy()
+    config.update(getattr(settings, 'TIERED_CACHE', {}) or {})
+    return config
+
+
+class LocalLRU:
+    """Thread-safe LRU with a per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CacheStats:
+    """Hit/miss counters per namespace."""
+
+    FIELDS = ('local_hits', 'shared_hits', 'misses', 'computes', 'lock_waits', 'errors')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.namespaces = {}
+
+    def incr(self, namespace, field):
+        with self.lock:
+            counters = self.namespaces.setdefault(namespace, dict.fromkeys(self.FIELDS, 0))
+            counters[field] += 1
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for namespace, counters in self.namespaces.items():
+                lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+                result[namespace] = dict(
+                    counters,
+                    lookups=lookups,
+                    hit_rate=round((counters['local_hits'] + counters['shared_hits']) / lookups, 4) if lookups else None,
+                    local_hit_rate=round(counters['local_hits'] / lookups, 4) if lookups else None,
+                )
+            return result
+
+    def reset(self):
+        with self.lock:
+            self.namespaces.clear()
+
+
+def new_generation():
+    """A generation token that is never reused, unlike a counter restarted after eviction."""
+    return uuid.uuid4().hex[:16]
+
+
+def organization_key(organization):
+    """Organizations, ids and slugs all scope a key the same way."""
+    if organization is None:
+        return '-'
+    return str(getattr(organization, 'pk', organization))
+
+
+class TieredCache:
+    """
+    Usage:
+        cache = get_tiered_cache()
+        org = cache.get_or_set('organizations', slug, lambda: load(slug))
+        cache.invalidate('organizations')
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_tiered_cache_settings()
+        self.local = LocalLRU(self.config['LOCAL_MAX_ENTRIES'])
+        self.stats = CacheStats()
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+        # Per thread: (commit hook, scopes it will invalidate)
+        self.pending = threading.local()
+
+    @property
+    def shared(self):
+        return caches[self.config['BACKEND_ALIAS']]
+
+    # Keys -------------------------------------------------------------
+
+    def generation_key(self, namespace, organization=None):
+        return f'tiered:generation:{namespace}:{organization_key(organization)}'
+
+    def generation(self, namespace, organization=None):
+        """Current generation of a scope, trusted locally for GENERATION_TTL seconds."""
+        key = self.generation_key(namespace, organization)
+        generation = self.local.get(key)
+        if generation is _MISSING:
+            try:
+                generation = self.shared.get(key)
+                if generation is None:
+                    generation = new_generation()
+                    # Another process may have created it first; everyone uses the stored token
+                    self.shared.add(key, generation, timeout=None)
+                    generation = self.shared.get(key) or generation
+            except Exception as e:
+                logger.warning(f"Tiered cache generation lookup failed for {key}: {e}")
+                # Private to this process, so nothing stored meanwhile is served after a later invalidation
+                generation = new_generation()
+            self.local.set(key, generation, self.config['GENERATION_TTL'])
+        return generation
+
+    def make_key(self, namespace, key, organization=None):
+        generation = self.generation(namespace, organization)
+        return f'tiered:{namespace}:{organization_key(organization)}:{generation}:{key}'
+
+    # Reads and writes -------------------------------------------------
+
+    def get(self, namespace, key, default=None, organization=None):
+        value = self.lookup(namespace, self.make_key(namespace, key, organization))
+        return default if value is _MISSING else value
+
+    def set(self, namespace, key, value, organization=None, timeout=None):
+        self.store(self.make_key(namespace, key, organization), value, timeout)
+
+    def delete(self, namespace, key, organization=None):
+        """Delete one key. Other processes may serve their local copy for up to LOCAL_TIMEOUT."""
+        full_key = self.make_key(namespace, key, organization)
+        self.local.delete(full_key)
+        try:
+            self.shared.delete(full_key)
+        except Exception as e:
+            logger.warning(f"Tiered cache delete failed for {full_key}: {e}")
+
+    def get_or_set(self, namespace, key, compute, organization=None, timeout=None):
+        """
+        Cached value of `compute()`. On a miss only one caller computes; the
+        others wait for its result and fall back to computing themselves if it
+        does not show up within LOCK_WAIT seconds.
+        """
+        full_key = self.make_key(namespace, key, organization)
+        value = self.lookup(namespace, full_key)
+        if value is not _MISSING:
+            return value
+
+        with self.flight_lock(full_key):
+            # Another thread of this process may have filled it while we waited
+            value = self.lookup(namespace, full_key, count=False)
+            if value is not _MISSING:
+                return value
+
+            lock_key = f'{full_key}:lock'
+            try:
+                acquired = self.shared.add(lock_key, 1, timeout=self.config['LOCK_TIMEOUT'])
+            except Exception:
+                acquired = True
+            if not acquired:
+                self.stats.incr(namespace, 'lock_waits')
+                value = self.wait_for(full_key)
+                if value is not _MISSING:
+                    self.local.set(full_key, value, self.config['LOCAL_TIMEOUT'])
+                    return value
+
+            try:
+                self.stats.incr(namespace, 'computes')
+                value = compute()
+                self.store(full_key, value, timeout)
+                return value
+            finally:
+                if acquired:
+                    try:
+                        self.shared.delete(lock_key)
+                    except Exception:
+                        pass
+
+    def invalidate(self, namespace, organization=None):
+        """Drop every key of a namespace (and organization) by moving to a new generation."""
+        key = self.generation_key(namespace, organization)
+        generation = new_generation()
+        try:
+            self.shared.set(key, generation, timeout=None)
+        except Exception as e:
+            logger.warning(f"Tiered cache invalidation failed for {key}: {e}")
+            return
+        self.local.set(key, generation, self.config['GENERATION_TTL'])
+
+    def invalidate_on_commit(self, namespace, organization=None, using=None):
+        """
+        invalidate() once the current transaction commits, right away outside
+        one. Repeated calls within a transaction invalidate each scope once.
+        """
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            self.invalidate(namespace, organization)
+            return
+        scope = (namespace, organization_key(organization))
+        hook, scopes = getattr(self.pending, 'hook', None), getattr(self.pending, 'scopes', None)
+        # A rollback discards the hook; start over when it is no longer queued
+        if hook is None or not any(queued is hook for _, queued, _ in connection.run_on_commit):
+            scopes = {}
+
+            def hook():
+                self.pending.hook = self.pending.scopes = None
+                for namespace, organization in scopes.values():
+                    self.invalidate(namespace, organization)
+
+            self.pending.hook, self.pending.scopes = hook, scopes
+            transaction.on_commit(hook, using=using)
+        scopes[scope] = (namespace, organization)
+
+    def clear_local(self):
+        self.local.clear()
+
+    # Internals --------------------------------------------------------
+
+    def lookup(self, namespace, full_key, count=True):
+        value = self.local.get(full_key)
+        if value is not _MISSING:
+            if count:
+                self.stats.incr(namespace, 'local_hits')
+            return value
+        try:
+            wrapped = self.shared.get(full_key)
+        except Exception as e:
+            logger.warning(f"Tiered cache read failed for {full_key}: {e}")
+            self.stats.incr(namespace, 'errors')
+            wrapped = None
+        if wrapped is not None:
+            # Values are stored in a 1-tuple so a cached None is still a hit
+            value = wrapped[0]
+            self.local.set(full_key, value, self.config['LOCAL_TIMEOUT'])
+            if count:
+                self.stats.incr(namespace, 'shared_hits')
+            return value
+        if count:
+            self.stats.incr(namespace, 'misses')
+        return _MISSING
+
+    def store(self, full_key, value, timeout):
+        timeout = self.config['DEFAULT_TIMEOUT'] if timeout is None else timeout
+        self.local.set(full_key, value, min(timeout, self.config['LOCAL_TIMEOUT']))
+        try:
+            self.shared.set(full_key, (value,), timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Tiered cache write failed for {full_key}: {e}")
+
+    def wait_for(self, full_key):
+        deadline = time.monotonic() + self.config['LOCK_WAIT']
+        while time.monotonic() < deadline:
+            time.sleep(self.config['LOCK_POLL_INTERVAL'])
+            try:
+                wrapped = self.shared.get(full_key)
+            except Exception:
+                return _MISSING
+            if wrapped is not None:
+                return wrapped[0]
+        return _MISSING
+
+    def flight_lock(self, full_key):
+        with self.flights_lock:
+            lock = self.flights.get(full_key)
+            if lock is None:
+                lock = self.flights[full_key] = _FlightLock(self, full_key)
+            lock.waiters += 1
+        return lock
+
+
+class _FlightLock:
+    """Per-key lock that removes itself once the last waiter is done."""
+
+    def __init__(self, cache, full_key):
+        self.cache = cache
+        self.full_key = full_key
+        self.lock = threading.Lock()
+        self.waiters = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.lock.release()
+        with self.cache.flights_lock:
+            self.waiters -= 1
+            if not self.waiters:
+                self.cache.flights.pop(self.full_key, None)
+        return False
+
+
+_tiered_cache = None
+_tiered_cache_lock = threading.Lock()
+
+
+def get_tiered_cache():
+    """Process-wide TieredCache."""
+    global _tiered_cache
+    with _tiered_cache_lock:
+        if _tiered_cache is None:
+            _tiered_cache = TieredCache()
+        return _tiered_cache
+
+
+def get_cache_stats():
+    """Hit rates per namespace plus the local tier size, for GET /api/metrics/requests."""
+    tiered = get_tiered_cache()
+    return {
+        'local_entries': len(tiered.local),
+        'local_max_entries': tiered.config['LOCAL_MAX_ENTRIES'],
+        'namespaces': tiered.stats.snapshot(),
+    }
+
+
+def invalidate_on_change(namespace, sender, organization=None):
+    """
+    Invalidate a namespace whenever instances of `sender` are saved or deleted,
+    once per scope and transaction.
+
+    Args:
+        namespace: Tiered cache namespace
+        sender: Model class
+        organization: Optional callable(instance) returning the organization
+            scope to invalidate; without it the unscoped namespace is invalidated
+    """
+    def receiver(sender, instance, **kwargs):
+        get_tiered_cache().invalidate_on_commit(namespace, organization(instance) if organization else None)
+
+    uid = f'tiered-cache:{namespace}:{sender._meta.label}'
+    post_save.connect(receiver, sender=sender, weak=False, dispatch_uid=f'{uid}:save')
+    post_delete.connect(receiver, sender=sender, weak=False, dispatch_uid=f'{uid}:delete')
+    return receiver
@@ -0,0 +1,329 @@
+"""
+User Import Service
+
+Imports users from a CSV file into an organization with set-based queries:
+rows are streamed and handled in chunks, existing users, email addresses,
+groups and memberships are prefetched once per chunk, new rows are written
+with bulk_create and changed rows with bulk_update, all inside one
+transaction. Password hashing, the slowest step, runs in a process pool.
+"""
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from ..models import UserOrganizations
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'makemestrong'
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+
+# Below this many new users per chunk the pool costs more than it saves
+MIN_POOL_PASSWORDS = 8
+
+REQUIRED_COLUMNS = ['email', 'first_name', 'last_name']
+PROFILE_FIELDS = ['first_name', 'last_name', 'gender', 'birthdate', 'zip_code']
+
+
+class ImportRowError(ValueError):
+    """Raised when a CSV row cannot be imported."""
+
+
+def init_hash_worker():
+    """Configure Django in pool workers started with the spawn method."""
+    import django
+    django.setup()
+
+
+def hash_passwords(password, count, pool=None, workers=1):
+    """
+    Hash a password `count` times, each with its own salt.
+
+    Args:
+        password: Raw password
+        count: Number of hashes
+        pool: ProcessPoolExecutor to spread the work over (optional)
+        workers: Number of processes in the pool
+    """
+    if pool is None or count < MIN_POOL_PASSWORDS:
+        return [make_password(password) for _ in range(count)]
+    chunksize = max(1, count // (workers * 4))
+    return list(pool.map(make_password, repeat(password, count), chunksize=chunksize))
+
+
+def parse_row(row):
+    """
+    Clean one CSV row.
+
+    Returns:
+        Dict with email and the PROFILE_FIELDS values
+
+    Raises:
+        ImportRowError: If a required value is missing or a value is invalid
+    """
+    email = (row.get('email') or '').strip()
+    if not email:
+        raise ImportRowError('Email is required')
+    if len(email) > User._meta.get_field('username').max_length:
+        raise ImportRowError('Email is too long to be used as username')
+
+    data = {'email': email}
+    for field in ['first_name', 'last_name']:
+        data[field] = (row.get(field) or '').strip()
+
+    data['gender'] = (row.get('gender') or '').strip() or None
+    if data['gender'] and data['gender'] not in User.GenderChoices.values:
+        raise ImportRowError(f"Invalid gender: {data['gender']}")
+
+    birthdate = (row.get('birthdate') or '').strip()
+    try:
+        data['birthdate'] = parse_date(birthdate) if birthdate else None
+    except ValueError:
+        data['birthdate'] = None
+    if birthdate and data['birthdate'] is None:
+        raise ImportRowError(f'Invalid birthdate: {birthdate} (expected YYYY-MM-DD)')
+
+    data['zip_code'] = (row.get('zip_code') or '').strip() or None
+    if data['zip_code'] and len(data['zip_code']) > User._meta.get_field('zip_code').max_length:
+        raise ImportRowError(f"Invalid zip code: {data['zip_code']}")
+
+    return data
+
+
+class UserImportService:
+    """
+    Imports users for one role into one organization.
+
+    New users get DEFAULT_PASSWORD, a verified primary email address, the
+    'oa-tester' and role groups and an active membership. Existing users
+    (matched by email) get their profile fields updated and any missing
+    groups or membership added. With dry_run nothing is written, but the
+    report lists the same changes.
+    """
+
+    def __init__(self, organization, role, dry_run=False, chunk_size=None, workers=None, password=DEFAULT_PASSWORD):
+        self.organization = organization
+        self.role = role
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size or DEFAULT_IMPORT_CHUNK_SIZE
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.password = password
+        self.pool = None
+        self.groups = []
+        self.membership_author = None
+        self.updated_user_ids = []
+
+    def run(self, file_path):
+        """
+        Import a CSV file.
+
+        Args:
+            file_path: CSV with email, first_name, last_name and optional
+                gender, birthdate (YYYY-MM-DD) and zip_code columns
+
+        Returns:
+            Dict with created/updated/unchanged/memberships_added counts,
+            'changes' (one entry per imported row) and 'errors' (row number,
+            email, message for every skipped row)
+        """
+        report = {
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'memberships_added': 0,
+            'changes': [],
+            'errors': [],
+        }
+
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ImportRowError(f"CSV is missing required columns: {', '.join(missing)}")
+
+            if self.workers > 1 and not self.dry_run:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_hash_worker)
+            try:
+                with transaction.atomic():
+                    self.groups = self.get_groups()
+                    self.membership_author = UserOrganizations.get_default_author()
+                    for chunk in self.read_chunks(reader, report):
+                        self.import_chunk(chunk, report)
+            finally:
+                if self.pool is not None:
+                    self.pool.shutdown()
+                    self.pool = None
+
+        report['errors'].sort()
+        if not self.dry_run and self.updated_user_ids:
+            # bulk_update sends no signals; renamed coaches need new search terms
+            from .coach_search import reindex_users
+            reindex_users(self.updated_user_ids)
+        if not self.dry_run:
+            logger.info(
+                f"User import into {self.organization.slug}: {report['created']} created, "
+                f"{report['updated']} updated, {len(report['errors'])} skipped"
+            )
+        return report
+
+    def get_groups(self):
+        names = ['oa-tester', self.role]
+        if self.dry_run:
+            # Groups that do not exist yet are reported as unsaved instances
+            found = {group.name: group for group in Group.objects.filter(name__in=names)}
+            return [found.get(name) or Group(name=name) for name in names]
+        return [Group.objects.get_or_create(name=name)[0] for name in names]
+
+    def read_chunks(self, reader, report):
+        """Yield lists of (row_num, data), collecting invalid and duplicate rows as errors."""
+        seen = {}
+        chunk = []
+        for row_num, row in enumerate(reader, 1):
+            try:
+                data = parse_row(row)
+            except ImportRowError as e:
+                report['errors'].append((row_num, (row.get('email') or '').strip() or 'unknown', str(e)))
+                continue
+
+            key = data['email'].lower()
+            if key in seen:
+                report['errors'].append((row_num, data['email'], f'Duplicate of row {seen[key]}'))
+                continue
+            seen[key] = row_num
+
+            chunk.append((row_num, data))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def import_chunk(self, chunk, report):
+        emails = [data['email'] for _, data in chunk]
+        keys = {email.lower() for email in emails}
+
+        # One query per table for everything this chunk needs to know
+        existing = {}
+        usernames = {}
+        for user in User.objects.filter(Q(email__in=emails) | Q(username__in=emails)):
+            if user.email.lower() in keys:
+                existing.setdefault(user.email.lower(), user)
+            usernames[user.username.lower()] = user
+        claimed_emails = dict(
+            (email.lower(), user_id) for email, user_id in
+            EmailAddress.objects.filter(email__in=emails).values_list('email', 'user_id')
+        )
+        existing_ids = [user.id for user in existing.values()]
+        group_pairs = set(
+            User.groups.through.objects
+            .filter(users_id__in=existing_ids, group_id__in=[group.id for group in self.groups if group.id])
+            .values_list('users_id', 'group_id')
+        )
+        member_ids = set(
+            UserOrganizations.objects
+            .filter(user_id__in=existing_ids, organization=self.organization)
+            .values_list('user_id', flat=True)
+        )
+
+        new_rows = []
+        updated_users = []
+        for row_num, data in chunk:
+            key = data['email'].lower()
+            user = existing.get(key)
+
+            if user is None:
+                owner = usernames.get(key)
+                if owner is not None:
+                    report['errors'].append((row_num, data['email'], f'Username already taken by user {owner.id}'))
+                    continue
+                if key in claimed_emails:
+                    report['errors'].append((row_num, data['email'], f'Email address already belongs to user {claimed_emails[key]}'))
+                    continue
+                new_rows.append((row_num, data))
+                report['created'] += 1
+                report['memberships_added'] += 1
+                report['changes'].append({'row': row_num, 'email': data['email'], 'action': 'created'})
+                continue
+
+            fields = {
+                field: (getattr(user, field), data[field])
+                for field in PROFILE_FIELDS if getattr(user, field) != data[field]
+            }
+            missing_groups = [group for group in self.groups if (user.id, group.id) not in group_pairs]
+            joins = user.id not in member_ids
+            if fields:
+                for field, (_, value) in fields.items():
+                    setattr(user, field, value)
+                updated_users.append(user)
+                report['updated'] += 1
+            else:
+                report['unchanged'] += 1
+            if joins:
+                report['memberships_added'] += 1
+            report['changes'].append({
+                'row': row_num,
+                'email': data['email'],
+                'action': 'updated' if fields else 'unchanged',
+                'fields': fields,
+                'groups_added': [group.name for group in missing_groups],
+                'joins_organization': joins,
+            })
+
+        if self.dry_run:
+            return
+
+        if updated_users:
+            User.objects.bulk_update(updated_users, PROFILE_FIELDS)
+            self.updated_user_ids.extend(user.id for user in updated_users)
+
+        new_ids = self.create_users(new_rows)
+        user_ids = new_ids + [user.id for user in existing.values()]
+
+        User.groups.through.objects.bulk_create([
+            User.groups.through(users_id=user_id, group_id=group.id)
+            for user_id in user_ids for group in self.groups
+            if (user_id, group.id) not in group_pairs
+        ])
+        UserOrganizations.objects.bulk_create([
+            UserOrganizations(user_id=user_id, organization=self.organization, is_active=True, author=self.membership_author)
+            for user_id in user_ids if user_id not in member_ids
+        ])
+
+    def create_users(self, rows):
+        """Insert new users and their verified email addresses. Returns the new user ids."""
+        if not rows:
+            return []
+
+        passwords = hash_passwords(self.password, len(rows), self.pool, self.workers)
+        User.objects.bulk_create([
+            User(
+                username=data['email'],
+                email=data['email'],
+                password=password,
+                is_active=True,
+                is_staff=False,
+                is_superuser=False,
+                **{field: data[field] for field in PROFILE_FIELDS},
+            )
+            for (_, data), password in zip(rows, passwords)
+        ])
+
+        # MySQL does not return primary keys from bulk inserts
+        ids = dict(User.objects.filter(username__in=[data['email'] for _, data in rows]).values_list('username', 'id'))
+        EmailAddress.objects.bulk_create([
+            EmailAddress(user_id=ids[data['email']], email=data['email'], verified=True, primary=True)
+            for _, data in rows
+        ])
+        return list(ids.values())
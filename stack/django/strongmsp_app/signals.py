@@ -2,9 +2,14 @@ from allauth.account.signals import email_confirmed
 from django.contrib.auth.models import Group
 from django.dispatch import receiver
 # Add signal to update user category scores when assessments are submitted
-from django.db.models.signals import post_save
-from .models import PaymentAssignments
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from .models import (
+    PaymentAssignments, Notifications, AgentResponses, Assessments, AssessmentQuestions, Questions, Organizations,
+    PromptTemplates, Users, UserOrganizations, CoachContent
+)
 from .services.confidence_analyzer import ConfidenceAnalyzer
+from .services.ownership_stats import GROUP_STATS_NAMESPACE, USER_STATS_NAMESPACE, authored_models
+from .services.tiered_cache import get_tiered_cache, invalidate_on_change
 
 
 @receiver(email_confirmed)
@@ -43,3 +48,131 @@ def update_user_category_scores_on_submission(sender, instance, **kwargs):
             instance.athlete.id,
             instance.payment.product.post_assessment.id
         )
+
+
+@receiver([post_save, post_delete], sender=Notifications)
+def invalidate_notification_unread_count(sender, instance, **kwargs):
+    """Drop the recipient's cached unread count whenever one of their notifications changes."""
+    from .notification_service import invalidate_unread_count
+    invalidate_unread_count(instance.recipient_id)
+
+
+@receiver(post_save, sender=Notifications)
+def push_notification_created(sender, instance, created, **kwargs):
+    """Push new dashboard notifications to the recipient's open event streams."""
+    if created:
+        from .services.event_stream import publish_notification_created
+        publish_notification_created(instance)
+
+
+@receiver(post_save, sender=AgentResponses)
+def push_agent_response_completed(sender, instance, created, **kwargs):
+    """Push completed agent responses to everyone on the assignment."""
+    if created:
+        from .services.event_stream import publish_agent_response_completed
+        publish_agent_response_completed(instance)
+
+
+@receiver([post_save, pre_delete], sender=Assessments)
+def bump_assessment_definition_on_assessment_change(sender, instance, **kwargs):
+    """Assessment title/description are part of the cached definition."""
+    from .services.assessment_definitions import bump_definition_version
+    bump_definition_version([instance.id])
+
+
+@receiver(m2m_changed, sender=Assessments.questions.through)
+def bump_assessment_definition_on_questions_change(sender, instance, action, pk_set, **kwargs):
+    """Adding or removing questions changes the definition of the affected assessments."""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    from .services.assessment_definitions import bump_definition_version
+    if isinstance(instance, Assessments):
+        bump_definition_version([instance.id])
+    elif action in ('post_add', 'post_remove'):
+        bump_definition_version(pk_set or [])
+    else:
+        bump_definition_version(instance.questions_to_assessments.values_list('id', flat=True))
+
+
+@receiver([post_save, pre_delete], sender=AssessmentQuestions)
+def bump_assessment_definition_on_assessment_question_change(sender, instance, **kwargs):
+    """Order and conditions of an assessment question are part of the definition."""
+    from .services.assessment_definitions import bump_definition_version
+    bump_definition_version(instance.questions_to_assessments.values_list('id', flat=True))
+
+
+@receiver([post_save, pre_delete], sender=Questions)
+def bump_assessment_definition_on_question_change(sender, instance, **kwargs):
+    """Question text, category, scale and labels are part of the definition."""
+    from .services.assessment_definitions import bump_definition_version
+    bump_definition_version(
+        Assessments.objects.filter(questions__question=instance).values_list('id', flat=True)
+    )
+
+
+# Tiered cache namespaces dropped whenever one of their rows changes
+invalidate_on_change('organizations', Organizations)
+# Also reloads the prompt template registry of every process (services/prompt_registry.py)
+invalidate_on_change('prompt_templates', PromptTemplates)
+
+# Ownership stats: row counts per author and per group of authors
+for _, authored_model in authored_models():
+    invalidate_on_change(GROUP_STATS_NAMESPACE, authored_model)
+    invalidate_on_change(USER_STATS_NAMESPACE, authored_model, organization=lambda instance: instance.author_id)
+invalidate_on_change(GROUP_STATS_NAMESPACE, Group)
+
+
+@receiver(m2m_changed, sender=Users.groups.through)
+def invalidate_group_stats_on_membership_change(sender, action, **kwargs):
+    """Member counts change when users join or leave groups."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        get_tiered_cache().invalidate_on_commit(GROUP_STATS_NAMESPACE)
+
+
+@receiver(post_delete, sender=Users)
+def invalidate_group_stats_on_user_delete(sender, instance, **kwargs):
+    """Deleting a user drops their memberships without an m2m_changed signal."""
+    get_tiered_cache().invalidate_on_commit(GROUP_STATS_NAMESPACE)
+
+
+@receiver(post_save, sender=Users)
+def reindex_coach_search_on_user_change(sender, instance, update_fields=None, **kwargs):
+    """Names, username, email and photo are indexed; logins are not worth a reindex."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    from .services.coach_search import reindex_user_on_commit
+    reindex_user_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserOrganizations)
+def reindex_coach_search_on_membership_change(sender, instance, **kwargs):
+    """Only active coach memberships are indexed."""
+    if instance.user_id:
+        from .services.coach_search import reindex_user_on_commit
+        reindex_user_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Users.groups.through)
+def invalidate_coach_details_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Groups are part of the cached coach detail listing."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .services.coach_search import invalidate_user_organizations
+    for user_id in (pk_set or []) if reverse else [instance.pk]:
+        invalidate_user_organizations(user_id)
+
+
+@receiver(post_save, sender=CoachContent)
+@receiver(post_save, sender=AgentResponses)
+def index_content_search_document(sender, instance, update_fields=None, **kwargs):
+    """Keep the search document in the same transaction as its source."""
+    from .services.content_search import AGENT_RESPONSE, COACH_CONTENT, index_object
+    index_object(COACH_CONTENT if sender is CoachContent else AGENT_RESPONSE, instance, update_fields)
+
+
+@receiver(post_delete, sender=CoachContent)
+@receiver(post_delete, sender=AgentResponses)
+def remove_content_search_document(sender, instance, **kwargs):
+    """Documents have no foreign key to their source, so deletes are mirrored here."""
+    from .services.content_search import AGENT_RESPONSE, COACH_CONTENT, remove_object
+    remove_object(COACH_CONTENT if sender is CoachContent else AGENT_RESPONSE, instance.pk)
@@ -0,0 +1,31 @@
+from storages.backends.gcloud import GoogleCloudStorage
+
+from .services.request_metrics import external_call
+
+
+class InstrumentedStorageMixin:
+    """Counts bucket round trips as 'storage' time in the request metrics."""
+
+    def _open(self, name, mode='rb'):
+        with external_call('storage'):
+            return super()._open(name, mode)
+
+    def _save(self, name, content):
+        with external_call('storage'):
+            return super()._save(name, content)
+
+    def delete(self, name):
+        with external_call('storage'):
+            return super().delete(name)
+
+    def exists(self, name):
+        with external_call('storage'):
+            return super().exists(name)
+
+    def size(self, name):
+        with external_call('storage'):
+            return super().size(name)
+
+
+class InstrumentedGoogleCloudStorage(InstrumentedStorageMixin, GoogleCloudStorage):
+    pass
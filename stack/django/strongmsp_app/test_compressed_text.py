@@ -0,0 +1,179 @@
+"""
+Round-trip tests for CompressedTextField (utils/fields.py) and the
+compress_text_fields backfill command.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import models
+from django.db.models import Value
+from django.test import TestCase, override_settings
+
+from strongmsp_app.models import (
+    AgentResponses, Assessments, Organizations, PaymentAssignments, Payments, Products, Users
+)
+from utils.fields import COMPRESSED_PREFIX, compress_text, decompress_text, get_text_compression_settings
+
+THRESHOLD = get_text_compression_settings()['THRESHOLD']
+
+LONG_TEXT = 'The athlete reported steady focus under pressure during practice. ' * 100
+NON_ASCII_TEXT = 'Überzeugung, confiança y 集中力 — 💪🏽🔥 ' * 200
+
+
+def stored_values(queryset, names):
+    """Values as stored in the database, without the field's decompression."""
+    return queryset.annotate(**{
+        f'{name}_stored': models.ExpressionWrapper(models.F(name), output_field=models.TextField()) for name in names
+    }).values(*[f'{name}_stored' for name in names]).get()
+
+
+class CompressTextTests(TestCase):
+
+    def assertRoundTrip(self, value):
+        self.assertEqual(decompress_text(compress_text(value)), value)
+
+    def test_empty_and_none_are_stored_as_they_are(self):
+        self.assertEqual(compress_text(''), '')
+        self.assertIsNone(compress_text(None))
+        self.assertIsNone(decompress_text(None))
+
+    def test_values_below_threshold_stay_plain(self):
+        value = 'a' * (THRESHOLD - 1)
+        self.assertIs(compress_text(value), value)
+
+    def test_values_above_threshold_are_compressed(self):
+        stored = compress_text(LONG_TEXT)
+        self.assertTrue(stored.startswith(COMPRESSED_PREFIX))
+        self.assertLess(len(stored), len(LONG_TEXT))
+        self.assertRoundTrip(LONG_TEXT)
+
+    def test_threshold_argument_overrides_settings(self):
+        self.assertTrue(compress_text('b' * 100, threshold=50).startswith(COMPRESSED_PREFIX))
+        self.assertRoundTrip('b' * 100)
+
+    @override_settings(TEXT_COMPRESSION={'THRESHOLD': 10})
+    def test_threshold_setting(self):
+        self.assertTrue(compress_text('c' * 100).startswith(COMPRESSED_PREFIX))
+
+    def test_non_ascii_and_emoji(self):
+        self.assertTrue(compress_text(NON_ASCII_TEXT).startswith(COMPRESSED_PREFIX))
+        self.assertRoundTrip(NON_ASCII_TEXT)
+        self.assertRoundTrip('🏅 short emoji text')
+
+    def test_text_starting_with_prefix_is_always_compressed(self):
+        for value in [COMPRESSED_PREFIX, COMPRESSED_PREFIX + 'not really compressed', COMPRESSED_PREFIX + LONG_TEXT]:
+            stored = compress_text(value)
+            self.assertNotEqual(stored, value)
+            self.assertTrue(stored.startswith(COMPRESSED_PREFIX))
+            self.assertRoundTrip(value)
+
+
+class AgentResponsesTestCase(TestCase):
+    """An athlete with one assignment to attach AgentResponses to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.athlete = Users.objects.create(username='compressed-athlete', email='compressed-athlete@example.com')
+        organization = Organizations.objects.create(name='Compressed', slug='compressed', author=cls.athlete)
+        assessment = Assessments.objects.create(title='Pre', author=cls.athlete)
+        product = Products.objects.create(title='Product', price=10, pre_assessment=assessment, author=cls.athlete)
+        payment = Payments.objects.create(
+            product=product, paid=10, status='succeeded', organization=organization, author=cls.athlete
+        )
+        cls.assignment = PaymentAssignments.objects.create(payment=payment, athlete=cls.athlete, author=cls.athlete)
+
+    def create_response(self, **fields):
+        values = {'message_body': 'Prompt', 'ai_response': 'Response', 'ai_reasoning': None}
+        values.update(fields)
+        return AgentResponses.objects.create(
+            athlete=self.athlete, assignment=self.assignment, purpose='feedback_report', author=self.athlete, **values
+        )
+
+
+class CompressedTextFieldTests(AgentResponsesTestCase):
+
+    def test_save_and_load(self):
+        cases = ['', 'short', LONG_TEXT, NON_ASCII_TEXT, COMPRESSED_PREFIX + 'plain', 'd' * (THRESHOLD - 1)]
+        for value in cases:
+            with self.subTest(value=value[:20]):
+                response = self.create_response(ai_response=value, ai_reasoning=value)
+                response.refresh_from_db()
+                self.assertEqual(response.ai_response, value)
+                self.assertEqual(response.ai_reasoning, value)
+
+    def test_none(self):
+        response = self.create_response(ai_reasoning=None)
+        response.refresh_from_db()
+        self.assertIsNone(response.ai_reasoning)
+
+    def test_long_values_are_stored_compressed(self):
+        response = self.create_response(ai_response=LONG_TEXT, ai_reasoning='short')
+        stored = stored_values(AgentResponses.objects.filter(pk=response.pk), ['ai_response', 'ai_reasoning'])
+        self.assertTrue(stored['ai_response_stored'].startswith(COMPRESSED_PREFIX))
+        self.assertEqual(stored['ai_reasoning_stored'], 'short')
+
+    def test_values_and_values_list(self):
+        response = self.create_response(ai_response=LONG_TEXT, ai_reasoning=NON_ASCII_TEXT)
+        queryset = AgentResponses.objects.filter(pk=response.pk)
+        self.assertEqual(queryset.values('ai_response', 'ai_reasoning').get(), {
+            'ai_response': LONG_TEXT, 'ai_reasoning': NON_ASCII_TEXT,
+        })
+        self.assertEqual(queryset.values_list('ai_response', flat=True).get(), LONG_TEXT)
+
+    def test_rows_written_before_compression_stay_readable(self):
+        response = self.create_response()
+        AgentResponses.objects.filter(pk=response.pk).update(ai_response=Value(LONG_TEXT, output_field=models.TextField()))
+        response.refresh_from_db()
+        self.assertEqual(response.ai_response, LONG_TEXT)
+
+
+class CompressTextFieldsCommandTests(AgentResponsesTestCase):
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('compress_text_fields', '--model', 'strongmsp_app.AgentResponses', *args, stdout=out)
+        return out.getvalue()
+
+    def write_plain(self, **fields):
+        """A response whose values were stored before the columns were compressed."""
+        response = self.create_response()
+        AgentResponses.objects.filter(pk=response.pk).update(**{
+            name: Value(value, output_field=models.TextField()) for name, value in fields.items()
+        })
+        return response
+
+    def test_compress_and_decompress(self):
+        response = self.write_plain(ai_response=LONG_TEXT, ai_reasoning=NON_ASCII_TEXT)
+        short = self.write_plain(ai_response='short', ai_reasoning=None)
+        queryset = AgentResponses.objects.filter(pk=response.pk)
+
+        self.call()
+        stored = stored_values(queryset, ['ai_response', 'ai_reasoning'])
+        self.assertTrue(stored['ai_response_stored'].startswith(COMPRESSED_PREFIX))
+        self.assertTrue(stored['ai_reasoning_stored'].startswith(COMPRESSED_PREFIX))
+        self.assertEqual(queryset.values('ai_response', 'ai_reasoning').get(), {
+            'ai_response': LONG_TEXT, 'ai_reasoning': NON_ASCII_TEXT,
+        })
+        self.assertEqual(stored_values(AgentResponses.objects.filter(pk=short.pk), ['ai_response']), {
+            'ai_response_stored': 'short',
+        })
+
+        self.call('--decompress')
+        self.assertEqual(stored_values(queryset, ['ai_response', 'ai_reasoning']), {
+            'ai_response_stored': LONG_TEXT, 'ai_reasoning_stored': NON_ASCII_TEXT,
+        })
+        response.refresh_from_db()
+        self.assertEqual(response.ai_response, LONG_TEXT)
+        self.assertEqual(response.ai_reasoning, NON_ASCII_TEXT)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.write_plain(ai_response=LONG_TEXT)
+        output = self.call('--dry-run')
+        self.assertIn('Would change 1 values in 1 rows', output)
+        self.assertEqual(stored_values(AgentResponses.objects.filter(pk=response.pk), ['ai_response']), {
+            'ai_response_stored': LONG_TEXT,
+        })
+
+    def test_already_compressed_rows_are_skipped(self):
+        self.create_response(ai_response=LONG_TEXT)
+        self.assertIn('Changed 0 values in 0 rows', self.call())
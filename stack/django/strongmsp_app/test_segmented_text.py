@@ -0,0 +1,78 @@
+"""
+Tests for SegmentedTextField (utils/fields.py) on AgentResponses.message_body.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import models
+from django.db.models import Value
+from django.utils import timezone
+
+from strongmsp_app.models import AgentResponses, PromptSegments
+from strongmsp_app.test_compressed_text import AgentResponsesTestCase
+from utils.fields import split_segments, store_segments
+
+INSTRUCTIONS = 'You are a sports psychologist. Keep the tone warm and direct. ' * 10
+PROMPT = '\n\n'.join([INSTRUCTIONS, 'Assessment summary: confidence 3.2, focus 4.1. ' * 10, INSTRUCTIONS, 'Write the report.'])
+
+
+class SegmentedTextFieldTests(AgentResponsesTestCase):
+
+    def summary(self, response):
+        field = AgentResponses._meta.get_field('message_body')
+        return AgentResponses.objects.filter(pk=response.pk).annotate(
+            **field.summary_annotations('message_body', 200)
+        ).values('message_body_length', 'message_body_preview', 'message_body_segmented').get()
+
+    def test_save_and_load(self):
+        response = self.create_response(message_body=PROMPT)
+        self.assertTrue(response.message_segments)
+        self.assertEqual(response.message_length, len(PROMPT))
+        self.assertEqual(AgentResponses.objects.get(pk=response.pk).message_body, PROMPT)
+        # The repeated instructions are stored once
+        self.assertEqual(PromptSegments.objects.count(), len(set(response.message_segments)))
+
+    def test_summary_reports_length_of_segmented_rows(self):
+        response = self.create_response(message_body=PROMPT)
+        summary = self.summary(response)
+        self.assertTrue(summary['message_body_segmented'])
+        self.assertEqual(summary['message_body_length'], len(PROMPT))
+        self.assertTrue(PROMPT.startswith(summary['message_body_preview']))
+
+    def test_short_values_are_not_segmented(self):
+        response = self.create_response(message_body='Short prompt')
+        self.assertIsNone(response.message_segments)
+        self.assertIsNone(response.message_length)
+        summary = self.summary(response)
+        self.assertFalse(summary['message_body_segmented'])
+        self.assertEqual(summary['message_body_length'], len('Short prompt'))
+
+    def test_segment_text_fields_stores_length(self):
+        response = self.create_response()
+        AgentResponses.objects.filter(pk=response.pk).update(message_body=Value(PROMPT, output_field=models.TextField()))
+
+        call_command('segment_text_fields', stdout=StringIO())
+        response.refresh_from_db()
+        self.assertEqual(response.message_length, len(PROMPT))
+        self.assertEqual(self.summary(response)['message_body_length'], len(PROMPT))
+
+        call_command('segment_text_fields', '--join', stdout=StringIO())
+        response.refresh_from_db()
+        self.assertIsNone(response.message_segments)
+        self.assertIsNone(response.message_length)
+        self.assertEqual(response.message_body, PROMPT)
+
+    def test_prune_keeps_segments_reused_since_they_went_idle(self):
+        response = self.create_response(message_body=PROMPT)
+        response.delete()
+        two_hours_ago = timezone.now() - timedelta(hours=2)
+        PromptSegments.objects.update(created_at=two_hours_ago, last_used_at=two_hours_ago)
+
+        # A save in progress has stored its segments but not yet written its row
+        store_segments(PromptSegments, split_segments(PROMPT)[:2])
+        reused = set(PromptSegments.objects.filter(last_used_at__gt=two_hours_ago).values_list('pk', flat=True))
+        self.assertTrue(reused)
+
+        call_command('segment_text_fields', '--prune', stdout=StringIO())
+        self.assertEqual(set(PromptSegments.objects.values_list('pk', flat=True)), reused)
@@ -23,8 +23,11 @@ from .views import SharesViewSet
 from .views import NotificationsViewSet
 from .views import CurrentContextView
 from .views import CoachSearchView
+from .views import ContentSearchView
 from .views import AthleteAssignmentsListView
 from .views import UserProfileView
+from .views import event_stream
+from .views import RequestMetricsView
 ####OBJECT-ACTIONS-URL-IMPORTS-ENDS####
 urlpatterns = [path('', RenderFrontendIndex.as_view(), name='index')]
 
@@ -52,9 +55,12 @@ urlpatterns += [
         
     path('api/users/<int:user_id>/question-response-category-stats', QuestionResponseCategoryStatsView.as_view(), name='question-response-category-stats'),
     path('api/users/search-coaches', CoachSearchView.as_view(), name='coach-search'),
+    path('api/search/content', ContentSearchView.as_view(), name='content-search'),
     path('api/context/current', CurrentContextView.as_view(), name='current-context'),
     path('api/athlete-assignments', AthleteAssignmentsListView.as_view(), name='athlete-assignments-list'),
     path('api/account/profile', UserProfileView.as_view(), name='account-profile'),
+    path('api/events/stream', event_stream, name='event-stream'),
+    path('api/metrics/requests', RequestMetricsView.as_view(), name='request-metrics'),
     path('api/', include(OARouter.urls)),
 ]
 ####OBJECT-ACTIONS-URLS-ENDS####
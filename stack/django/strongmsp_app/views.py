@@ -10,6 +10,7 @@ from django.apps import apps
 from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.utils import timezone
+from django.utils.http import parse_etags
 from . import services
 import random
 import re
@@ -18,7 +19,7 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiRespon
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import Group
 from django.db.models import Q
-from django.db import models
+from django.db import models, transaction
 from .serializers import UsersSerializer
 from .serializers import UserProfileSerializer
 from .models import AssessmentQuestions, Users
@@ -47,7 +48,9 @@ from django.db.models import Count
 from .services.agent_orchestrator import AgentOrchestrator
 from urllib.parse import urlparse
 from .permissions import AgentResponsePermission, CoachContentPermission, PaymentAssignmentPermission
+from strongmsp_base.db import replica_reads
 from utils.helpers import get_subdomain_from_request
+from utils.exports import export_queryset, get_export_format, is_asgi_request
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from allauth.account.models import EmailAddress
@@ -64,7 +67,25 @@ class AutoAuthorViewSet(viewsets.ModelViewSet):
     """
     Base ViewSet that automatically sets the author field to the current user.
     All ViewSets should inherit from this to ensure consistent author assignment.
+
+    Actions in summary_actions leave the serializer's Meta.deferred_fields out
+    of the query and the response (length and preview only) unless they are
+    requested with ?fields=.
     """
+    summary_actions = ('list',)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['summary'] = self.action in self.summary_actions
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.action in self.summary_actions and hasattr(serializer_class, 'summarize_queryset'):
+            queryset = serializer_class.summarize_queryset(queryset, self.request)
+        return queryset
+
     def perform_create(self, serializer):
         # Only set author if the model has an author field
         if hasattr(serializer.Meta.model, 'author'):
@@ -108,31 +129,22 @@ class AssessmentsViewSet(AutoAuthorViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['title']
 
-    def retrieve(self, request, *args, **kwargs):
+    def get_queryset(self):
+        # retrieve() and next serve the cached definition, so skip the prefetch there
+        if self.action in ('retrieve', 'next_questions'):
+            return Assessments.objects.order_by('id')
+        return super().get_queryset()
+
+    def get_assignment(self, request, assessment_id):
         """
-        Override retrieve to validate user has access to this assessment
-        through a valid PaymentAssignment.
+        The PaymentAssignment that gives the user access to an assessment in the
+        request's organization, or None.
         """
-        from django.utils import timezone
-        from django.db.models import Q
-
-        # Get the assessment instance
-        assessment = self.get_object()
-        assessment_id = assessment.id
-
-        # Check if user is authenticated
-        if not request.user.is_authenticated:
-            return Response(
-                {'detail': 'Authentication required'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-
-        # Validate user has access through PaymentAssignment
         from utils.helpers import get_subdomain_from_request
         organization_slug = get_subdomain_from_request(request)
         now = timezone.now().date()
-        
-        assignment = PaymentAssignments.objects.filter(
+
+        return PaymentAssignments.objects.filter(
             Q(athlete=request.user) |
             Q(coaches=request.user) |
             Q(parents=request.user) |
@@ -146,18 +158,129 @@ class AssessmentsViewSet(AutoAuthorViewSet):
             Q(payment__subscription_ends__gte=now)
         ).select_related('athlete').first()
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Override retrieve to validate user has access to this assessment
+        through a valid PaymentAssignment.
+        """
+        # Get the assessment instance
+        assessment = self.get_object()
+        assessment_id = assessment.id
+
+        # Check if user is authenticated
+        if not request.user.is_authenticated:
+            return Response(
+                {'detail': 'Authentication required'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        # Validate user has access through PaymentAssignment
+        assignment = self.get_assignment(request, assessment_id)
+
         if not assignment:
             return Response(
                 {'detail': 'You do not have access to this assessment'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Serialize with athlete context for response inclusion
-        serializer = self.get_serializer(assessment, context={
-            'athlete_id': assignment.athlete.id,
-            'request': request
-        })
-        return Response(serializer.data)
+        # Cached definition with the athlete's responses merged on top
+        from .services.assessment_definitions import (
+            get_assessment_definition, get_athlete_responses, get_definition_etag,
+            get_definition_version, merge_responses
+        )
+        athlete_id = assignment.athlete.id if assignment.athlete else None
+        version = get_definition_version(assessment_id)
+        responses = get_athlete_responses(assessment_id, athlete_id)
+        etag = get_definition_etag(assessment_id, version, responses)
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            definition = get_assessment_definition(assessment, version)
+            response = Response(merge_responses(definition, responses))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=True, methods=['get', 'post'], url_path='next')
+    def next_questions(self, request, pk=None):
+        """
+        Next batch of questions the athlete still has to answer, evaluated against
+        the question conditions and the athlete's current answers.
+        GET /api/assessments/{id}/next?limit=5
+        POST /api/assessments/{id}/next?limit=5
+        Body: {"responses": [{"question": int, "response": int}, ...]}
+        POST saves the athlete's answers first, so each step is a single round trip.
+        """
+        from .services.assessment_conditions import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, get_compiled_assessment
+        from .services.assessment_definitions import get_athlete_responses, get_definition_version
+
+        assessment = self.get_object()
+        assignment = self.get_assignment(request, assessment.id)
+        if not assignment:
+            return Response(
+                {'detail': 'You do not have access to this assessment'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        athlete = assignment.athlete
+        if not athlete:
+            return Response(
+                {'error': 'No athlete found for this assignment'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_BATCH_SIZE)), 1), MAX_BATCH_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        version = get_definition_version(assessment.id)
+        compiled = get_compiled_assessment(assessment, version)
+
+        if request.method == 'POST':
+            if athlete.id != request.user.id:
+                return Response(
+                    {'detail': 'Only the athlete can answer this assessment'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            answers = {}
+            for item in request.data.get('responses') or []:
+                try:
+                    question_id = int(item['question'])
+                    answers[question_id] = int(item['response'])
+                except (KeyError, TypeError, ValueError):
+                    return Response(
+                        {'error': 'responses must be a list of {"question": int, "response": int}'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if question_id not in compiled.question_ids:
+                    return Response(
+                        {'error': f'Question {question_id} is not part of this assessment'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            existing = dict(
+                QuestionResponses.objects
+                .filter(author=athlete, assessment=assessment, question_id__in=answers)
+                .values_list('question_id', 'id')
+            )
+            # One transaction per batch: answers are saved together and cache invalidations coalesce
+            with transaction.atomic():
+                for question_id, response in answers.items():
+                    if question_id in existing:
+                        QuestionResponses.objects.filter(id=existing[question_id]).update(
+                            response=response, modified_at=timezone.now()
+                        )
+                    else:
+                        QuestionResponses.objects.create(
+                            author=athlete, assessment=assessment, question_id=question_id, response=response
+                        )
+
+        responses = get_athlete_responses(assessment.id, athlete.id)
+        batch = compiled.next_batch(responses, limit=limit)
+        batch['assessment_id'] = assessment.id
+        batch['version'] = version
+        return Response(batch)
 
     @action(detail=False, methods=['post'])
     def complete(self, request):
@@ -176,23 +299,7 @@ class AssessmentsViewSet(AutoAuthorViewSet):
                 )
 
             # Validate user has access to this assessment
-            from utils.helpers import get_subdomain_from_request
-            organization_slug = get_subdomain_from_request(request)
-            now = timezone.now().date()
-            
-            assignment = PaymentAssignments.objects.filter(
-                Q(athlete=request.user) |
-                Q(coaches=request.user) |
-                Q(parents=request.user) |
-                Q(payment__author=request.user),
-                payment__organization__slug=organization_slug,
-                payment__status='succeeded',
-                payment__product__is_active=True,
-                payment__product__pre_assessment_id=assessment_id
-            ).filter(
-                Q(payment__subscription_ends__isnull=True) |
-                Q(payment__subscription_ends__gte=now)
-            ).select_related('athlete').first()
+            assignment = self.get_assignment(request, assessment_id)
 
             if not assignment:
                 return Response(
@@ -227,22 +334,25 @@ class AssessmentsViewSet(AutoAuthorViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get the assessment to validate question count
             try:
                 assessment = Assessments.objects.get(id=assessment_id)
-                total_questions = assessment.questions.count()
             except Assessments.DoesNotExist:
                 return Response(
                     {'error': 'Assessment not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Validate all questions have been answered
-            answered_questions = QuestionResponses.objects.filter(assessment=assessment, author=athlete).count()
+            # Validate every question visible under the athlete's answers has been answered
+            from .services.assessment_conditions import get_compiled_assessment
+            from .services.assessment_definitions import get_athlete_responses
+            responses = get_athlete_responses(assessment.id, athlete.id)
+            progress = get_compiled_assessment(assessment).next_batch(responses, limit=0)
+            total_questions = progress['visible']
+            answered_questions = progress['answered']
 
             # Check if all questions are answered
-            if answered_questions < total_questions:
-                missing_count = total_questions - answered_questions
+            if not progress['complete']:
+                missing_count = progress['remaining']
                 return Response(
                     {'error': f'Assessment incomplete. {missing_count} questions still need to be answered.'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -423,6 +533,44 @@ class QuestionResponsesViewSet(AutoAuthorViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """
+        Stream question responses of the current organization's athletes.
+        GET /api/question-responses/export?assessment=<id>&output=csv|ndjson
+        """
+        export_format = get_export_format(request)
+        if export_format is None:
+            return Response({'error': 'output must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        organization_slug = get_subdomain_from_request(request)
+        athlete_ids = PaymentAssignments.objects.filter(
+            organization__slug=organization_slug,
+            athlete__isnull=False
+        ).values('athlete_id')
+        queryset = QuestionResponses.objects.filter(author_id__in=athlete_ids)
+
+        assessment_id = request.query_params.get('assessment')
+        if assessment_id:
+            if not assessment_id.isdigit():
+                return Response({'error': 'assessment must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(assessment_id=assessment_id)
+
+        return export_queryset(queryset, [
+            ('id', 'id'),
+            ('athlete_id', 'author_id'),
+            ('athlete_email', 'author__email'),
+            ('assessment_id', 'assessment_id'),
+            ('assessment', 'assessment__title'),
+            ('question_id', 'question_id'),
+            ('question', 'question__title'),
+            ('response', 'response'),
+            ('created_at', 'created_at'),
+            ('modified_at', 'modified_at'),
+        ], export_format, f"question-responses-{organization_slug}" + (f"-assessment-{assessment_id}" if assessment_id else ""),
+            asynchronous=is_asgi_request(request))
+
+
 
 
 
@@ -668,6 +816,45 @@ class AgentResponsesViewSet(AutoAuthorViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """
+        Stream the current organization's agent responses.
+        GET /api/agent-responses/export?purpose=<purpose>&athlete=<id>&output=csv|ndjson
+        """
+        export_format = get_export_format(request)
+        if export_format is None:
+            return Response({'error': 'output must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        organization_slug = get_subdomain_from_request(request)
+        queryset = AgentResponses.objects.filter(assignment__organization__slug=organization_slug)
+
+        purpose = request.query_params.get('purpose')
+        if purpose:
+            queryset = queryset.filter(purpose=purpose)
+        athlete_id = request.query_params.get('athlete')
+        if athlete_id:
+            if not athlete_id.isdigit():
+                return Response({'error': 'athlete must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(athlete_id=athlete_id)
+
+        return export_queryset(queryset, [
+            ('id', 'id'),
+            ('purpose', 'purpose'),
+            ('athlete_id', 'athlete_id'),
+            ('athlete_email', 'athlete__email'),
+            ('assignment_id', 'assignment_id'),
+            ('assessment_id', 'assessment_id'),
+            ('prompt_template_id', 'prompt_template_id'),
+            ('message_body', 'message_body'),
+            ('ai_response', 'ai_response'),
+            ('ai_reasoning', 'ai_reasoning'),
+            ('author_id', 'author_id'),
+            ('created_at', 'created_at'),
+            ('modified_at', 'modified_at'),
+        ], export_format, f"agent-responses-{organization_slug}", asynchronous=is_asgi_request(request))
+
+
 class CoachContentViewSet(AutoAuthorViewSet):
     serializer_class = CoachContentSerializer
     permission_classes = [CoachContentPermission]
@@ -1007,13 +1194,11 @@ class NotificationsViewSet(AutoAuthorViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update status to sent (in real implementation, this would trigger actual email)
-        from django.utils import timezone
-        notification.delivery_status = 'sent'
-        notification.sent_at = timezone.now()
-        notification.save()
+        # Delivered by the deliver_notifications worker
+        from .notification_service import send_notification
+        send_notification(notification.id)
 
-        return Response({'status': 'email sent'})
+        return Response({'status': 'email queued'}, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=['post'])
     def send_sms(self, request, pk=None):
@@ -1026,35 +1211,123 @@ class NotificationsViewSet(AutoAuthorViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update status to sent (in real implementation, this would trigger actual SMS)
-        from django.utils import timezone
-        notification.delivery_status = 'sent'
-        notification.sent_at = timezone.now()
-        notification.save()
+        # Delivered by the deliver_notifications worker
+        from .notification_service import send_notification
+        send_notification(notification.id)
 
-        return Response({'status': 'sms sent'})
+        return Response({'status': 'sms queued'}, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
-        """Get only dashboard notifications for the current user"""
-        queryset = self.get_queryset().filter(
-            channel='dashboard',
-            recipient=request.user
-        )
+        """
+        Get dashboard notifications for the current user.
+        GET /api/notifications/dashboard/?limit=50&offset=0
+        GET /api/notifications/dashboard/?since=<cursor>  # only rows created or modified after the cursor
+        """
+        from .notification_service import get_unread_count, get_dashboard_changes, parse_sync_cursor, encode_sync_cursor
+
+        since_param = request.query_params.get('since')
+        if since_param:
+            parsed = parse_sync_cursor(since_param)
+            if parsed is None:
+                return Response(
+                    {'error': 'since must be a cursor from a previous response or an ISO 8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            since, last_id = parsed
 
-        # Filter out expired notifications
-        from django.utils import timezone
+            try:
+                limit = int(request.query_params.get('limit', 50))
+            except (TypeError, ValueError):
+                return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            if limit < 1:
+                return Response({'error': 'limit must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+            limit = min(limit, 200)
+
+            rows, cursor, has_more = get_dashboard_changes(request.user, since, last_id=last_id, limit=limit)
+            serializer = self.get_serializer(rows, many=True)
+            return Response({
+                'results': serializer.data,
+                'cursor': cursor,
+                'has_more': has_more,
+                'unread_count': get_unread_count(request.user)
+            })
+
+        # Full (paginated) listing; the cursor lets the client switch to ?since= polling
         now = timezone.now()
-        queryset = queryset.filter(
+        queryset = self.get_queryset().filter(
+            channel='dashboard'
+        ).filter(
             models.Q(expires__isnull=True) | models.Q(expires__gt=now)
-        )
+        ).order_by('-created_at')
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return Response({
+            'count': self.paginator.count,
+            'limit': self.paginator.limit,
+            'offset': self.paginator.offset,
+            'results': serializer.data,
+            'cursor': encode_sync_cursor(now),
+            'unread_count': get_unread_count(request.user)
+        })
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """
+        Get the unread dashboard notification count for the current user.
+        GET /api/notifications/unread-count
+        """
+        from .notification_service import get_unread_count
+        return Response({'unread_count': get_unread_count(request.user)})
 
 
 ####OBJECT-ACTIONS-VIEWSETS-ENDS####
 
+async def event_stream(request):
+    """
+    Server-Sent Events stream of notification and agent response events for the
+    current user, scoped to the organization resolved from the request host.
+    GET /api/events/stream
+
+    Requires the ASGI application; under WSGI the response would be buffered
+    forever, so the view refuses with 501 instead.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import StreamingHttpResponse
+    from .services.event_stream import format_sse, get_event_backend, get_event_stream_settings
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Event stream requires the ASGI server'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    organization_slug = get_subdomain_from_request(request)
+    organization_id = await Organizations.objects.filter(slug=organization_slug).values_list('id', flat=True).afirst()
+    if organization_id is None:
+        return JsonResponse({'error': 'Organization not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    config = get_event_stream_settings()
+    keepalive = config['KEEPALIVE_SECONDS']
+
+    async def stream():
+        backend = get_event_backend()
+        subscription = backend.subscribe(user.id, organization_id)
+        try:
+            yield f"retry: {keepalive * 1000}\n: connected\n\n"
+            while True:
+                event = await subscription.get(timeout=keepalive)
+                yield format_sse(event) if event else ": keep-alive\n\n"
+        finally:
+            backend.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 class UserProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1100,6 +1373,7 @@ class UserStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = CustomLimitOffsetPagination
 
+    @replica_reads()
     def get(self, request, user_id, model_name):
         # Get the model class from the model name
         try:
@@ -1111,8 +1385,9 @@ class UserStatsView(APIView):
         if not hasattr(model, 'author'):
             return JsonResponse({'error': 'Model does not have an author field'}, status=400)
 
-        # Count the number of entities the user owns
-        count = model.objects.filter(author=user_id).count()
+        # Count the number of entities the user owns (all models in one cached query)
+        from .services.ownership_stats import get_user_counts
+        count = get_user_counts(user_id)[model.__name__]
 
         # Return the count as JSON
         return JsonResponse({'model': model_name, 'count': count})
@@ -1146,6 +1421,7 @@ class UserModelListView(generics.GenericAPIView):
     pagination_class = CustomLimitOffsetPagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
 
+    @replica_reads()
     def get(self, request, user_id, model_name):
         # Check if the model exists
         try:
@@ -1235,51 +1511,25 @@ class AvailableGroupsView(APIView):
 class GroupStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @replica_reads()
     def get(self, request):
         """
         Get statistics about groups and their members.
         """
+        from .services.ownership_stats import get_group_stats, get_groups_stats
         group_name = request.query_params.get('group')
 
         if group_name:
-            # Get stats for specific group
-            try:
-                group = Group.objects.get(name=group_name)
-                member_count = group.user_set.count()
-
-                # Get model counts for this group
-                model_counts = {}
-                for model_name in SEARCH_FIELDS_MAPPING.keys():
-                    try:
-                        model_class = apps.get_model("strongmsp_app", model_name)
-                        if hasattr(model_class, 'author'):
-                            count = model_class.objects.filter(author__groups=group).count()
-                            model_counts[model_name] = count
-                    except LookupError:
-                        continue
-
-                return JsonResponse({
-                    'group': {
-                        'id': group.id,
-                        'name': group.name,
-                        'member_count': member_count,
-                        'model_counts': model_counts
-                    }
-                })
-            except Group.DoesNotExist:
+            # Get stats for specific group, with model counts for this group
+            group = get_group_stats(group_name, SEARCH_FIELDS_MAPPING.keys())
+            if group is None:
                 return JsonResponse({
                     'error': f'Group "{group_name}" not found'
                 }, status=404)
+            return JsonResponse({'group': group})
         else:
             # Get stats for all groups
-            groups_data = []
-            for group in Group.objects.all():
-                member_count = group.user_set.count()
-                groups_data.append({
-                    'id': group.id,
-                    'name': group.name,
-                    'member_count': member_count
-                })
+            groups_data = get_groups_stats()
 
             return JsonResponse({
                 'groups': groups_data,
@@ -1293,6 +1543,7 @@ class GroupStatsView(APIView):
 class QuestionResponseCategoryStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @replica_reads()
     def get(self, request, user_id):
         """
         Get aggregated sum of response values in QuestionResponses for each question category by a given author.
@@ -1595,11 +1846,12 @@ class PaymentAssignmentsViewSet(AutoAuthorViewSet):
 class CoachSearchView(APIView):
     """
     Search for coaches by name or email within an organization.
-    Returns users with coach role that match the search term.
+    Returns users with coach role whose names, username or email start with the search words.
     """
     permission_classes = []  # Allow anonymous access for public About page and autocomplete
 
     def get(self, request):
+        from .services.coach_search import get_coach_details, matching_coach_ids, photo_url, search_coaches
         search_term = request.query_params.get('q', '').strip()
         detail_param = (request.query_params.get('detail', '') or '').strip().lower()
         include_detail = detail_param in ['1', 'true', 'yes', 'full']
@@ -1609,43 +1861,76 @@ class CoachSearchView(APIView):
         if not organization_slug:
             return Response({'results': []}, status=status.HTTP_200_OK)
 
-        # Base queryset: find Users who are marked coach in this organization
-        users_qs = Users.objects.filter(
-            user_organizations__is_coach=True,
-            user_organizations__organization__slug=organization_slug,
-            user_organizations__is_active=True,
-        ).distinct()
-
-        # Apply search term to both modes if provided
-        if search_term:
-            users_qs = users_qs.filter(
-                Q(username__icontains=search_term) |
-                Q(email__icontains=search_term) |
-                Q(first_name__icontains=search_term) |
-                Q(last_name__icontains=search_term)
-            )
-
         if include_detail:
-            # Full user objects (used by About page); do not hard-limit count
-            serializer = UsersSerializer(users_qs.order_by('last_name', 'first_name'), many=True, context={'request': request})
-            return Response({'results': serializer.data}, status=status.HTTP_200_OK)
+            # Full user objects (used by About page), cached per organization; do not hard-limit count
+            def load_details():
+                users_qs = Users.objects.filter(
+                    user_organizations__is_coach=True,
+                    user_organizations__organization__slug=organization_slug,
+                    user_organizations__is_active=True,
+                ).distinct().order_by('last_name', 'first_name').prefetch_related('groups', 'user_permissions')
+                return list(UsersSerializer(users_qs, many=True, context={'request': request}).data)
+
+            # Image URLs are absolute, so the listing is cached per host
+            coaches = get_coach_details(organization_slug, request.get_host(), load_details)
+            if search_term:
+                matching = matching_coach_ids(organization_slug, search_term)
+                coaches = [coach for coach in coaches if coach['id'] in matching]
+            return Response({'results': coaches}, status=status.HTTP_200_OK)
 
         # Default: RelEntity for autocomplete; if no search term, return empty to avoid flooding
         if not search_term:
             return Response({'results': []}, status=status.HTTP_200_OK)
 
-        slim = users_qs.order_by('last_name', 'first_name')[:20]
+        # Served from the coach search index, without loading Users rows
         results = []
-        for user in slim:
+        for coach in search_coaches(organization_slug, search_term):
             results.append({
-                'id': user.id,
-                'str': user.get_full_name() or user.username,
+                'id': coach['user_id'],
+                'str': coach['display'],
                 '_type': 'Users',
-                'img': user.photo.url if user.photo else None
+                'img': photo_url(coach['photo'])
             })
         return Response({'results': results}, status=status.HTTP_200_OK)
 
 
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='q', description='Search words; every word must match', required=True, type=str),
+        OpenApiParameter(name='type', description='coach_content or agent_response (default: both)', required=False, type=str),
+        OpenApiParameter(name='limit', description='Maximum number of results', required=False, type=int),
+        OpenApiParameter(name='offset', description='Number of results to skip', required=False, type=int),
+    ],
+    responses={200: 'Ranked coach content and agent responses with highlighted snippets'},
+)
+class ContentSearchView(APIView):
+    """
+    Full-text search over the coach content and agent responses the user can see
+    through /api/coach-content and /api/agent-responses.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @replica_reads()
+    def get(self, request):
+        from .services.content_search import SOURCES, search_documents
+        doc_type = request.query_params.get('type') or None
+        if doc_type and doc_type not in SOURCES:
+            return Response({'error': f"type must be one of {', '.join(SOURCES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit') or 0) or None
+            offset = int(request.query_params.get('offset') or 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if (limit is not None and limit < 1) or offset < 0:
+            return Response({'error': 'limit must be at least 1 and offset at least 0'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = search_documents(
+            request.user, get_subdomain_from_request(request), request.query_params.get('q', ''),
+            doc_type=doc_type, limit=limit, offset=offset,
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
+
 """
 Payment Assignments will always be from a distinct spread of Products to making merging them ok
 """
@@ -1662,11 +1947,15 @@ class CurrentContextView(APIView):
     def get(self, request):
         context_data = {}
 
-        # Extract subdomain and get organization (public data)
+        # Extract subdomain and get organization (public data, cached until an organization changes)
         subdomain = get_subdomain_from_request(request)
-        try:
-            org = Organizations.objects.get(slug=subdomain, is_active=True)
-            context_data['organization'] = {
+
+        def load_organization():
+            try:
+                org = Organizations.objects.get(slug=subdomain, is_active=True)
+            except Organizations.DoesNotExist:
+                return None  # WARN should never happen!
+            return {
                 'id': org.id,
                 'name': org.name,
                 'short_name': org.short_name,
@@ -1679,8 +1968,9 @@ class CurrentContextView(APIView):
                 'contact_email': org.contact_email,
                 'contact_phone': org.contact_phone
             }
-        except Organizations.DoesNotExist:
-            context_data['organization'] = None  # WARN should never happen!
+
+        from .services.tiered_cache import get_tiered_cache
+        context_data['organization'] = get_tiered_cache().get_or_set('organizations', subdomain, load_organization)
 
         # Get user's membership in this organization (user-specific)
         context_data['membership'] = None
@@ -1800,3 +2090,37 @@ class AthleteAssignmentsListView(APIView):
         response['Pragma'] = 'no-cache'
         response['Expires'] = '0'
         return response
+
+
+class RequestMetricsView(APIView):
+    """
+    Aggregated request metrics of this process (see services/request_metrics.py).
+    Staff only.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """
+        GET /api/metrics/requests
+        Per view: request count, latency percentiles, DB queries and time,
+        duplicate queries with their fingerprints and external call time.
+        Also includes the tiered cache hit rates per namespace and the
+        database connection churn and pool counters.
+        """
+        from .services.request_metrics import get_aggregator, get_request_metrics_settings
+        from .services.tiered_cache import get_cache_stats
+        from strongmsp_base.db import get_connection_stats
+        config = get_request_metrics_settings()
+        data = get_aggregator().snapshot()
+        data['enabled'] = config['ENABLED']
+        data['sample_rate'] = config['SAMPLE_RATE']
+        data['cache'] = get_cache_stats()
+        data['db_connections'] = get_connection_stats()
+        return Response(data)
+
+    def delete(self, request):
+        """DELETE /api/metrics/requests resets the aggregates."""
+        from .services.request_metrics import get_aggregator
+        get_aggregator().reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
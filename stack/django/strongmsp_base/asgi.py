@@ -2,6 +2,9 @@
 ASGI config for strongmsp_base project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving through ASGI (DJANGO_ASGI=True in entrypoint.sh) enables the
+Server-Sent Events push channel at /api/events/stream; the REST API is served
+the same way as under WSGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -0,0 +1,35 @@
+"""
+Database helpers: connection cleanup for threads that run outside the
+request cycle, the connection churn counters of strongmsp_base.db.pool and
+read-replica routing (strongmsp_base.db.routers).
+"""
+import functools
+from contextlib import contextmanager
+
+from django.db import connections
+
+from .pool import get_connection_stats
+from .routers import read_alias, replica_reads
+
+
+@contextmanager
+def closing_connections():
+    """
+    Close the current thread's database connections when the block ends.
+    Use it in background threads: Django only cleans up connections of
+    request threads, anything else keeps its connection until it is
+    garbage collected.
+    """
+    try:
+        yield
+    finally:
+        connections.close_all()
+
+
+def with_closed_connections(func):
+    """Decorator form of closing_connections() for thread targets."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with closing_connections():
+            return func(*args, **kwargs)
+    return wrapper
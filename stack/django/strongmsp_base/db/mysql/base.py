@@ -0,0 +1,17 @@
+"""
+MySQL backend with connection churn counters and an optional per-process
+pool (DATABASES[alias]['POOL'], see strongmsp_base.db.pool).
+"""
+from django.db.backends.mysql import base
+
+from ..pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+
+    def ping_raw_connection(self, raw):
+        try:
+            raw.ping()
+            return True
+        except self.Database.Error:
+            return False
@@ -0,0 +1,267 @@
+"""
+Connection management for the database backends in this package.
+
+Every backend built on PooledConnectionMixin counts physical connects and
+closes per alias, so connection churn shows up in GET /api/metrics/requests.
+With DATABASES[alias]['POOL']['ENABLED'] closed connections go back to a
+process-wide pool instead of being dropped, and at most MAX_CONNECTIONS are
+checked out at once per process; further threads wait up to TIMEOUT seconds.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    'ENABLED': False,
+    # Connections checked out at once, per process and alias
+    'MAX_CONNECTIONS': 12,
+    # Seconds a thread waits for a free connection before failing
+    'TIMEOUT': 10,
+    # Idle connections are closed after this many seconds
+    'IDLE_TIMEOUT': 300,
+    # Connections are replaced after this many seconds (stay under the server's wait_timeout)
+    'MAX_LIFETIME': 1800,
+    # Ping a pooled connection before reuse when it has been idle this long
+    'CHECK_AFTER_IDLE': 10,
+}
+
+STAT_FIELDS = (
+    'opened', 'closed', 'reused', 'returned', 'discarded', 'health_check_failures',
+    'waits', 'wait_ms', 'timeouts', 'orphans',
+)
+
+
+class ConnectionPool:
+    """Idle raw connections and checkout accounting for one alias in this process."""
+
+    def __init__(self, alias, config):
+        self.alias = alias
+        self.config = config
+        self.enabled = config['ENABLED']
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(config['MAX_CONNECTIONS']) if self.enabled else None
+        # (raw connection, created_at, returned_at)
+        self.idle = deque()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.stats = dict.fromkeys(STAT_FIELDS, 0)
+
+    def incr(self, field, amount=1):
+        with self.lock:
+            self.stats[field] += amount
+
+    def acquire_slot(self):
+        if self.slots is None:
+            return True
+        if self.slots.acquire(blocking=False):
+            return True
+        started = time.monotonic()
+        acquired = self.slots.acquire(timeout=self.config['TIMEOUT'])
+        with self.lock:
+            self.stats['waits'] += 1
+            self.stats['wait_ms'] += round((time.monotonic() - started) * 1000)
+            if not acquired:
+                self.stats['timeouts'] += 1
+        return acquired
+
+    def release_slot(self):
+        if self.slots is not None:
+            self.slots.release()
+
+    def checked_out(self):
+        with self.lock:
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self):
+        with self.lock:
+            self.in_use -= 1
+
+    def take_idle(self):
+        """Most recently returned idle connection that is still young enough, or None."""
+        now = time.monotonic()
+        expired = []
+        found = None
+        with self.lock:
+            while self.idle:
+                raw, created_at, returned_at = self.idle.pop()
+                if now - created_at > self.config['MAX_LIFETIME'] or now - returned_at > self.config['IDLE_TIMEOUT']:
+                    expired.append(raw)
+                    continue
+                found = (raw, created_at, returned_at)
+                break
+        for raw in expired:
+            self.discard(raw)
+        return found
+
+    def give_back(self, raw, created_at):
+        now = time.monotonic()
+        if now - created_at > self.config['MAX_LIFETIME']:
+            self.discard(raw)
+            return
+        with self.lock:
+            if len(self.idle) < self.config['MAX_CONNECTIONS']:
+                self.idle.append((raw, created_at, now))
+                self.stats['returned'] += 1
+                return
+        self.discard(raw)
+
+    def discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.stats['discarded'] += 1
+            self.stats['closed'] += 1
+
+    def close_idle(self):
+        with self.lock:
+            idle, self.idle = list(self.idle), deque()
+        for raw, _, _ in idle:
+            self.discard(raw)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(
+                self.stats,
+                pooled=self.enabled,
+                max_connections=self.config['MAX_CONNECTIONS'] if self.enabled else None,
+                in_use=self.in_use,
+                peak_in_use=self.peak_in_use,
+                idle=len(self.idle),
+            )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            config = DEFAULT_POOL_SETTINGS.copy()
+            config.update(settings_dict.get('POOL') or {})
+            pool = _pools[alias] = ConnectionPool(alias, config)
+        return pool
+
+
+def get_connection_stats():
+    """Churn and pool counters per database alias of this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.alias: pool.snapshot() for pool in pools}
+
+
+def _release_orphan(pool, raw):
+    """A wrapper was garbage collected (its thread ended) without closing its connection."""
+    try:
+        raw.close()
+    except Exception:
+        pass
+    pool.incr('orphans')
+    pool.incr('closed')
+    pool.checked_in()
+    pool.release_slot()
+
+
+class PooledConnectionMixin:
+    """
+    Mix into a backend's DatabaseWrapper. Subclasses may override
+    ping_raw_connection() with a cheaper check than SELECT 1.
+    """
+
+    pool_entry = None
+    pool_reused = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def ping_raw_connection(self, raw):
+        try:
+            cursor = raw.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if not pool.acquire_slot():
+            raise self.Database.OperationalError(
+                f"No free database connection for '{self.alias}' after {pool.config['TIMEOUT']}s "
+                f"({pool.config['MAX_CONNECTIONS']} in use by this process)"
+            )
+        try:
+            raw, created_at = None, None
+            self.pool_reused = False
+            if pool.enabled:
+                while raw is None:
+                    entry = pool.take_idle()
+                    if entry is None:
+                        break
+                    candidate, candidate_created, returned_at = entry
+                    if time.monotonic() - returned_at >= pool.config['CHECK_AFTER_IDLE'] and not self.ping_raw_connection(candidate):
+                        pool.incr('health_check_failures')
+                        pool.discard(candidate)
+                        continue
+                    raw, created_at = candidate, candidate_created
+                    self.pool_reused = True
+                    pool.incr('reused')
+            if raw is None:
+                raw = super().get_new_connection(conn_params)
+                created_at = time.monotonic()
+                pool.incr('opened')
+        except BaseException:
+            pool.release_slot()
+            raise
+
+        pool.checked_out()
+        self.pool_entry = (created_at, weakref.finalize(self, _release_orphan, pool, raw))
+        return raw
+
+    def init_connection_state(self):
+        # A reused connection keeps its session settings
+        if not self.pool_reused:
+            super().init_connection_state()
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            self.pool.incr('health_check_failures')
+        return usable
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.pool
+        raw = self.connection
+        created_at, finalizer = self.pool_entry or (time.monotonic(), None)
+        if finalizer is not None:
+            finalizer.detach()
+        self.pool_entry = None
+
+        reusable = (
+            pool.enabled
+            and not self.in_atomic_block
+            and not self.errors_occurred
+            and self.get_autocommit() == self.settings_dict['AUTOCOMMIT']
+        )
+        try:
+            if reusable:
+                pool.give_back(raw, created_at)
+                return None
+            pool.incr('closed')
+            return super()._close()
+        finally:
+            pool.checked_in()
+            pool.release_slot()
@@ -0,0 +1,133 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless the code doing them is marked with
+replica_reads() and a replica alias is configured (settings.DATABASE_REPLICA).
+Inside a marked block reads still go to the primary when:
+
+- the current request or block has written anything, or is not a GET/HEAD,
+- the client wrote within the last STICKY_SECONDS (a short-lived cookie set
+  by ReplicaStickinessMiddleware), so users always read their own writes,
+- a transaction is open on the primary.
+
+Writes always go to the primary.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_REPLICA_SETTINGS = {
+    'ALIAS': 'replica',
+    # After a write the client reads from the primary for this long (cover the replication lag)
+    'STICKY_SECONDS': 10,
+    'COOKIE_NAME': 'db_primary_pin',
+}
+
+_use_replica = contextvars.ContextVar('db_use_replica', default=False)
+_pin = contextvars.ContextVar('db_primary_pin', default=None)
+
+
+def get_replica_settings():
+    """Merge DATABASE_REPLICA from settings over the defaults."""
+    config = DEFAULT_REPLICA_SETTINGS.copy()
+    config.update(getattr(settings, 'DATABASE_REPLICA', {}) or {})
+    return config
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = get_replica_settings()['ALIAS']
+    return alias if alias in settings.DATABASES else None
+
+
+class PrimaryPin:
+    """Whether the current request (or replica_reads block) has to read from the primary."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+    @property
+    def active(self):
+        return self.pinned or self.wrote
+
+
+def read_alias():
+    """
+    Database alias for a read at this point. Use it for raw SQL:
+
+        with connections[read_alias()].cursor() as cursor:
+            ...
+    """
+    if not _use_replica.get():
+        return DEFAULT_DB_ALIAS
+    alias = replica_alias()
+    if alias is None:
+        return DEFAULT_DB_ALIAS
+    pin = _pin.get()
+    if pin is not None and pin.active:
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def mark_write():
+    pin = _pin.get()
+    if pin is not None:
+        pin.wrote = True
+
+
+@contextmanager
+def replica_reads():
+    """
+    Allow reads in this block (or decorated function) to go to the replica.
+    Only mark read-only workloads that tolerate a few seconds of lag.
+
+        @replica_reads()
+        def get(self, request):
+            ...
+    """
+    use_token = _use_replica.set(True)
+    # Outside a request a write in the block still pins the rest of the block
+    pin_token = _pin.set(PrimaryPin()) if _pin.get() is None else None
+    try:
+        yield
+    finally:
+        if pin_token is not None:
+            _pin.reset(pin_token)
+        _use_replica.reset(use_token)
+
+
+@contextmanager
+def primary_pin(pinned=False):
+    """Routing state of one request, see ReplicaStickinessMiddleware."""
+    pin = PrimaryPin(pinned)
+    token = _pin.set(pin)
+    try:
+        yield pin
+    finally:
+        _pin.reset(token)
+
+
+class ReplicaRouter:
+    """settings.DATABASE_ROUTERS entry for replica_reads()."""
+
+    def db_for_read(self, model, **hints):
+        # Explicit, so objects read from the replica do not drag later reads along
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_replica_settings()['ALIAS']:
+            return False
+        return None
@@ -1,5 +1,6 @@
 from .allauth import *
 from .base import *
+from .cache import *
 from .database import *
 from .email import *
 from .security import *
@@ -28,6 +28,7 @@ ACCOUNT_LOGIN_METHODS = {'email'}
 ACCOUNT_SIGNUP_FIELDS = ["email*", "password1*", "password2*"]
 
 OPENAI_API_KEY = myEnv('OPENAI_API_KEY', 'NoKeySet')
+OPENAI_BASE_URL = myEnv('OPENAI_BASE_URL', None)  # e.g. a local fake Assistants server; None uses api.openai.com
 
 if DJANGO_ENV != 'production':
     EMAIL_USE_SSL = False  # True if using SSL
@@ -124,6 +124,8 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 MIDDLEWARE = [
+    'strongmsp_app.middleware.RequestMetricsMiddleware',
+    'strongmsp_app.middleware.ReplicaStickinessMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -194,6 +196,26 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'strongmsp_base.wsgi.application'
+ASGI_APPLICATION = 'strongmsp_base.asgi.application'
+
+# Server-pushed events (GET /api/events/stream); needs the ASGI server
+# DatabaseEventBackend relays events between the uvicorn workers and the notification worker;
+# InMemoryEventBackend only reaches streams in the publishing process (single-process setups, tests)
+EVENT_STREAM = {
+    'BACKEND': myEnv("EVENT_STREAM_BACKEND", 'strongmsp_app.services.event_stream.DatabaseEventBackend'),
+    'KEEPALIVE_SECONDS': int(myEnv("EVENT_STREAM_KEEPALIVE_SECONDS", 15)),
+    'QUEUE_SIZE': int(myEnv("EVENT_STREAM_QUEUE_SIZE", 100)),
+    'POLL_SECONDS': float(myEnv("EVENT_STREAM_POLL_SECONDS", 1.0)),
+    'LOOKBACK_SECONDS': int(myEnv("EVENT_STREAM_LOOKBACK_SECONDS", 30)),
+    'RETENTION_SECONDS': int(myEnv("EVENT_STREAM_RETENTION_SECONDS", 300)),
+}
+
+# Sampled per-request query/latency instrumentation (GET /api/metrics/requests)
+REQUEST_METRICS = {
+    'ENABLED': myEnv("REQUEST_METRICS_ENABLED", 'False') == 'True',
+    'SAMPLE_RATE': float(myEnv("REQUEST_METRICS_SAMPLE_RATE", 0.1)),
+    'SLOW_REQUEST_MS': int(myEnv("REQUEST_METRICS_SLOW_MS", 1000)),
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -0,0 +1,46 @@
+from .base import myEnv, logger
+
+# Shared cache tier. options are: database | redis | file | locmem
+# database needs `python manage.py createcachetable` (run by entrypoint.sh)
+OA_ENV_CACHE = myEnv("OA_ENV_CACHE", "database")
+logger.debug(f"[OADJANGO] CACHE USING: {OA_ENV_CACHE} ")
+
+if OA_ENV_CACHE == 'redis':
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": myEnv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif OA_ENV_CACHE == 'file':
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": myEnv("CACHE_FILE_PATH", "/tmp/strongmsp-cache"),
+        }
+    }
+elif OA_ENV_CACHE == 'locmem':
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "strongmsp_cache",
+        }
+    }
+
+CACHES["default"]["KEY_PREFIX"] = myEnv("CACHE_KEY_PREFIX", "strongmsp")
+CACHES["default"]["TIMEOUT"] = int(myEnv("CACHE_TIMEOUT", 300))
+if OA_ENV_CACHE != 'redis':
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(myEnv("CACHE_MAX_ENTRIES", 50000))}
+
+# In-process LRU in front of CACHES['default'] (strongmsp_app/services/tiered_cache.py)
+TIERED_CACHE = {
+    'LOCAL_MAX_ENTRIES': int(myEnv("TIERED_CACHE_LOCAL_MAX_ENTRIES", 1000)),
+    'LOCAL_TIMEOUT': int(myEnv("TIERED_CACHE_LOCAL_TIMEOUT", 30)),
+    'GENERATION_TTL': int(myEnv("TIERED_CACHE_GENERATION_TTL", 5)),
+}
@@ -1,3 +1,4 @@
+import copy
 import os
 
 from .base import myEnv, logger, DJANGO_ENV
@@ -12,7 +13,8 @@ AUTH_USER_MODEL = "strongmsp_app.Users"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        # django.db.backends.mysql plus connection churn counters and an optional pool
+        "ENGINE": "strongmsp_base.db.mysql",
         "NAME": os.getenv("MYSQL_DATABASE", "localdb"),
         "USER": os.getenv("MYSQL_USER", "localuser"),
         "PASSWORD": os.getenv("MYSQL_PASSWORD", "localpassword"),
@@ -25,6 +27,23 @@ DATABASES = {
     }
 }
 
+# Connection reuse. Persistent mode (default) keeps one connection per thread for DB_CONN_MAX_AGE seconds
+# and pings it before reuse. Pooled mode (DB_POOL=True) hands connections back to a per-process pool after
+# every request, with at most DB_POOL_MAX_CONNECTIONS checked out at once (gunicorn threads + agent threads).
+# Under ASGI (DJANGO_ASGI=True) sync code runs on short-lived executor threads, so persistent connections would
+# stay open until garbage collection; Django's docs say to disable them there, so only the pool reuses connections.
+DB_POOL = myEnv("DB_POOL", "False") == "True"
+DJANGO_ASGI = myEnv("DJANGO_ASGI", "False") == "True"
+DATABASES["default"]["CONN_MAX_AGE"] = 0 if DB_POOL or DJANGO_ASGI else int(myEnv("DB_CONN_MAX_AGE", 60))
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+DATABASES["default"]["POOL"] = {
+    'ENABLED': DB_POOL,
+    'MAX_CONNECTIONS': int(myEnv("DB_POOL_MAX_CONNECTIONS", 12)),
+    'TIMEOUT': int(myEnv("DB_POOL_TIMEOUT", 10)),
+    'IDLE_TIMEOUT': int(myEnv("DB_POOL_IDLE_TIMEOUT", 300)),
+    'MAX_LIFETIME': int(myEnv("DB_POOL_MAX_LIFETIME", 1800)),
+}
+
 if DJANGO_ENV != 'production':
     # let's keep an eye on these data type issues on dev, but be more forgiving on production for now.
     DATABASES["default"]["OPTIONS"]["init_command"] = "SET sql_mode='STRICT_TRANS_TABLES'"
@@ -44,4 +63,28 @@ elif OA_ENV_DB == 'gcp':
     else:
         DATABASES["default"]["HOST"] = "127.0.0.1" # when running mysql with proxy to Cloud SQL
 
+# Optional read replica. Only code marked with strongmsp_base.db.replica_reads() reads from it, and a client
+# reads from the primary for DB_REPLICA_STICKY_SECONDS after its own writes. For a local setup point
+# DB_REPLICA_NAME at a second database on the same server (a copy of the primary).
+DB_REPLICA_HOST = myEnv("DB_REPLICA_HOST", "")
+DB_REPLICA_NAME = myEnv("DB_REPLICA_NAME", "")
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES["replica"] = copy.deepcopy(DATABASES["default"])
+    DATABASES["replica"].update({
+        "HOST": DB_REPLICA_HOST or DATABASES["default"]["HOST"],
+        "PORT": int(myEnv("DB_REPLICA_PORT", DATABASES["default"]["PORT"])),
+        "NAME": DB_REPLICA_NAME or DATABASES["default"]["NAME"],
+        "USER": myEnv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": myEnv("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        # Test runs read the replica through the primary's connection settings
+        "TEST": {"MIRROR": "default"},
+    })
+    logger.debug(f"[OADJANGO] DB replica {DATABASES['replica']['NAME']} on {DATABASES['replica']['HOST']}")
+
+DATABASE_ROUTERS = ["strongmsp_base.db.routers.ReplicaRouter"]
+DATABASE_REPLICA = {
+    'ALIAS': 'replica',
+    'STICKY_SECONDS': int(myEnv("DB_REPLICA_STICKY_SECONDS", 10)),
+}
+
 logger.debug(f"[OADJANGO] DB Connecting with {DATABASES['default']['NAME']} and {DATABASES['default']['USER']} to {DATABASES['default']['HOST']}" )
@@ -40,6 +40,35 @@ TWILIO_AUTH_TOKEN = myEnv("TWILIO_AUTH_TOKEN", "")
 TWILIO_VERIFY_SERVICE_SID = myEnv("TWILIO_VERIFY_SERVICE_SID", "")
 TWILIO_PHONE_NUMBER = myEnv("TWILIO_PHONE_NUMBER", "")
 
+# outbound notification worker (manage.py deliver_notifications)
+# SMS backends: TwilioSmsBackend | ConsoleSmsBackend | LocmemSmsBackend (fake sink for local testing)
+NOTIFICATION_DELIVERY = {
+    'BATCH_SIZE': int(myEnv("NOTIFICATION_BATCH_SIZE", 50)),
+    'MAX_ATTEMPTS': int(myEnv("NOTIFICATION_MAX_ATTEMPTS", 5)),
+    'RETRY_BACKOFF_SECONDS': int(myEnv("NOTIFICATION_RETRY_BACKOFF_SECONDS", 60)),
+    'CLAIM_LEASE_SECONDS': int(myEnv("NOTIFICATION_CLAIM_LEASE_SECONDS", 300)),
+    'EMAIL_RATE_PER_SECOND': float(myEnv("NOTIFICATION_EMAIL_RATE", 10)),
+    'SMS_RATE_PER_SECOND': float(myEnv("NOTIFICATION_SMS_RATE", 1)),
+    'SMS_BACKEND': 'strongmsp_app.services.notification_delivery.' + myEnv("NOTIFICATION_SMS_BACKEND", "TwilioSmsBackend"),
+}
+
+# notification retention (manage.py prune_notifications); day counts of None keep rows forever
+# TYPES overrides DEFAULT per notification_type, e.g. {'invoice': {'DELIVERED_DAYS': 730}}
+NOTIFICATION_RETENTION = {
+    'BATCH_SIZE': int(myEnv("NOTIFICATION_RETENTION_BATCH_SIZE", 1000)),
+    'DEFAULT': {
+        'EXPIRED_GRACE_DAYS': int(myEnv("NOTIFICATION_EXPIRED_GRACE_DAYS", 7)),
+        'SEEN_DAYS': int(myEnv("NOTIFICATION_SEEN_DAYS", 90)),
+        'UNSEEN_DAYS': None,
+        'DELIVERED_DAYS': int(myEnv("NOTIFICATION_DELIVERED_DAYS", 180)),
+        'COMPACT_AFTER_DAYS': int(myEnv("NOTIFICATION_COMPACT_AFTER_DAYS", 14)),
+    },
+    'TYPES': {
+        'payment': {'DELIVERED_DAYS': 365},
+        'invoice': {'DELIVERED_DAYS': 365},
+    },
+}
+
 
 # in docker it's created at ~/.ssl/certificate.crt
 if DEBUG:
@@ -56,14 +56,14 @@ if OA_ENV_STORAGE == 'gcp':
     # Static and Media Settings
     STORAGES = {
         "default": {  # Media files
-            "BACKEND": "storages.backends.gcloud.GoogleCloudStorage",
+            "BACKEND": "strongmsp_app.storage.InstrumentedGoogleCloudStorage",
             "OPTIONS": {
                 "bucket_name": GS_BUCKET_NAME,
                 "location": MEDIAFILES_LOCATION
             },
         },
         "staticfiles": {  # Static files
-            "BACKEND": "storages.backends.gcloud.GoogleCloudStorage",
+            "BACKEND": "strongmsp_app.storage.InstrumentedGoogleCloudStorage",
             "OPTIONS": {
                 "bucket_name": GS_BUCKET_NAME,
                 "location": STATICFILES_LOCATION
@@ -0,0 +1,160 @@
+import csv
+import itertools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from utils.fields import SegmentedTextDescriptor, segmented_values
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# ?output=ndjson ("format" is taken by DRF's renderer negotiation)
+EXPORT_FORMAT_PARAM = 'output'
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def get_export_format(request, default='csv'):
+    """
+    Read the export format from the query string.
+
+    Returns:
+        'csv' or 'ndjson', or None if the requested format is not supported
+    """
+    export_format = (request.GET.get(EXPORT_FORMAT_PARAM) or default).lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+
+def is_asgi_request(request):
+    """True if the (DRF or Django) request is served by the ASGI handler."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def iterate_in_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield value tuples for `fields` in primary-key order, one chunk per query.
+
+    Keyset pagination keeps memory constant on every backend; MySQL drivers
+    buffer the full result set even for QuerySet.iterator().
+    """
+    for rows in iterate_chunks(queryset, fields, chunk_size):
+        yield from rows
+
+
+def iterate_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Lists of value tuples for `fields` in primary-key order, one per query (see iterate_in_chunks)."""
+    pk_name = queryset.model._meta.pk.name
+    last_pk = None
+    while True:
+        chunk = queryset.order_by(pk_name)
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list(pk_name, *fields)[:chunk_size])
+        if not rows:
+            return
+        yield [row[1:] for row in rows]
+        last_pk = rows[-1][0]
+        if len(rows) < chunk_size:
+            return
+
+
+def iterate_segmented_in_chunks(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    iterate_in_chunks for fields that may include SegmentedTextFields, whose
+    segmented values are reassembled with one query per chunk.
+    """
+    model = queryset.model
+    segmented = [
+        name for name in fields
+        if isinstance(getattr(model, name, None), SegmentedTextDescriptor)
+    ]
+    if not segmented:
+        yield from iterate_in_chunks(queryset, fields, chunk_size)
+        return
+    extra = [model._meta.get_field(name).segments_field for name in segmented]
+    for rows in iterate_chunks(queryset, [*fields, *extra], chunk_size):
+        values = segmented_values([dict(zip([*fields, *extra], row)) for row in rows], model, segmented)
+        for row in values:
+            yield tuple(row[name] for name in fields)
+
+
+def encode_rows(rows, headers, export_format):
+    """Encode an iterable of row tuples as CSV lines or NDJSON objects, lazily."""
+    if export_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+        return
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def iterate_in_thread(iterator, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Consume a sync iterator from async code, chunk_size items per trip to the
+    sync thread, yielding each chunk joined into one string.
+
+    Under ASGI, StreamingHttpResponse reads a sync iterator to the end before
+    sending anything, so exports would be held in memory in full.
+    thread_sensitive keeps every chunk on the same thread and DB connection.
+    """
+    iterator = iter(iterator)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(iterator, chunk_size)), thread_sensitive=True)
+    while True:
+        chunk = await next_chunk()
+        if not chunk:
+            return
+        yield ''.join(chunk)
+
+
+def streaming_export(rows, headers, export_format, filename, asynchronous=False):
+    """
+    Build a StreamingHttpResponse that encodes rows as they are produced.
+
+    Args:
+        rows: Iterable of row tuples in `headers` order
+        headers: Column names (CSV header / NDJSON keys)
+        export_format: 'csv' or 'ndjson'
+        filename: Download name without extension
+        asynchronous: Stream through an async iterator; required under ASGI
+    """
+    content_type, extension = EXPORT_FORMATS[export_format]
+    content = encode_rows(rows, headers, export_format)
+    if asynchronous:
+        content = iterate_in_thread(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_queryset(queryset, columns, export_format, filename, chunk_size=EXPORT_CHUNK_SIZE, asynchronous=False):
+    """
+    Stream a queryset as CSV or NDJSON.
+
+    Args:
+        queryset: Rows to export; ordering is replaced by primary key
+        columns: List of (header, field lookup) pairs
+        export_format: 'csv' or 'ndjson'
+        filename: Download name without extension
+        asynchronous: Stream through an async iterator; pass is_asgi_request(request)
+    """
+    headers = [header for header, _ in columns]
+    fields = [field for _, field in columns]
+    rows = iterate_segmented_in_chunks(queryset, fields, chunk_size)
+    return streaming_export(rows, headers, export_format, filename, asynchronous=asynchronous)
@@ -0,0 +1,314 @@
+import base64
+import hashlib
+import re
+import zlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Length, Substr
+from django.db.models.query_utils import DeferredAttribute
+from django.utils import timezone
+
+DEFAULT_TEXT_COMPRESSION_SETTINGS = {
+    # Values shorter than this many characters are stored as plain text
+    'THRESHOLD': 2048,
+    'LEVEL': 6,
+}
+
+# Marks a compressed value; plain text never starts with a unit separator, and
+# values that do are always compressed so reading them back is unambiguous
+COMPRESSED_PREFIX = '\x1fz1:'
+
+
+def get_text_compression_settings():
+    """Merge TEXT_COMPRESSION from settings over the defaults."""
+    config = DEFAULT_TEXT_COMPRESSION_SETTINGS.copy()
+    config.update(getattr(settings, 'TEXT_COMPRESSION', {}) or {})
+    return config
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(COMPRESSED_PREFIX)
+
+
+def compress_text(value, threshold=None, level=None):
+    """
+    Stored form of a text value: zlib-compressed and base85-encoded behind
+    COMPRESSED_PREFIX when it is at least `threshold` characters long and
+    compression makes it shorter, the value itself otherwise.
+    """
+    if not isinstance(value, str):
+        return value
+    config = get_text_compression_settings()
+    threshold = config['THRESHOLD'] if threshold is None else threshold
+    # Plain text that looks compressed has to be compressed to read back as itself
+    forced = value.startswith(COMPRESSED_PREFIX)
+    if len(value) < threshold and not forced:
+        return value
+    packed = zlib.compress(value.encode('utf-8'), config['LEVEL'] if level is None else level)
+    compressed = COMPRESSED_PREFIX + base64.b85encode(packed).decode('ascii')
+    if len(compressed) >= len(value.encode('utf-8')) and not forced:
+        return value
+    return compressed
+
+
+def decompress_text(value):
+    """Plain text of a stored value; values without COMPRESSED_PREFIX are returned as they are."""
+    if not is_compressed(value):
+        return value
+    return zlib.decompress(base64.b85decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField stored compressed once a value reaches `threshold` characters
+    (TEXT_COMPRESSION['THRESHOLD'] by default). Loading a value returns plain
+    text, and rows written before a column switched to this field stay
+    readable as they are; `manage.py compress_text_fields` compresses them.
+
+    The column type does not change. SQL sees the stored form, so
+    contains/icontains lookups and LIKE only match uncompressed values.
+    """
+
+    def __init__(self, *args, threshold=None, **kwargs):
+        self.threshold = threshold
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.threshold is not None:
+            kwargs['threshold'] = self.threshold
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    # to_python is left alone: Python values are always plain text, and
+    # TextField.get_prep_value runs it on every save, where decompressing
+    # plain text that merely starts with COMPRESSED_PREFIX would fail
+
+    def get_prep_value(self, value):
+        return compress_text(super().get_prep_value(value), self.threshold)
+
+    def summary_annotations(self, name, preview_length):
+        """
+        Length and preview annotations for list summaries (CustomSerializer.summarize_queryset).
+        SQL cannot measure or cut a compressed value, so for those the length is
+        NULL and the preview is the whole value, decompressed when it is loaded.
+        """
+        compressed = Q(**{f'{name}__startswith': COMPRESSED_PREFIX})
+        return {
+            f'{name}_length': Case(When(compressed, then=Value(None)), default=Length(name), output_field=IntegerField()),
+            f'{name}_preview': Case(When(compressed, then=F(name)), default=Substr(name, 1, preview_length), output_field=self),
+        }
+
+
+DEFAULT_TEXT_SEGMENT_SETTINGS = {
+    # Shorter values are stored in the column itself
+    'MIN_LENGTH': 1024,
+    # Paragraphs shorter than this are joined with the next one
+    'MIN_SEGMENT_LENGTH': 256,
+}
+
+SEGMENT_BOUNDARY = re.compile(r'(?<=\n\n)(?=[^\n])')
+
+# A reused segment whose last_used_at is older than this is touched again. Must stay well below the age
+# segment_text_fields --prune requires, so a segment being reused is never old enough to be pruned.
+SEGMENT_TOUCH_INTERVAL = timedelta(minutes=10)
+
+
+def get_text_segment_settings():
+    """Merge TEXT_SEGMENTS from settings over the defaults."""
+    config = DEFAULT_TEXT_SEGMENT_SETTINGS.copy()
+    config.update(getattr(settings, 'TEXT_SEGMENTS', {}) or {})
+    return config
+
+
+def segment_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def split_segments(text, min_segment_length=None):
+    """
+    Pieces of a text that join back into it, cut after blank lines so that
+    paragraphs repeated across texts become identical segments. A piece
+    shorter than `min_segment_length` is joined with the one after it.
+    """
+    if min_segment_length is None:
+        min_segment_length = get_text_segment_settings()['MIN_SEGMENT_LENGTH']
+    segments, pending = [], ''
+    for piece in SEGMENT_BOUNDARY.split(text):
+        pending += piece
+        if len(pending) >= min_segment_length:
+            segments.append(pending)
+            pending = ''
+    if pending:
+        if segments and len(pending) < min_segment_length:
+            segments[-1] += pending
+        else:
+            segments.append(pending)
+    return segments
+
+
+def store_segments(segment_model, texts):
+    """
+    Save the segments not stored yet and return the hashes of `texts`, in order.
+
+    Reused segments get their last_used_at refreshed before they are looked
+    up: a prune that has not deleted them yet then skips them, and one that
+    already has makes them show up as missing, so they are stored again.
+
+    Args:
+        segment_model: Model with `hash` (primary key), `text`, `length` and `last_used_at` fields
+        texts: Segment texts
+    """
+    hashes = [segment_hash(text) for text in texts]
+    distinct = dict(zip(hashes, texts))
+    now = timezone.now()
+    segment_model.objects.filter(pk__in=distinct, last_used_at__lt=now - SEGMENT_TOUCH_INTERVAL).update(last_used_at=now)
+    existing = set(segment_model.objects.filter(pk__in=distinct).values_list('pk', flat=True))
+    segment_model.objects.bulk_create([
+        segment_model(hash=key, text=text, length=len(text), last_used_at=now)
+        for key, text in distinct.items() if key not in existing
+    ], ignore_conflicts=True)
+    return hashes
+
+
+def load_segments(segment_model, hashes):
+    """Texts of the given segment hashes, one query however many there are."""
+    texts = dict(segment_model.objects.filter(pk__in=set(hashes)).values_list('pk', 'text'))
+    missing = set(hashes) - texts.keys()
+    if missing:
+        raise segment_model.DoesNotExist(f"Missing {segment_model._meta.label} {', '.join(sorted(missing))}")
+    return texts
+
+
+def join_segments(segment_model, hashes):
+    texts = load_segments(segment_model, hashes)
+    return ''.join(texts[key] for key in hashes)
+
+
+class SegmentedTextDescriptor(DeferredAttribute):
+    """Reassembles a segmented value on first access and keeps it on the instance."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        field = self.field
+        if value == '' and getattr(instance, field.segments_field):
+            value = join_segments(field.get_segment_model(), getattr(instance, field.segments_field))
+            instance.__dict__[field.attname] = value
+            instance.__dict__[field.joined_attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so loaded values in the instance dict still go through __get__
+        instance.__dict__[self.field.attname] = value
+
+
+class SegmentedTextField(CompressedTextField):
+    """
+    CompressedTextField for long texts that largely repeat across rows. A value
+    of TEXT_SEGMENTS['MIN_LENGTH'] characters or more is split into paragraph
+    segments stored once each in `segment_model`, keyed by SHA-256; the row
+    keeps their ordered hashes in `segments_field`, a JSONField declared after
+    this field, and an empty column. The optional `length_field`, an integer
+    field, holds the length of a segmented value for list summaries. Reading
+    the attribute reassembles the text with one query; saving it unchanged
+    writes no segments.
+
+    SQL sees an empty string for segmented rows. `QuerySet.update()` and
+    `values()` bypass segmentation, so use `segmented_values()` to read the
+    text without instances; `manage.py segment_text_fields` segments older rows.
+    """
+    descriptor_class = SegmentedTextDescriptor
+
+    def __init__(self, *args, segments_field, segment_model, length_field=None, **kwargs):
+        self.segments_field = segments_field
+        self.segment_model = segment_model
+        self.length_field = length_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['segments_field'] = self.segments_field
+        kwargs['segment_model'] = self.segment_model
+        if self.length_field is not None:
+            kwargs['length_field'] = self.length_field
+        return name, path, args, kwargs
+
+    def set_length(self, model_instance, length):
+        if self.length_field is not None:
+            setattr(model_instance, self.length_field, length)
+
+    @property
+    def joined_attname(self):
+        return f'_{self.attname}_joined'
+
+    def get_segment_model(self):
+        return apps.get_model(self.segment_model)
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        hashes = getattr(model_instance, self.segments_field)
+        # Never loaded, or loaded and left alone: the stored segments still hold it
+        if hashes and (value == '' or value is model_instance.__dict__.get(self.joined_attname)):
+            return ''
+        if not isinstance(value, str) or len(value) < get_text_segment_settings()['MIN_LENGTH']:
+            setattr(model_instance, self.segments_field, None)
+            self.set_length(model_instance, None)
+            return value
+        hashes = store_segments(self.get_segment_model(), split_segments(value))
+        setattr(model_instance, self.segments_field, hashes)
+        self.set_length(model_instance, len(value))
+        model_instance.__dict__[self.joined_attname] = value
+        return ''
+
+    def summary_annotations(self, name, preview_length):
+        """
+        For segmented rows the length comes from `length_field` (NULL without
+        one), the preview is their first segment and `{name}_segmented` is true.
+        """
+        annotations = super().summary_annotations(name, preview_length)
+        segmented = Q(**{f'{self.segments_field}__isnull': False}) & Q(**{name: ''})
+        first_segment = self.get_segment_model().objects.filter(
+            pk=KeyTextTransform('0', OuterRef(self.segments_field))
+        ).values('text')[:1]
+        segmented_length = F(self.length_field) if self.length_field is not None else Value(None)
+        annotations[f'{name}_length'] = Case(
+            When(segmented, then=segmented_length), default=annotations[f'{name}_length'], output_field=IntegerField(),
+        )
+        annotations[f'{name}_preview'] = Case(
+            When(segmented, then=Subquery(first_segment)), default=annotations[f'{name}_preview'], output_field=self,
+        )
+        annotations[f'{name}_segmented'] = ExpressionWrapper(segmented, output_field=BooleanField())
+        return annotations
+
+
+def segmented_values(rows, model, names):
+    """
+    Replace segmented values in dicts from `values()` with their text, one
+    query per call. Each row needs the field and its segments field.
+
+    Args:
+        rows: List of dicts
+        model: Model of the rows
+        names: SegmentedTextField names to reassemble
+    """
+    fields = [model._meta.get_field(name) for name in names]
+    wanted = {
+        field: [row for row in rows if row[field.attname] == '' and row[field.segments_field]]
+        for field in fields
+    }
+    for field, segmented in wanted.items():
+        if not segmented:
+            continue
+        texts = load_segments(field.get_segment_model(), [key for row in segmented for key in row[field.segments_field]])
+        for row in segmented:
+            row[field.attname] = ''.join(texts[key] for key in row[field.segments_field])
+    return rows
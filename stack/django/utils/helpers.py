@@ -1,15 +1,27 @@
+from functools import lru_cache
+
 from strongmsp_base import settings
 from twilio.rest import Client
 from django.db import connection
 from django.db.utils import DatabaseError
 
+
+@lru_cache(maxsize=1)
+def get_twilio_client():
+    """
+    Process-wide Twilio client so its HTTP session is reused across messages.
+    """
+    return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+
 def send_sms(to, body):
-    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    message = client.messages.create(
-        body=body,
-        from_=settings.TWILIO_PHONE_NUMBER,
-        to=to
-    )
+    from strongmsp_app.services.request_metrics import external_call
+    with external_call('twilio'):
+        message = get_twilio_client().messages.create(
+            body=body,
+            from_=settings.TWILIO_PHONE_NUMBER,
+            to=to
+        )
     return message.sid
 
 def fetch_dict_query(query, params=None):